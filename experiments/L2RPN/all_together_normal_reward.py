@@ -21,7 +21,8 @@ from stable_baselines3.dqn import MlpPolicy as dqnMlpPolicy
 from stable_baselines3.ppo import MlpPolicy as ppoMlpPolicy
 from src.makers.SB3 import create_agent_sb3
 from src.envs.gymenv_heuristics import GymEnvWithHeuristics
-from grid2op.gym_compat import GymEnv, BoxGymActSpace, BoxGymObsSpace, DiscreteActSpace
+from src.envs.spaces import FastBoxGymObsSpace
+from grid2op.gym_compat import GymEnv, BoxGymActSpace, DiscreteActSpace
 from typing import List
 from grid2op.Action import BaseAction
 import numpy as np
@@ -49,10 +50,10 @@ class CustomGymEnv(GymEnvWithHeuristics):
 
     """
 
-    def __init__(self, env_init, *args, reward_cumul="init", safe_max_rho=0.9, **kwargs):
-        super().__init__(env_init, reward_cumul=reward_cumul, *args, **kwargs)
+    def __init__(self, env_init, *args, reward_cumul="init", safe_max_rho=0.9, simulate_gate=True, **kwargs):
+        super().__init__(env_init, reward_cumul=reward_cumul, simulate_gate=simulate_gate, *args, **kwargs)
         self._safe_max_rho = safe_max_rho
-        self.dn = self.init_env.action_space({})
+        self.dn = self.do_nothing_action
 
     def heuristic_actions(self, g2op_obs, reward, done, info) -> List[BaseAction]:
         """To match the description of the environment, this heuristic will:
@@ -70,68 +71,13 @@ class CustomGymEnv(GymEnvWithHeuristics):
         See return values of :func:`GymEnvWithHeuristics.heuristic_actions`
         """
 
-        to_reco = (g2op_obs.time_before_cooldown_line == 0) & (~g2op_obs.line_status)
-        res = []
-        if np.any(to_reco):
-            # reconnect something if it can be
-            reco_id = np.where(to_reco)[0]
-            for line_id in reco_id:
-                g2op_act = self.init_env.action_space({"set_line_status": [(line_id, +1)]})
-                res.append(g2op_act)
-        elif g2op_obs.rho.max() <= self._safe_max_rho:
+        # reconnect something if it can be
+        res = self.reconnection_actions(g2op_obs)
+        if not res and g2op_obs.rho.max() <= self._safe_max_rho:
             # play do nothing if there is "no problem" according to the "rule of thumb"
-            res = [self.init_env.action_space()]
+            res = [self.do_nothing_action]
         return res
 
-    def step(self, gym_action):
-        """This function implements the special case of the "step" function (as seen by the "gym environment") that might
-        call multiple times the "step" function of the underlying "grid2op environment" depending on the
-        heuristic.
-
-        It takes a gym action, convert it to a grid2op action (thanks to the action space) and
-        simulates if this action is better than doing nothing. If so, it performs the action otherwise
-        it performs the "do nothing" action.
-
-        Then process the heuristics / expert rules / forced actions / etc. and return the next gym observation that will
-        be processed by the agent.
-
-        The number of "grid2op steps" can vary between different "gym environment" call to "step".
-
-        It has the same signature as the `gym.Env` "step" function, of course.
-
-        Parameters
-        ----------
-        gym_action :
-            the action (represented as a gym one) that the agent wants to perform.
-
-        Returns
-        -------
-        gym_obs:
-            The gym observation that will be processed by the agent
-
-        reward: ``float``
-            The reward of the agent (that might be computed by the )
-
-        done: ``bool``
-            Whether the episode is over or not
-
-        info: Dict
-            Other type of informations
-
-        """
-        g2op_act = self.action_space.from_gym(gym_action)
-
-        _, sim_reward_act, _, _ = self.init_env.simulate(g2op_act)
-        _, sim_reward_dn, _, _ = self.init_env.simulate(self.dn)
-        if sim_reward_dn > sim_reward_act:
-            g2op_act = self.dn
-
-        g2op_obs, reward, done, info = self.init_env.step(g2op_act)
-        if not done:
-            g2op_obs, reward, done, info = self.apply_heuristics_actions(g2op_obs, reward, done, info)
-        gym_obs = self.observation_space.to_gym(g2op_obs)
-        return gym_obs, float(reward), done, info
-
 
 SAVE_PATH = "./agents"
 config = {
@@ -176,7 +122,7 @@ config = {
             }
         },
         "observation_space": {
-            "class": BoxGymObsSpace,
+            "class": FastBoxGymObsSpace,
             "observation_space_kwargs":{
                 "attr_to_keep":[
                     "gen_p",
@@ -15,32 +15,16 @@ log.setLevel(logging.DEBUG)
 import os
 
 import grid2op
+import numpy as np
 from grid2op.Converter import IdToAct
 
 from src import constants
-from stable_baselines3.common.callbacks import CheckpointCallback
-from grid2op.gym_compat import BoxGymObsSpace, DiscreteActSpace, GymEnv, MultiDiscreteActSpace
+from src.callbacks.checkpoint import AsyncCheckpointCallback
+from grid2op.gym_compat import GymEnv, MultiDiscreteActSpace
 from src.makers.SB3 import create_agent_sb3
-
-
-def _filter_action(action):
-    MAX_ELEM = 3
-    act_dict = action.impact_on_objects()
-    # Remove Curtailment
-    # if act_dict["curtailment"]["changed"] or action._modif_curtailment or len(act_dict["curtailment"]["limit"]) > 0:
-    #    return False
-    elem = 0
-    elem += act_dict["force_line"]["reconnections"]["count"]
-    elem += act_dict["force_line"]["disconnections"]["count"]
-    elem += act_dict["switch_line"]["count"]
-    elem += len(act_dict["topology"]["bus_switch"])
-    elem += len(act_dict["topology"]["assigned_bus"])
-    elem += len(act_dict["topology"]["disconnect_bus"])
-    elem += len(act_dict["redispatch"]["generators"])
-
-    if elem <= MAX_ELEM:
-        return True
-    return False
+from src.actions.cache import ActionSpaceCache
+from src.envs.env_spec import EnvSpec
+from src.envs.spaces import FastBoxGymObsSpace, MaskedDiscreteActSpace
 
 
 def create_action_space(env_action_space, load_path=None, save_path=None, file_name="filtered_actions"):
@@ -49,21 +33,20 @@ def create_action_space(env_action_space, load_path=None, save_path=None, file_n
         try:
             converter.init_converter(all_actions=os.path.join(load_path, F"{file_name}.npy"))
             log.debug(F"Loaded Action space size:{converter.n} from folder [{load_path}]")
-            return DiscreteActSpace(converter, action_list=converter.all_actions)
+            return MaskedDiscreteActSpace(converter, action_list=converter.all_actions)
         except FileNotFoundError as e:
             log.warning(F"Could not load filtered action space, one will be created now. Error: {str(e)}")
             pass
 
-    converter.init_converter()
-    log.debug(F"Original Action space size:{converter.n}")
-    #converter.filter_action(_filter_action)
-    log.debug(F"Filtered Action space size:{converter.n}")
+    # all the unitary actions, to filter them add for example action_filter=max_elements_filter(3)
+    # (see src.actions.builder)
+    actions = ActionSpaceCache().get(env_action_space)
     if save_path is not None:
-        log.debug(F"Saving filtered actions on {save_path}")
-        if not os.path.exists(save_path):
-            os.makedirs(save_path)
-        converter.save(save_path, file_name)
-    return DiscreteActSpace(converter, action_list=converter.all_actions)
+        os.makedirs(save_path, exist_ok=True)
+        np.save(os.path.join(save_path, F"{file_name}.npy"), actions)
+    converter.init_converter(all_actions=actions)
+    log.debug(F"Action space size:{converter.n}")
+    return MaskedDiscreteActSpace(converter, action_list=converter.all_actions)
 
 
 SAVE_PATH = "./agent"
@@ -85,15 +68,17 @@ config = {
         "save_path": SAVE_PATH,
         "env": {
             "simulator": grid2op,
-            "env": grid2op.make("l2rpn_wcci_2022", difficulty="competition",backend=LightSimBackend()),
+            "env": EnvSpec(grid2op.make, "l2rpn_wcci_2022", difficulty="competition", backend=LightSimBackend),
             "gymenv_class": GymEnv
         },
         "action_space": {
             "class": MultiDiscreteActSpace
         },
         "observation_space": {
-            "class": BoxGymObsSpace,
+            "class": FastBoxGymObsSpace,
             "observation_space_kwargs": {
+                # the grid2op GymEnv does not copy the terminal observation kept by the vec envs
+                "copy_obs": True,
                 "attr_to_keep": [
                     "hour_of_day",
                     "day_of_week",
@@ -152,7 +137,7 @@ config = {
             "save_path": SAVE_PATH,
             "callbacks": {
                 "save_progress": {
-                    "class": CheckpointCallback,
+                    "class": AsyncCheckpointCallback,
                     "kwargs": {
                         "save_freq": 50000,
                         "save_path": SAVE_PATH,
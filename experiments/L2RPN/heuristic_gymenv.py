@@ -19,9 +19,10 @@ from src.helpers import create_experiment_gitignore
 
 from grid2op.Converter import IdToAct
 from grid2op.Reward import EpisodeDurationReward
-from grid2op.gym_compat import DiscreteActSpace, BoxGymObsSpace
 from stable_baselines3.common.callbacks import CheckpointCallback
 from src.envs.gymenv_heuristics import GymEnvWithHeuristics
+from src.actions.cache import ActionSpaceCache
+from src.envs.spaces import FastBoxGymObsSpace, MaskedDiscreteActSpace
 from src import constants, AutoGrid
 from stable_baselines3 import PPO
 from stable_baselines3.ppo import MlpPolicy
@@ -33,64 +34,28 @@ import numpy as np
 
 
 class CustomGymEnv(GymEnvWithHeuristics):
-    def __init__(self, env_init, *args, reward_cumul="init", safe_max_rho=0.9, **kwargs):
-        super().__init__(env_init, reward_cumul=reward_cumul, *args, **kwargs)
+    def __init__(self, env_init, *args, reward_cumul="init", safe_max_rho=0.9, simulate_gate=True, **kwargs):
+        super().__init__(env_init, reward_cumul=reward_cumul, simulate_gate=simulate_gate, *args, **kwargs)
         self._safe_max_rho = safe_max_rho
-        self.dn = self.init_env.action_space({})
+        self.dn = self.do_nothing_action
 
     def heuristic_actions(self, g2op_obs, reward, done, info) -> List[BaseAction]:
-        to_reco = (g2op_obs.time_before_cooldown_line == 0) & (~g2op_obs.line_status)
-        res = []
-        if np.any(to_reco):
-            # reconnect something if it can be
-            reco_id = np.where(to_reco)[0]
-            for line_id in reco_id:
-                g2op_act = self.init_env.action_space({"set_line_status": [(line_id, +1)]})
-                res.append(g2op_act)
-        elif g2op_obs.rho.max() <= self._safe_max_rho:
+        # reconnect something if it can be
+        res = self.reconnection_actions(g2op_obs)
+        if not res and g2op_obs.rho.max() <= self._safe_max_rho:
             # play do nothing if there is "no problem" according to the "rule of thumb"
-            res = [self.init_env.action_space()]
+            res = [self.do_nothing_action]
         return res
 
-    def step(self, gym_action):
-        g2op_act = self.action_space.from_gym(gym_action)
 
-        _, sim_reward_act, _, _ = self.init_env.simulate(g2op_act)
-        _, sim_reward_dn, _, _ = self.init_env.simulate(self.dn)
-        if sim_reward_dn > sim_reward_act:
-            g2op_act = self.dn
-
-        g2op_obs, reward, done, info = self.init_env.step(g2op_act)
-        if not done:
-            g2op_obs, reward, done, info = self.apply_heuristics_actions(g2op_obs, reward, done, info)
-        gym_obs = self.observation_space.to_gym(g2op_obs)
-        return gym_obs, float(reward), done, info
-
-
-def _filter_action(action):
+def _filter_action(counts):
     MAX_ELEM = 2
-    act_dict = action.impact_on_objects()
-    # Remove line reconections
-    if act_dict["force_line"]["reconnections"]["count"] > 0:
-        return False
-    if act_dict["force_line"]["disconnections"]["count"] > 0:
-        return False
-    if  act_dict["switch_line"]["count"] > 0:
-        return False
-    if  len(act_dict["topology"]["bus_switch"]) > 0:
-        return False
-    if len(act_dict["topology"]["assigned_bus"]) > 0:
-        return False
-    if len(act_dict["topology"]["disconnect_bus"]) > 0:
-        return False
-    elem = 0
-    elem += len(act_dict["curtailment"]["limit"])
-    elem += len(act_dict["redispatch"]["generators"])
-    elem += len(act_dict["storage"]["capacities"])
+    # Remove line and topology actions
+    topology = counts["reconnections"] + counts["disconnections"] + counts["switch_line"]
+    topology = topology + counts["bus_switch"] + counts["assigned_bus"] + counts["disconnect_bus"]
     #only two redispatches/curtailment
-    if elem <= MAX_ELEM:
-        return True
-    return False
+    elem = counts["curtailment"] + counts["redispatch"] + counts["storage"]
+    return (topology == 0) & (elem <= MAX_ELEM)
 
 def create_action_space(env_action_space, load_path=None, save_path=None):
     converter = IdToAct(env_action_space)
@@ -99,22 +64,21 @@ def create_action_space(env_action_space, load_path=None, save_path=None):
             my_path = os.path.join(load_path, AGENT_NAME)
             converter.init_converter(all_actions=os.path.join(my_path, "filtered_actions.npy"))
             log.debug(F"Loaded Action space size:{converter.n} from folder [{my_path}]")
-            return DiscreteActSpace(converter, action_list=converter.all_actions)
+            return MaskedDiscreteActSpace(converter, action_list=converter.all_actions)
         except FileNotFoundError as e:
             log.warning(F"Could not load filtered action space, one will be created now. Error: {str(e)}")
             pass
 
-    converter.init_converter()
-    log.debug(F"Original Action space size:{converter.n}")
-    converter.filter_action(_filter_action)
-    log.debug(F"Filtered Action space size:{converter.n}")
+    # the filter removes the line and topology actions, they are not enumerated
+    actions = ActionSpaceCache().get(env_action_space, set_line_status=False, change_line_status=False,
+                                     set_topo_vect=False, change_bus_vect=False, action_filter=_filter_action)
     if save_path is not None:
-        log.debug(F"Saving filtered actions on {save_path}")
         my_path = os.path.join(save_path, AGENT_NAME)
-        if not os.path.exists(my_path):
-            os.makedirs(my_path)
-        converter.save(my_path, "filtered_actions")
-    return DiscreteActSpace(converter, action_list=converter.all_actions)
+        os.makedirs(my_path, exist_ok=True)
+        np.save(os.path.join(my_path, "filtered_actions.npy"), actions)
+    converter.init_converter(all_actions=actions)
+    log.debug(F"Filtered Action space size:{converter.n}")
+    return MaskedDiscreteActSpace(converter, action_list=converter.all_actions)
 
 
 
@@ -134,7 +98,7 @@ config = {
                     "dataset":"l2rpn_wcci_2022",
                     "difficulty":"competition",
                     "reward_class":EpisodeDurationReward,
-                    "backend":LightSimBackend()
+                    "backend":LightSimBackend
                 },
                 "gymenv_class": CustomGymEnv
             },
@@ -146,7 +110,7 @@ config = {
                 }
             },
             "observation_space": {
-                "class": BoxGymObsSpace,
+                "class": FastBoxGymObsSpace,
                 "observation_space_kwargs": {
                     "attr_to_keep": [
                         "hour_of_day",
@@ -11,6 +11,7 @@ sys.path.append(AutoGridPath)
 import logging
 
 from src.helpers import create_experiment_gitignore
+from src.envs.env_spec import EnvSpec
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -92,7 +93,7 @@ config = {
         "save_path": SAVE_PATH,
         "env": {
             "simulator": grid2op,
-            "env": grid2op.make("l2rpn_wcci_2022", difficulty="competition",backend=LightSimBackend()),
+            "env": EnvSpec(grid2op.make, "l2rpn_wcci_2022", difficulty="competition", backend=LightSimBackend),
             "gymenv_class": GymEnv,
         },
         "action_space": {
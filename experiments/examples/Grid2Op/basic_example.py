@@ -11,6 +11,7 @@ import logging
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 from src.helpers import create_experiment_gitignore
+from src.envs.env_spec import EnvSpec
 
 
 
@@ -32,7 +33,7 @@ config = {
             "save_path": SAVE_PATH,
             "env": {
                 "simulator": grid2op,
-                "env": grid2op.make("l2rpn_wcci_2022", difficulty="competition",backend=LightSimBackend()),
+                "env": EnvSpec(grid2op.make, "l2rpn_wcci_2022", difficulty="competition", backend=LightSimBackend),
                 "gymenv_class": GymEnv
             },
             "action_space": {
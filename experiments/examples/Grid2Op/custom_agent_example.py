@@ -11,6 +11,7 @@ log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 from src.helpers import create_experiment_gitignore
+from src.envs.env_spec import EnvSpec
 
 
 
@@ -38,13 +39,15 @@ class MySB3AgentClass(SB3AgentGrid2Op):
                  custom_load_dict=None,
                  gymenv=None,
                  iter_num=None,
+                 load_env=None,
                  ):
         super().__init__(g2op_action_space, gym_act_space, gym_obs_space,nn_type,
                          nn_path=nn_path,
                          nn_kwargs=nn_kwargs,
                          custom_load_dict=custom_load_dict,
                          gymenv=gymenv,
-                         iter_num=iter_num
+                         iter_num=iter_num,
+                         load_env=load_env
                          )
     def get_act(self, gym_obs, reward, done):
         """Retrieve the gym action from the gym observation and the reward.
@@ -76,7 +79,7 @@ config = {
             "save_path": SAVE_PATH,
             "env": {
                 "simulator": grid2op,
-                "env": grid2op.make("l2rpn_wcci_2022", difficulty="competition",backend=LightSimBackend()),
+                "env": EnvSpec(grid2op.make, "l2rpn_wcci_2022", difficulty="competition", backend=LightSimBackend),
                 "gymenv_class": GymEnv
             },
             "action_space": {
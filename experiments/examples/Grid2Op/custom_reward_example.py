@@ -58,7 +58,7 @@ config = {
                     "dataset":"l2rpn_wcci_2022",
                     "difficulty":"competition",
                     "reward_class":EpisodeDurationReward,
-                    "backend":LightSimBackend()
+                    "backend":LightSimBackend
                 },
                 "gymenv_class": GymEnv
             },
@@ -14,6 +14,7 @@ log.setLevel(logging.DEBUG)
 from lightsim2grid import LightSimBackend
 import grid2op
 from src.helpers import create_experiment_gitignore
+from src.envs.env_spec import EnvSpec
 from src import constants, AutoGrid
 from stable_baselines3 import PPO
 from stable_baselines3.ppo import MlpPolicy
@@ -43,7 +44,7 @@ config = {
             "save_path": SAVE_PATH,
             "env": {
                 "simulator": grid2op,
-                "env": grid2op.make("l2rpn_wcci_2022", difficulty="competition",backend=LightSimBackend()),
+                "env": EnvSpec(grid2op.make, "l2rpn_wcci_2022", difficulty="competition", backend=LightSimBackend),
                 "gymenv_class": GymEnv
             },
             "action_space": {
@@ -0,0 +1,25 @@
+import sys
+import os
+import timeit
+from pathlib import Path
+
+# This is incase you execute this example with a clone repository, so python can find AutoGrid
+AutoGridPath = os.path.dirname(Path(__file__).parent.parent.parent.absolute())
+sys.path.append(AutoGridPath)
+
+import grid2op
+from grid2op.gym_compat import BoxGymObsSpace
+
+from src import constants
+from src.envs.spaces import FastBoxGymObsSpace
+
+# benchmark of the conversion of the observations, time per step in microseconds
+if __name__ == "__main__":
+    env = grid2op.make("l2rpn_case14_sandbox", test=True)
+    attr_to_keep = [attr_nm for attr_nm in constants.ALL_ATTR_OBS if hasattr(env.get_obs(), attr_nm)]
+    observations = [env.reset()] + [env.step(env.action_space())[0] for _ in range(99)]
+    for space_class in (BoxGymObsSpace, FastBoxGymObsSpace):
+        space = space_class(env.observation_space, attr_to_keep=attr_to_keep)
+        space.to_gym(observations[0])
+        seconds = min(timeit.repeat(lambda: [space.to_gym(obs) for obs in observations], number=10, repeat=5))
+        print(F"{space_class.__name__}: {seconds / (10 * len(observations)) * 1e6:.1f} us per step")
@@ -6,6 +6,7 @@ from grid2op.Converter import IdToAct
 from stable_baselines3.common.vec_env import DummyVecEnv, VecVideoRecorder
 
 from src.envs.gymenv_heuristics import GymEnvWithHeuristics
+from src.envs.env_spec import EnvSpec
 
 AutoGridPath = os.path.dirname(Path(__file__).parent.parent.absolute())
 sys.path.append(AutoGridPath)
@@ -130,7 +131,7 @@ config = {
             "save_path": SAVE_PATH,
             "env": {
                 "simulator": grid2op,
-                "env": grid2op.make("l2rpn_wcci_2022", difficulty="competition"),
+                "env": EnvSpec(grid2op.make, "l2rpn_wcci_2022", difficulty="competition"),
                 "gymenv_class":make_env,
             },
             "action_space": {
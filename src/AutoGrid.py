@@ -3,6 +3,8 @@ import gc
 import inspect
 import json
 import logging
+import pickle
+from concurrent.futures import as_completed
 
 from src.trainner.trainer import train_agent
 
@@ -16,11 +18,17 @@ from src.evaluators.evaluator import evaluate_agent
 from src.makers.maker import create_agent
 
 import urllib3
-from src.helpers import merge_dict
+from src.envs.env_pool import EnvPool
+from src.envs.env_spec import EnvSpec
+from src.helpers import UnfingerprintableError, fingerprint, fork_executor, fork_workers, get_fork_state, merge_dict
+from src.utils.artifact_store import ArtifactStore
 import logging.handlers
 import os
 
 
+DEFAULT_CACHE_PATH = "./autogrid_cache"
+
+
 class main(object):
     '''
     Main class, it receive the command line arguments and hold the main running loop.
@@ -46,6 +54,29 @@ class main(object):
         self.modules = {}
         self.config_json = input_config_json
         self.configure()
+        self.env_pool = EnvPool(max_size=self.config_json.get("core", {}).get("env_pool", 0))
+        self.configure_artifact_store()
+
+    def configure_artifact_store(self):
+        '''
+        Configure the artifact store used to skip the phases of the experiments that are already done.
+        This can be configured using the "cache" key of the "core" configuration, True uses the default folder.
+
+        >>> a simple example:
+            "core": {
+                "cache": "./autogrid_cache"
+            },
+
+            The "--force" command line argument (or "core.cache_force") runs every phase again.
+        '''
+        cache = self.config_json.get("core", {}).get("cache", False)
+        if cache is True:
+            cache = DEFAULT_CACHE_PATH
+        self.artifact_store = ArtifactStore(cache) if cache else None
+        self.force = self.command_line_arguments.get("force", False) or \
+                     self.config_json.get("core", {}).get("cache_force", False)
+        if self.artifact_store is not None:
+            log.debug(F"Artifact store configured at [{cache}], force [{self.force}]")
 
     def configure(self):
         '''
@@ -111,6 +142,8 @@ class main(object):
             }
         if self.force_debug_log != False:
             log_file_config["level"] = self.force_debug_log
+        if self.command_line_arguments.get("log_file", None):
+            log_file_config["filename"] = self.command_line_arguments.get("log_file")
         log_path = os.path.dirname(log_file_config.get("filename"))
         if log_path:
             os.makedirs(log_path, exist_ok=True)
@@ -129,68 +162,241 @@ class main(object):
 
     def set_up_experiment_config(self, experiment_id):
         """
-        experiment_config = merge_dict(self.config_json.get("common", {}),
-                                       self.config_json.get("experiments").get(experiment_id),
-                                       override=True, a_dict_name="common", b_dict_name=experiment_id)
-"""
+        Merge the "common" configuration into the experiment configuration and create its environment.
+        The environment is created from "env_class"/"env_args"/"env_kwargs" or from an :class:`EnvSpec`
+        stored in "env", the spec used is kept in "env_spec" so the environment can be rebuilt.
+        Environments created from a spec are taken from the :class:`EnvPool` ("core.env_pool" idle envs are kept).
+
+        Args:
+            :experiment_id (string): key of the experiment inside the "experiments" configuration
+
+        Returns:
+            :dict: the merged experiment configuration, with the environment in ["env"]["env"]
+        """
+        experiment_config = self.merge_experiment_config(experiment_id)
+        return self.set_up_experiment_env(experiment_config, experiment_id)
+
+    def merge_experiment_config(self, experiment_id):
+        '''
+        Merge the "common" configuration into the experiment configuration, without creating the environment.
+
+        Args:
+            :experiment_id (string): key of the experiment inside the "experiments" configuration
+
+        Returns:
+            :dict: the merged experiment configuration
+        '''
         experiment_config = merge_dict(self.config_json.get("experiments").get(experiment_id),
                                        self.config_json.get("common", {}),
                                        override=False, a_dict_name=experiment_id, b_dict_name="common")
+        experiment_config["name"] = experiment_config.get("name", experiment_id)
+        return experiment_config
+
+    def set_up_experiment_env(self, experiment_config, experiment_id):
+        '''
+        Create the environment of a merged experiment configuration (see :func:`set_up_experiment_config`)
+
+        Args:
+            :experiment_config (dict): the merged experiment configuration
+            :experiment_id (string): key of the experiment inside the "experiments" configuration
+
+        Returns:
+            :dict: the experiment configuration with the environment in ["env"]["env"]
+        '''
         env_class = experiment_config.get("env").get("env_class")
         env_args = experiment_config.get("env").get("env_args",[])
         env_kwargs = experiment_config.get("env").get("env_kwargs",{})
         backend_class = experiment_config.get("env_backend_class",False)
-        backend = env_kwargs.get("backend",False)
-        if backend and (inspect.isclass(backend) or inspect.isfunction(backend)) :
-            log.debug(F"Creating backend [{backend}]")
-            env_kwargs["backend"] = backend()
-        elif backend_class and (inspect.isclass(backend_class) or inspect.isfunction(backend_class)) :
-            env_kwargs["backend"] = backend_class()
 
         #COPY the environment is not a good idea
-
+        env_spec = None
         if inspect.isclass(env_class) or inspect.isfunction(env_class):
-            log.debug(F'Creating a new environment using {env_class}({env_args, env_kwargs})')
-            experiment_config["env"]["env"] = env_class(*env_args, **env_kwargs)
+            env_spec = EnvSpec(env_class, *env_args, **env_kwargs)
+        elif isinstance(experiment_config.get("env").get("env", None), EnvSpec):
+            env_spec = experiment_config.get("env").get("env")
+
+        if env_spec is not None:
+            experiment_config["env"]["env_spec"] = env_spec
+            experiment_config["env"]["env"] = self.env_pool.acquire(env_spec, backend_class,
+                                                                    seed=experiment_config.get("env").get("seed", None))
         elif self.config_json.get("experiments", {}).get(experiment_id, {}).get("env", {}).get("env", None) is None and \
                 self.config_json.get("common",{}).get("env",{}).get("env",False) is not False :
             log.warning("THIS MODE OF HAVING THE ENVIROMENT WILL CRASH IF YOU HAVE MULTPLE EXPERIMENTS")
             log.warning("THIS MODE OF HAVING THE ENVIROMENT WILL CRASH IF YOU HAVE MULTPLE EXPERIMENTS")
+            log.warning("Use an EnvSpec (src.envs.env_spec) to create the environment when the experiment starts")
             log.debug(F'Copy the environment from common config [{self.config_json.get("common").get("env").get("env")}] to experiment config')
             experiment_config["env"]["env"] = self.config_json.get("common").get("env").get("env").copy()
 
-        experiment_config["name"] = experiment_config.get("name", experiment_id)
-
         return experiment_config
 
+    def get_experiment_hash(self, experiment_config):
+        '''
+        Stable hash of a merged experiment configuration, used as key of the :class:`ArtifactStore`.
+        Classes and functions are identified by their qualified name and source code, instances by their content
+        (see :func:`src.helpers.fingerprint`), and the model loaded with "agent.load_path" (if any) by its size
+        and modification time.
+
+        Args:
+            :experiment_config (dict): the merged experiment configuration (before creating the environment)
+
+        Returns:
+            :String: the hash of the experiment, None if the configuration can't be hashed (for example an
+                environment instance instead of an EnvSpec), the experiment is then not cached
+        '''
+        data = {"config": experiment_config}
+        load_path = experiment_config.get("agent", {}).get("load_path", None)
+        if load_path:
+            for path in [load_path, F"{load_path}.zip"]:
+                if os.path.isfile(path):
+                    stat = os.stat(path)
+                    data["load_path"] = [stat.st_size, stat.st_mtime]
+                    break
+        try:
+            return fingerprint(data)
+        except UnfingerprintableError as e:
+            log.warning(F"Experiment [{experiment_config.get('name')}] can't be cached: {e}")
+            return None
+
+    def run_experiment(self, experiment_name):
+        '''
+        Execute a single experiment: create the environment and the agent, train it and evaluate it.
+
+        Args:
+            :experiment_name (string): key of the experiment inside the "experiments" configuration
+
+        Returns:
+            :the output of the evaluation phase (None if the experiment has no evaluation)
+        '''
+        log.info(F"Executing experiment [{experiment_name}]")
+        experiment_config = self.merge_experiment_config(experiment_name)
+        training = experiment_config.get("training", False)
+        evaluation = experiment_config.get("evaluation", False)
+
+        experiment_hash = None
+        if self.artifact_store is not None:
+            experiment_hash = self.get_experiment_hash(experiment_config)
+            log.debug(F"Experiment [{experiment_name}] hash [{experiment_hash}]")
+            if not self.force and experiment_hash is not None:
+                evaluated = evaluation is not False and self.artifact_store.has_evaluation(experiment_hash)
+                trained = training is not False and self.artifact_store.has_model(experiment_hash)
+                if evaluated or (evaluation is False and trained):
+                    log.info(F"Experiment [{experiment_name}] already done [{experiment_hash}], skipping it "
+                             F"(use --force to run it again)")
+                    return self.artifact_store.load_evaluation(experiment_hash) if evaluated else None
+                if trained:
+                    log.info(F"Experiment [{experiment_name}] already trained [{experiment_hash}], skipping training")
+                    experiment_config.setdefault("agent", {})["load_path"] = \
+                        self.artifact_store.model_path(experiment_hash)
+                    training = False
+
+        experiment_config = self.set_up_experiment_env(experiment_config, experiment_name)
+        experiment_config.get("env").get("env").reset()
+        agent = create_agent(experiment_config)
+
+        if training is not False:
+            log.info(F"Training agent with [{training}]")
+            agent = train_agent(agent, experiment_config)
+            if experiment_hash is not None:
+                self.artifact_store.save_model(experiment_hash, agent, experiment_config.get("name"))
+
+        result = None
+        if evaluation is not False:
+            log.info(F"Evaluating agent with [{evaluation}]")
+            experiment_config.get("env").get("env").reset()
+            result = evaluate_agent(agent, experiment_config)
+            if experiment_hash is not None:
+                self.artifact_store.save_evaluation(experiment_hash, result, experiment_config.get("name"))
+            print("---------------------------------------------------------------------------------------------------------\n")
+        self.env_pool.release(experiment_config.get("env").get("env"))
+
+        del agent
+        del experiment_config
+        gc.collect()
+        return result
+
+    def get_parallel_workers(self):
+        '''
+        Number of worker processes configured with the "parallel" key of the "core" configuration.
+
+        >>> a simple example:
+            "core": {
+                "parallel": 3
+            },
+
+            "parallel" can be an integer (number of workers) or True (one worker per cpu).
+            False, 0 or 1 keep the sequential execution.
+
+        Returns:
+            :int: number of worker processes, 1 means sequential execution
+        '''
+        parallel = self.config_json.get("core", {}).get("parallel", False)
+        if not parallel:
+            return 1
+        workers = fork_workers(None if parallel is True else parallel, "Parallel execution of the experiments")
+        return max(1, min(workers, len(self.config_json.get("experiments"))))
+
     def run(self):
         '''
         Main run loop.
-        Execute all the configured Experiments in steps
+        Execute all the configured Experiments in steps.
+        If "core.parallel" is configured each experiment is executed in its own worker process.
+
+        Returns:
+            :dict: evaluation output of each experiment, by experiment name
         '''
         log.info("Starting execution.")
-        for experiment_name in list(self.config_json.get("experiments")):
-            log.info(F"Executing experiment [{experiment_name}]")
-            experiment_config = self.set_up_experiment_config(experiment_name)
-            experiment_config.get("env").get("env").reset()
-            agent = create_agent(experiment_config)
-
-            training = experiment_config.get("training", False)
-            if training is not False:
-                log.info(F"Training agent with [{training}]")
-                agent = train_agent(agent, experiment_config)
-
-            evaluation = experiment_config.get("evaluation", False)
-            if evaluation is not False:
-                log.info(F"Evaluating agent with [{evaluation}]")
-                experiment_config.get("env").get("env").reset()
-                evaluate_agent(agent, experiment_config)
-                print("---------------------------------------------------------------------------------------------------------\n")
-            experiment_config.get("env").get("env").close()
-
-            del agent
-            del experiment_config
-            self.config_json.get("experiments").pop(experiment_name)
-            gc.collect()
+        results = {}
+        workers = self.get_parallel_workers()
+        if workers > 1:
+            results = self.run_parallel(workers)
+        else:
+            for experiment_name in list(self.config_json.get("experiments")):
+                results[experiment_name] = self.run_experiment(experiment_name)
+                self.config_json.get("experiments").pop(experiment_name)
+        self.env_pool.close()
 
         log.info("Finished execution.")
+        return results
+
+    def run_parallel(self, workers):
+        '''
+        Execute every experiment in its own worker process.
+        Workers are forked, so the configuration (classes, functions, backends...) does not need to be pickled,
+        each worker builds its own environment with :func:`set_up_experiment_config`.
+        Only the evaluation output travels back to the parent process.
+
+        Args:
+            :workers (int): number of worker processes
+
+        Returns:
+            :dict: evaluation output of each experiment, by experiment name
+        '''
+        log.info(F"Executing {len(self.config_json.get('experiments'))} experiments on {workers} worker processes")
+        results = {}
+        with fork_executor(workers, autogrid_main=self) as executor:
+            futures = {executor.submit(_run_experiment_worker, experiment_name): experiment_name
+                       for experiment_name in list(self.config_json.get("experiments"))}
+            for future in as_completed(futures):
+                experiment_name = futures[future]
+                try:
+                    results[experiment_name] = future.result()
+                    log.info(F"Experiment [{experiment_name}] finished")
+                except Exception:
+                    log.exception(F"Experiment [{experiment_name}] failed")
+                    results[experiment_name] = None
+                self.config_json.get("experiments").pop(experiment_name)
+        return results
+
+
+def _run_experiment_worker(experiment_name):
+    '''
+    Entry point of the worker processes used by :func:`main.run_parallel`.
+    The main instance is inherited from the parent process when the worker is forked.
+    '''
+    result = get_fork_state("autogrid_main").run_experiment(experiment_name)
+    try:
+        pickle.dumps(result)
+    except Exception as e:
+        log.warning(F"Evaluation output of experiment [{experiment_name}] can't be sent to the main process: {e}")
+        result = None
+    return result
@@ -0,0 +1,183 @@
+import logging
+import os
+
+import numpy as np
+
+from src.helpers import fork_executor, fork_state, fork_workers, get_fork_state
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# categories of elements counted by count_elements, same as the ones of action.impact_on_objects()
+ELEMENT_CATEGORIES = ("reconnections", "disconnections", "switch_line", "bus_switch", "assigned_bus",
+                      "disconnect_bus", "redispatch", "curtailment", "storage")
+
+def _attr_slices(action_space):
+    '''
+    Position of each attribute of the action vectors (`action.to_vect()`)
+    '''
+    slices = {}
+    start = 0
+    for attr_nm, size in zip(action_space.attr_list_vect, action_space.shape):
+        slices[attr_nm] = slice(start, start + int(size))
+        start += int(size)
+    return slices
+
+
+def count_elements(action_space, vectors):
+    '''
+    Count the elements each action changes, from the action vectors: the vectorized equivalent of
+    counting the elements of `action.impact_on_objects()`.
+
+    Args:
+        :action_space: the grid2op action space of the actions
+        :vectors (numpy array): one action vector (`action.to_vect()`) per row
+
+    Returns:
+        :dict: for each category of `ELEMENT_CATEGORIES`, the number of elements changed by each action
+    '''
+    vectors = np.atleast_2d(vectors)
+    slices = _attr_slices(action_space)
+    n_actions = vectors.shape[0]
+
+    def _get(attr_nm):
+        if attr_nm not in slices:
+            return np.zeros((n_actions, 0))
+        return vectors[:, slices[attr_nm]]
+
+    line_status = _get("_set_line_status")
+    topo_vect = _get("_set_topo_vect")
+    curtail = _get("_curtail")
+    return {
+        "reconnections": (line_status == 1).sum(axis=1),
+        "disconnections": (line_status == -1).sum(axis=1),
+        "switch_line": (_get("_switch_line_status") != 0).sum(axis=1),
+        "bus_switch": (_get("_change_bus_vect") != 0).sum(axis=1),
+        "assigned_bus": (topo_vect > 0).sum(axis=1),
+        "disconnect_bus": (topo_vect == -1).sum(axis=1),
+        "redispatch": (_get("_redispatch") != 0).sum(axis=1),
+        # -1 means "no curtailment"
+        "curtailment": (curtail != -1).sum(axis=1),
+        "storage": (_get("_storage_power") != 0).sum(axis=1),
+    }
+
+
+def max_elements_filter(max_elem, categories=ELEMENT_CATEGORIES):
+    '''
+    Vectorized filter keeping the actions that change at most `max_elem` elements of the `categories`
+
+    >>> a simple example:
+        build_action_space(env.action_space, action_filter=max_elements_filter(3))
+    '''
+    def _filter(counts):
+        return sum(counts[category] for category in categories) <= max_elem
+    return _filter
+
+
+def _apply_filter(action_space, vectors, action_filter):
+    if action_filter is None or vectors.shape[0] == 0:
+        return vectors
+    return vectors[np.asarray(action_filter(count_elements(action_space, vectors)), dtype=bool)]
+
+
+def _enumerate(task, sub_id, kwargs):
+    # the action space and the filter are inherited from the forked parent, never pickled
+    action_space = get_fork_state("action_space")
+    if task == "set_topo_vect":
+        actions = action_space.get_all_unitary_topologies_set(action_space, sub_id=sub_id)
+    elif task == "change_bus_vect":
+        actions = action_space.get_all_unitary_topologies_change(action_space, sub_id=sub_id)
+    elif task == "set_line_status":
+        actions = action_space.get_all_unitary_line_set(action_space)
+    elif task == "change_line_status":
+        actions = action_space.get_all_unitary_line_change(action_space)
+    elif task == "redispatch":
+        actions = action_space.get_all_unitary_redispatch(action_space, **kwargs)
+    elif task == "curtail":
+        actions = action_space.get_all_unitary_curtail(action_space, **kwargs)
+    elif task == "storage":
+        actions = action_space.get_all_unitary_storage(action_space, **kwargs)
+    else:
+        raise ValueError(F"Unknown action enumeration [{task}]")
+    if not actions:
+        return np.zeros((0, int(np.sum(action_space.shape))))
+    vectors = np.array([action.to_vect() for action in actions])
+    return _apply_filter(action_space, vectors, get_fork_state("action_filter"))
+
+
+def enumerate_actions(action_space, set_line_status=True, change_line_status=True, set_topo_vect=True,
+                      change_bus_vect=True, redispatch=True, curtail=True, storage=True, action_filter=None,
+                      n_workers=None, redispatch_kwargs=None, curtail_kwargs=None, storage_kwargs=None):
+    '''
+    Enumerate the unitary actions of an action space, as `IdToAct.init_converter` does (same arguments),
+    with the topologies enumerated substation by substation in parallel (forked) worker processes.
+    The filter is applied by the workers, on the action vectors.
+
+    Args:
+        :action_space: the grid2op action space
+        :set_line_status, change_line_status, set_topo_vect, change_bus_vect, redispatch, curtail, storage (bool):
+            kinds of actions to enumerate
+        :action_filter (callable): vectorized filter, receives the output of :func:`count_elements` and returns
+            a boolean mask of the actions to keep (see :func:`max_elements_filter`)
+        :n_workers (int): number of worker processes, by default the number of cpus
+        :redispatch_kwargs, curtail_kwargs, storage_kwargs (dict): arguments of the grid2op enumeration functions
+
+    Returns:
+        :numpy array: the action vectors, one per row, the first one is "do nothing"
+    '''
+    tasks = []
+    if set_line_status:
+        tasks.append(("set_line_status", None, {}))
+    if change_line_status:
+        tasks.append(("change_line_status", None, {}))
+    if set_topo_vect:
+        tasks += [("set_topo_vect", sub_id, {}) for sub_id in range(action_space.n_sub)]
+    if change_bus_vect:
+        tasks += [("change_bus_vect", sub_id, {}) for sub_id in range(action_space.n_sub)]
+    if redispatch:
+        tasks.append(("redispatch", None, redispatch_kwargs or {}))
+    if curtail:
+        tasks.append(("curtail", None, curtail_kwargs or {}))
+    if storage:
+        tasks.append(("storage", None, storage_kwargs or {}))
+
+    n_workers = min(fork_workers(n_workers, "Parallel action enumeration"), max(len(tasks), 1))
+    with fork_state(action_space=action_space, action_filter=action_filter):
+        if n_workers > 1:
+            log.info(F"Enumerating actions with [{n_workers}] worker processes")
+            with fork_executor(n_workers) as executor:
+                chunks = list(executor.map(_enumerate, *zip(*tasks)))
+        else:
+            chunks = [_enumerate(*task) for task in tasks]
+
+    do_nothing = action_space({}).to_vect().reshape(1, -1)
+    vectors = np.concatenate([do_nothing] + [chunk.reshape(-1, do_nothing.shape[1]) for chunk in chunks])
+    log.debug(F"Enumerated [{vectors.shape[0]}] actions")
+    return vectors
+
+
+def build_action_space(action_space, save_path=None, file_name="filtered_actions", **enumerate_kwargs):
+    '''
+    Enumerate (and filter) the actions with :func:`enumerate_actions` and save them as a `.npy` file that can be
+    loaded by `IdToAct.init_converter(all_actions=...)`.
+
+    >>> a simple example:
+        vectors = build_action_space(env.action_space, save_path, action_filter=max_elements_filter(3))
+        converter = IdToAct(env.action_space)
+        converter.init_converter(all_actions=vectors)
+
+    Args:
+        :action_space: the grid2op action space
+        :save_path (string): folder of the `.npy` file, nothing is saved if None
+        :file_name (string): name of the file, without the extension
+        :enumerate_kwargs: arguments of :func:`enumerate_actions`
+
+    Returns:
+        :numpy array: the action vectors
+    '''
+    vectors = enumerate_actions(action_space, **enumerate_kwargs)
+    if save_path is not None:
+        os.makedirs(save_path, exist_ok=True)
+        np.save(os.path.join(save_path, F"{file_name}.npy"), vectors)
+        log.debug(F"Saved [{vectors.shape[0]}] actions in [{os.path.join(save_path, file_name)}.npy]")
+    return vectors
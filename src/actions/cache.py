@@ -0,0 +1,119 @@
+import contextlib
+import inspect
+import logging
+import os
+
+import numpy as np
+
+from src.actions.builder import enumerate_actions
+from src.constants import AUTOGRID_PATH
+from src.helpers import fingerprint, qualified_name
+
+try:
+    import fcntl
+except ImportError:  # not available on windows
+    fcntl = None
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+DEFAULT_CACHE_PATH = os.path.join(AUTOGRID_PATH, "autogrid_cache", "action_spaces")
+
+
+class ActionSpaceCache(object):
+    '''
+    Cache of enumerated action spaces (see :func:`src.actions.builder.enumerate_actions`) shared by all the
+    experiments, agents and processes of a machine.
+
+    An action space is identified by the environment name, the grid, the action class, the filter (its name and
+    its source code) and the enumeration arguments. It is enumerated once and stored as a `.npy` file, then each
+    process loads the action vectors from it. A missing action space is computed by only one process, under a
+    file lock, the others wait for it.
+
+    >>> cache layout:
+        <path>/<key>.npy
+        <path>/<key>.lock
+
+    >>> a simple example:
+        actions = ActionSpaceCache().get(env.action_space, action_filter=max_elements_filter(3))
+        converter = IdToAct(env.action_space)
+        converter.init_converter(all_actions=actions)
+    '''
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        '''
+        Args:
+            :path (string): folder of the cache
+        '''
+        self.path = path
+
+    @staticmethod
+    def key(action_space, action_filter=None, **enumerate_kwargs):
+        '''
+        Key of an action space in the cache
+
+        Args:
+            :action_space: the grid2op action space
+            :action_filter (callable): vectorized filter given to :func:`enumerate_actions`
+            :enumerate_kwargs: other arguments of :func:`enumerate_actions`
+
+        Returns:
+            :String: the key
+        '''
+        filter_source = None
+        if action_filter is not None:
+            try:
+                filter_source = inspect.getsource(action_filter)
+            except (OSError, TypeError):
+                filter_source = qualified_name(action_filter)
+        enumerate_kwargs.pop("n_workers", None)
+        return fingerprint({
+            "env_name": getattr(action_space, "env_name", None),
+            "grid": action_space.cls_to_dict(),
+            "action_class": getattr(action_space, "actionClass", None),
+            "filter": action_filter,
+            "filter_source": filter_source,
+            "enumerate_kwargs": enumerate_kwargs,
+        })
+
+    def file_path(self, key):
+        return os.path.join(self.path, F"{key}.npy")
+
+    @contextlib.contextmanager
+    def _lock(self, key):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, F"{key}.lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, action_space, action_filter=None, **enumerate_kwargs):
+        '''
+        Get the action vectors of an action space, enumerating them if they are not in the cache
+
+        Args:
+            :action_space: the grid2op action space
+            :action_filter (callable): vectorized filter given to :func:`enumerate_actions`
+            :enumerate_kwargs: other arguments of :func:`enumerate_actions`
+
+        Returns:
+            :numpy array: the action vectors, one per row
+        '''
+        key = self.key(action_space, action_filter=action_filter, **enumerate_kwargs)
+        file_path = self.file_path(key)
+        if not os.path.exists(file_path):
+            with self._lock(key):
+                # another process may have computed it while this one was waiting for the lock
+                if not os.path.exists(file_path):
+                    log.info(F"Action space [{key}] not in the cache, enumerating it")
+                    vectors = enumerate_actions(action_space, action_filter=action_filter, **enumerate_kwargs)
+                    tmp_path = F"{file_path}.{os.getpid()}.tmp"
+                    with open(tmp_path, "wb") as f:
+                        np.save(f, vectors)
+                    os.replace(tmp_path, file_path)
+        log.debug(F"Loading action space [{key}] from the cache")
+        return np.load(file_path)
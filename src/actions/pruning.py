@@ -0,0 +1,176 @@
+import argparse
+import logging
+import os
+
+import numpy as np
+
+from src.constants import AUTOGRID_PATH
+from src.envs.env_spec import EnvSpec
+from src.helpers import fork_executor, fork_workers, get_fork_state
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+DEFAULT_ENV_PATH = os.path.join(AUTOGRID_PATH, "src", "evaluators", "L2RPN2022_Data")
+BACKENDS = ("lightsim", "pandapower")
+
+
+def _env_spec(env):
+    '''
+    EnvSpec of the environment to replay: `env` itself, or grid2op.make of an environment name or path
+    '''
+    if isinstance(env, EnvSpec):
+        return env
+    import grid2op
+    return EnvSpec(grid2op.make, env)
+
+
+def _backend_class(backend):
+    '''
+    Backend class of a name of :data:`BACKENDS`
+    '''
+    if backend == "lightsim":
+        from lightsim2grid import LightSimBackend
+        return LightSimBackend
+    from grid2op.Backend import PandaPowerBackend
+    return PandaPowerBackend
+
+
+def _simulated_score(g2op_obs, action):
+    '''
+    Score of an action: minus the highest simulated flow (rho), -inf if the action ends the episode
+    '''
+    try:
+        sim_obs, _, sim_done, _ = g2op_obs.simulate(action)
+    except Exception:
+        return -np.inf
+    if sim_done:
+        return -np.inf
+    return -float(sim_obs.rho.max())
+
+
+def _score_chunk(indices):
+    '''
+    Scores of a chunk of the actions, on the observation inherited from :func:`_score_actions`
+    '''
+    g2op_obs = get_fork_state("pruning_obs")
+    actions = get_fork_state("pruning_actions")
+    return [_simulated_score(g2op_obs, actions[index]) for index in indices]
+
+
+def _score_actions(g2op_obs, actions, n_workers):
+    '''
+    Scores of all the actions on an observation. With several workers the actions are split in chunks, each one
+    simulated by a process forked with the current state of the environment.
+    '''
+    if n_workers == 1:
+        return np.array([_simulated_score(g2op_obs, action) for action in actions])
+    chunks = np.array_split(np.arange(len(actions)), n_workers)
+    with fork_executor(n_workers, pruning_obs=g2op_obs, pruning_actions=actions) as executor:
+        return np.concatenate([np.asarray(scores, dtype=float) for scores in executor.map(_score_chunk, chunks)])
+
+
+def _replay_scenario(env, actions, scenario_id, rho_threshold, tolerance, max_steps, n_workers):
+    '''
+    Replay a scenario and count, for each action, how many times it was the best (or near best) one in the
+    states with a high flow. The best action is played, do nothing is played in the other states.
+    '''
+    do_nothing = env.action_space()
+    counts = np.zeros(len(actions), dtype=np.int64)
+    env.set_id(scenario_id)
+    g2op_obs = env.reset()
+    done = False
+    step = 0
+    while not done and (max_steps is None or step < max_steps):
+        action = do_nothing
+        if g2op_obs.rho.max() >= rho_threshold:
+            scores = _score_actions(g2op_obs, actions, n_workers)
+            best = int(np.argmax(scores))
+            if np.isfinite(scores[best]):
+                counts[scores >= scores[best] - tolerance] += 1
+                action = actions[best]
+        g2op_obs, _, done, _ = env.step(action)
+        step += 1
+    log.debug(F"Scenario [{scenario_id}] replayed for [{step}] steps, [{np.count_nonzero(counts)}] useful actions")
+    return counts
+
+
+def prune_action_space(env, vectors, rho_threshold=0.95, tolerance=0.02, max_steps=None, scenarios=None,
+                       n_workers=None, backend_class=False):
+    '''
+    Keep the actions that were ever the best (or near the best) action in the states with a high flow of the
+    scenarios of an environment. The scenarios are replayed one after the other, and in each state the actions are
+    simulated in parallel: one (forked) worker process per chunk of the actions.
+
+    Args:
+        :env (EnvSpec or string): the environment, an :class:`src.envs.env_spec.EnvSpec` or the name or path of a
+            grid2op environment, for example the bundled L2RPN2022 data
+        :vectors (numpy array): the action vectors (`action.to_vect()`) of the action space to prune,
+            for example from :class:`src.actions.cache.ActionSpaceCache`
+        :rho_threshold (float): the actions are simulated when the highest flow (rho) is at least this value
+        :tolerance (float): an action is near the best one if its simulated highest flow is at most `tolerance`
+            above the best one
+        :max_steps (int): maximum number of steps per scenario, None to play the whole scenarios
+        :scenarios (list): ids of the scenarios to replay, all the scenarios of the environment if None
+        :n_workers (int): number of worker processes, by default the number of cpus
+        :backend_class (class): backend class given to :func:`EnvSpec.make`, if the spec has no backend
+
+    Returns:
+        :numpy array: the kept action vectors, do nothing first
+        :numpy array: the number of times each action of `vectors` was the best or near the best
+
+    >>> a simple example:
+        kept, counts = prune_action_space(EnvSpec(grid2op.make, "l2rpn_wcci_2022"), vectors,
+                                          backend_class=LightSimBackend)
+    '''
+    vectors = np.asarray(vectors)
+    env = _env_spec(env).make(backend_class)
+    try:
+        actions = [env.action_space.from_vect(vector) for vector in vectors]
+        if scenarios is None:
+            scenarios = list(range(len(env.chronics_handler.real_data.subpaths)))
+        n_workers = min(fork_workers(n_workers, "Parallel pruning"), len(actions))
+
+        log.info(F"Pruning [{vectors.shape[0]}] actions over [{len(scenarios)}] scenarios with [{n_workers}] workers")
+        counts = sum(_replay_scenario(env, actions, scenario_id, rho_threshold, tolerance, max_steps, n_workers)
+                     for scenario_id in scenarios)
+    finally:
+        env.close()
+
+    counts = np.asarray(counts)
+    # do nothing (the first action of the enumerated action spaces) is always kept
+    keep = counts > 0
+    keep[0] = True
+    log.info(F"Kept [{int(keep.sum())}] actions out of [{vectors.shape[0]}]")
+    return vectors[keep], counts
+
+
+def create_pruning_argparse():
+    parser = argparse.ArgumentParser(description='Prune an action space by replaying the scenarios of an environment.')
+    parser.add_argument('actions', help='.npy file with the action vectors to prune (for example filtered_actions.npy)')
+    parser.add_argument('--env', dest='env_name', default=DEFAULT_ENV_PATH,
+                        help='Name or path of the grid2op environment, by default the bundled L2RPN2022 data')
+    parser.add_argument('--backend', dest='backend', choices=BACKENDS, default="lightsim",
+                        help='Backend of the grid2op environment')
+    parser.add_argument('--output', dest='output', default="pruned_actions.npy",
+                        help='.npy file of the pruned action vectors, it can be loaded by create_action_space')
+    parser.add_argument('--rho', dest='rho_threshold', type=float, default=0.95,
+                        help='Highest flow (rho) from which the actions are simulated')
+    parser.add_argument('--tolerance', dest='tolerance', type=float, default=0.02,
+                        help='Actions whose simulated highest flow is at most this value above the best one are kept')
+    parser.add_argument('--max-steps', dest='max_steps', type=int, default=None,
+                        help='Maximum number of steps per scenario')
+    parser.add_argument('--jobs', dest='jobs', type=int, default=None,
+                        help='Number of worker processes, by default the number of cpus')
+    return parser
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = create_pruning_argparse().parse_args()
+    pruned, action_counts = prune_action_space(args.env_name, np.load(args.actions), rho_threshold=args.rho_threshold,
+                                               tolerance=args.tolerance, max_steps=args.max_steps,
+                                               n_workers=args.jobs, backend_class=_backend_class(args.backend))
+    np.save(args.output, pruned)
+    np.save(os.path.splitext(args.output)[0] + "_counts.npy", action_counts)
+    log.info(F"Pruned action space saved in [{args.output}]")
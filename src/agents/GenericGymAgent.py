@@ -3,6 +3,8 @@ import copy
 import inspect
 import logging
 
+import numpy as np
+
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
@@ -95,6 +97,16 @@ class GenericGymAgent(object):
         gym_act = self.get_act(observation, reward, done)
         return gym_act
 
+    def act_batch(self, observations, rewards, dones, slots=None):
+        """
+        Actions of several environments played in lockstep, with a single call to the NN model
+        (the observations are predicted one by one if they are not arrays)
+        """
+        if not all(isinstance(observation, np.ndarray) for observation in observations):
+            return [self.act(observation, reward, done) for observation, reward, done in zip(observations, rewards, dones)]
+        actions, _ = self.nn_model.predict(np.stack(observations), deterministic=False)
+        return list(actions)
+
 
     def learn(self,
           total_timesteps=1,
@@ -16,6 +16,8 @@ log.setLevel(logging.DEBUG)
 import os
 from typing import Optional
 
+import numpy as np
+
 
 class SB3AgentGrid2Op(Grid2OpGymAgent):
     """This class represents the Agent (directly usable with grid2op framework)
@@ -34,6 +36,8 @@ class SB3AgentGrid2Op(Grid2OpGymAgent):
     - `nn_type`: the type of "neural network" from stable baselines (by default PPO)
     - `nn_path`: the path where the neural network can be loaded from
     - `nn_kwargs`: the parameters used to build the neural network from scratch.
+    - `load_env`: the environment given to the neural network loaded from `nn_path` (by default `gymenv`), for
+      example the vectorized training environment
 
     Exactly one of `nn_path` and `nn_kwargs` should be provided. No more, no less.
 
@@ -120,8 +124,10 @@ class SB3AgentGrid2Op(Grid2OpGymAgent):
                  gymenv=None,
                  eval_env = None,
                  iter_num=None,
+                 load_env=None,
                  ):
         self._nn_type = nn_type
+        self._load_env = load_env
         if custom_load_dict is not None:
             self.custom_load_dict = custom_load_dict
         else:
@@ -155,6 +161,53 @@ class SB3AgentGrid2Op(Grid2OpGymAgent):
         action, _ = self.nn_model.predict(gym_obs, deterministic=False)
         return action
 
+    def get_act_batch(self, gym_obs_batch, rewards, dones):
+        """Retrieve the gym actions of several gym observations with a single call to the model.
+        Only for array observations, the other ones (dict observations) are predicted one by one.
+
+        Returns
+        -------
+        list
+            The gym action of each observation
+        """
+        if not all(isinstance(gym_obs, np.ndarray) for gym_obs in gym_obs_batch):
+            return super().get_act_batch(gym_obs_batch, rewards, dones)
+        actions, _ = self.nn_model.predict(np.stack(gym_obs_batch), deterministic=False)
+        return list(actions)
+
+    def get_top_k_acts(self, gym_obs, k):
+        """Retrieve the `k` best gym actions for the gym observation: the highest Q-values for a DQN and the
+        highest logits of the action distribution for the actor critic models (PPO, A2C).
+        Only discrete action spaces have candidates.
+
+        Parameters
+        ----------
+        gym_obs : gym observation
+            The gym observation
+        k : ``int``
+            number of actions
+
+        Returns
+        -------
+        list
+            The gym actions, the best first
+        """
+        if getattr(self._gym_act_space, "n", None) is None:
+            return []
+        import torch as th
+
+        policy = self.nn_model.policy
+        obs_tensor, _ = policy.obs_to_tensor(gym_obs)
+        with th.no_grad():
+            if hasattr(policy, "q_net"):
+                scores = policy.q_net(obs_tensor)
+            else:
+                scores = getattr(policy.get_distribution(obs_tensor).distribution, "logits", None)
+        if scores is None:
+            return []
+        scores = scores.reshape(-1)
+        return th.topk(scores, min(k, scores.shape[0])).indices.cpu().numpy().tolist()
+
     def load(self):
         """
         Load the NN model.
@@ -175,7 +228,7 @@ class SB3AgentGrid2Op(Grid2OpGymAgent):
         log.debug(F"loading agent from [{path_load}]")
         self.nn_model = self._nn_type.load(path_load,
                                            custom_objects=custom_objects,
-                                           env=self.gymenv)
+                                           env=self.gymenv if self._load_env is None else self._load_env)
 
     def build(self):
         """Create the underlying NN model from scratch.
@@ -8,8 +8,9 @@
 
 from abc import abstractmethod
 import copy
-from typing import List, Optional
+from typing import Dict, List, Optional
 
+import numpy as np
 from grid2op.Agent import BaseAgent
 from grid2op.Observation import BaseObservation
 from grid2op.Action import BaseAction
@@ -84,6 +85,8 @@ class Grid2OpGymAgent(BaseAgent):
         self._has_heuristic: bool = False
         self.gymenv: Optional[GymEnvWithHeuristics] = gymenv
         self._action_list: Optional[List] = None
+        # heuristic actions of each environment of the batched evaluation (see `act_batch`)
+        self._slot_action_lists: Dict[int, List] = {}
 
         if self.gymenv is not None and isinstance(self.gymenv, GymEnvWithHeuristics):
             self._has_heuristic = True
@@ -139,20 +142,52 @@ class Grid2OpGymAgent(BaseAgent):
         """
         pass
 
-    def clean_heuristic_actions(self, observation: BaseObservation, reward: float, done: bool) -> None:
+    def clean_heuristic_actions(self, observation: BaseObservation, reward: float, done: bool,
+                                action_list: Optional[List] = None) -> None:
         """This function allows to cure the heuristic actions.
 
         It is called at each step, just after the heuristic actions are computed (but before they are selected).
 
-        It can be used, for example, to reorder the `self._action_list` for example.
+        It can be used, for example, to reorder the pending heuristic actions. They must be modified in place.
 
         Args:
             observation (BaseObservation): The current observation
             reward (float): the current reward
             done (bool): the current flag "done"
+            action_list (list): the pending heuristic actions of the environment of the observation, `self._action_list`
+                for :func:`Grid2OpGymAgent.act`, the list of each environment for :func:`Grid2OpGymAgent.act_batch`
         """
         pass
 
+    def get_act_batch(self, gym_obs_batch, rewards, dones):
+        """
+        retrieve the actions of several gym observations from the NN model, by default one `get_act` per observation
+        """
+        return [self.get_act(gym_obs, reward, done) for gym_obs, reward, done in zip(gym_obs_batch, rewards, dones)]
+
+    def get_top_k_acts(self, gym_obs, k):
+        """Retrieve the `k` best gym actions of the policy for the gym observation, used as candidates by the
+        simulate gate of the environment (see :func:`GymEnvWithHeuristics.set_candidate_policy`).
+
+        By default the agent has no candidates.
+        """
+        return []
+
+    def _gate_inference(self):
+        """Whether the actions of the agent go through the simulate gate of the environment, only if the
+        environment was created with `gate_inference=True` (see :class:`GymEnvWithHeuristics`)
+        """
+        return self._has_heuristic and getattr(self.gymenv, "gate_inference", False)
+
+    def get_candidate_actions(self, gym_obs) -> List[BaseAction]:
+        """The grid2op actions of :func:`Grid2OpGymAgent.get_top_k_acts`, if the environment asks for top-k
+        candidates (`top_k > 0` and a simulate gate applied at inference)
+        """
+        if not self._gate_inference() or not self.gymenv.top_k:
+            return []
+        return [self.gymenv.fix_action(self._gym_act_space.from_gym(gym_act))
+                for gym_act in self.get_top_k_acts(gym_obs, self.gymenv.top_k)]
+
     def act(self, observation: BaseObservation, reward: float, done: bool) -> BaseAction:
         """This function is called to "map" the grid2op world
         into a usable format by a neural networks (for example in a format
@@ -187,7 +222,7 @@ class Grid2OpGymAgent(BaseAgent):
                 # the list of actions is empty, i querry the heuristic to see if there's something I can do
                 self._action_list = self.gymenv.heuristic_actions(observation, reward, done, {})
 
-            self.clean_heuristic_actions(observation, reward, done)
+            self.clean_heuristic_actions(observation, reward, done, self._action_list)
             if self._action_list:
                 # some heuristic actions have been selected, i select the first one
                 grid2op_act = self._action_list.pop(0)
@@ -201,5 +236,68 @@ class Grid2OpGymAgent(BaseAgent):
             # fix the action if needed (for example by limiting curtailment and storage)
             if self._has_heuristic:
                 grid2op_act = self.gymenv.fix_action(grid2op_act)
+            if self._gate_inference():
+                grid2op_act = self.gymenv.gate_action(observation, grid2op_act, self.get_candidate_actions(gym_obs))
 
         return grid2op_act
+
+    def reset_slot(self, slot):
+        """Forget the pending heuristic actions of an environment of the batched evaluation, called when it starts
+        a new episode.
+        """
+        self._slot_action_lists.pop(slot, None)
+
+    def act_batch(self, observations, rewards, dones, slots=None) -> List[BaseAction]:
+        """Batched version of :func:`Grid2OpGymAgent.act`, for several environments played in lockstep.
+
+        The heuristics are still applied environment by environment (each one has its own list of pending heuristic
+        actions), then the neural network is called once (:func:`Grid2OpGymAgent.get_act_batch`) for all the
+        environments the heuristics left to the agent.
+
+        Parameters
+        ----------
+        observations : list of BaseObservation
+            The grid2op observation of each environment
+        rewards : list of ``float``
+            The reward of each environment
+        dones : list of ``bool``
+            The flag "done" of each environment
+        slots : list of ``int``
+            Identifier of each environment, by default their position in `observations`
+
+        Returns
+        -------
+        list of BaseAction
+            The grid2op action of each environment
+        """
+        if slots is None:
+            slots = range(len(observations))
+        actions = [None] * len(observations)
+        nn_indices = []
+        for index, (slot, observation) in enumerate(zip(slots, observations)):
+            if self._has_heuristic:
+                # the pending actions are kept by environment, not in the list of `act`
+                action_list = self._slot_action_lists.get(slot, [])
+                if not action_list:
+                    action_list = self.gymenv.heuristic_actions(observation, rewards[index], dones[index], {})
+                self.clean_heuristic_actions(observation, rewards[index], dones[index], action_list)
+                if action_list:
+                    actions[index] = action_list.pop(0)
+                self._slot_action_lists[slot] = action_list
+            if actions[index] is None:
+                nn_indices.append(index)
+
+        if nn_indices:
+            # copies: the observation space may reuse its buffer between conversions
+            gym_obs_batch = [np.array(self._gym_obs_space.to_gym(observations[index])) for index in nn_indices]
+            gym_acts = self.get_act_batch(gym_obs_batch, [rewards[index] for index in nn_indices],
+                                          [dones[index] for index in nn_indices])
+            for index, gym_obs, gym_act in zip(nn_indices, gym_obs_batch, gym_acts):
+                grid2op_act = self._gym_act_space.from_gym(gym_act)
+                if self._has_heuristic:
+                    grid2op_act = self.gymenv.fix_action(grid2op_act)
+                if self._gate_inference():
+                    grid2op_act = self.gymenv.gate_action(observations[index], grid2op_act,
+                                                          self.get_candidate_actions(gym_obs))
+                actions[index] = grid2op_act
+        return actions
@@ -0,0 +1,91 @@
+import itertools
+import logging
+
+from grid2op.Agent import BaseAgent
+
+from src.helpers import fork_state, get_fork_state
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+_FACTORY_IDS = itertools.count()
+
+
+class RebuildableAgent(BaseAgent):
+    '''
+    Grid2op agent that can be sent to other processes (for example the processes of a grid2op Runner with
+    `nb_process > 1`) without pickling the wrapped agent: only the id of its factory is pickled, and the agent is
+    rebuilt by the factory (usually loading it from disk) the first time it is used in the new process.
+
+    The factory is inherited by the processes forked inside the `with` block (see :func:`src.helpers.fork_state`),
+    it is removed when the block exits. Each process calls the factory once: with
+    :func:`src.evaluators.evaluator.make_evaluation_worker_factory` this builds a full training environment
+    (EnvSpec, backend and gym env) per process to load the agent, so it is only worth it with `nb_process > 1`
+    (:func:`src.evaluators.evaluator.evaluate_agent` creates no factory otherwise).
+
+    >>> a simple example:
+        with evaluation_worker_factory(sb3_agent, experiment_config) as agent_factory, \
+                RebuildableAgent(sb3_agent, agent_factory) as agent:
+            scores.get(agent, path_save=path_save, nb_process=8)
+    '''
+
+    def __init__(self, agent, agent_factory):
+        '''
+        Args:
+            :agent (BaseAgent): the agent used in this process
+            :agent_factory (callable): called with no arguments in the other processes, returns the agent,
+                or an (env, agent) couple (see :func:`src.evaluators.evaluator.make_evaluation_worker_factory`)
+        '''
+        super().__init__(agent.action_space)
+        self._agent = agent
+        self._env = None
+        self._factory_key = F"agent_factory_{next(_FACTORY_IDS)}"
+        self._agent_factory = agent_factory
+        self._fork_state = None
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            agent_factory = get_fork_state(self._factory_key)
+            if agent_factory is None:
+                raise RuntimeError("The agent factory is not available in this process, RebuildableAgent needs the "
+                                   "'fork' start method and the processes must be forked inside its `with` block")
+            log.debug(F"Rebuilding the agent with [{agent_factory}]")
+            built = agent_factory()
+            if isinstance(built, tuple):
+                self._env, self._agent = built
+            else:
+                self._agent = built
+            self.action_space = self._agent.action_space
+        return self._agent
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_agent"] = None
+        state["_agent_factory"] = None
+        state["_fork_state"] = None
+        state["_env"] = None
+        state["action_space"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def reset(self, obs):
+        self.agent.reset(obs)
+
+    def seed(self, seed):
+        return self.agent.seed(seed)
+
+    def act(self, observation, reward, done=False):
+        return self.agent.act(observation, reward, done)
+
+    def __enter__(self):
+        self._fork_state = fork_state(**{self._factory_key: self._agent_factory})
+        self._fork_state.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._fork_state is not None:
+            self._fork_state.__exit__(exc_type, exc_val, exc_tb)
+            self._fork_state = None
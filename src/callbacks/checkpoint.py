@@ -0,0 +1,239 @@
+import copy
+import logging
+import os
+import pickle
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from stable_baselines3.common.callbacks import CheckpointCallback
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+def find_latest_checkpoint(save_path, name_prefix):
+    """
+    Find the newest snapshot written by a stable baselines `CheckpointCallback`:
+    "<name_prefix>_<N>_steps.zip", with its replay buffer and VecNormalize statistics if they were saved.
+
+    :param save_path: folder where the checkpoints are saved
+    :param name_prefix: name_prefix of the CheckpointCallback
+    :return: None if there is no checkpoint, otherwise a dict with:
+        "path": path to load with the "iter_num" of the agent (save_path/name_prefix),
+        "iter_num": number of timesteps of the checkpoint,
+        "replay_buffer": path of the replay buffer or None,
+        "vecnormalize": path of the VecNormalize statistics or None
+    """
+    if save_path is None or not os.path.isdir(save_path):
+        return None
+    checkpoint_regex = re.compile(r"^{}_(\d+)_steps\.zip$".format(re.escape(str(name_prefix))))
+    steps = [int(match.group(1)) for match in map(checkpoint_regex.match, os.listdir(save_path)) if match]
+    if not steps:
+        return None
+
+    iter_num = max(steps)
+    replay_buffer = os.path.join(save_path, F"{name_prefix}_replay_buffer_{iter_num}_steps.pkl")
+    vecnormalize = os.path.join(save_path, F"{name_prefix}_vecnormalize_{iter_num}_steps.pkl")
+    return {
+        "path": os.path.join(save_path, str(name_prefix)),
+        "iter_num": iter_num,
+        "replay_buffer": replay_buffer if os.path.isfile(replay_buffer) else None,
+        "vecnormalize": vecnormalize if os.path.isfile(vecnormalize) else None,
+    }
+
+
+def find_resume_checkpoint(callbacks):
+    """
+    Find the newest snapshot written by the `CheckpointCallback` of a "training_kwargs.callbacks" configuration
+
+    :param callbacks: dict of callbacks configuration, as used by the agents `learn` function
+    :return: the output of :func:`find_latest_checkpoint` or None
+    """
+    for callback_name, callback_data in callbacks.items():
+        callback_class = callback_data.get("class")
+        if isinstance(callback_class, CheckpointCallback):
+            save_path, name_prefix = callback_class.save_path, callback_class.name_prefix
+        elif isinstance(callback_class, type) and issubclass(callback_class, CheckpointCallback):
+            kwargs = callback_data.get("kwargs", {})
+            save_path, name_prefix = kwargs.get("save_path"), kwargs.get("name_prefix", "rl_model")
+        else:
+            continue
+        checkpoint = find_latest_checkpoint(save_path, name_prefix)
+        if checkpoint is not None:
+            log.debug(F"Checkpoint found by callback [{callback_name}]: {checkpoint}")
+            return checkpoint
+    return None
+
+
+def snapshot_model(model):
+    """
+    In memory copy of everything `model.save` writes: the model attributes, the parameters (policy and optimizers
+    state dicts) and the pytorch variables. The copy does not share any tensor with the model, so it can be
+    serialized by another thread while the training goes on. Like `model.save`, the replay buffer is excluded.
+
+    :param model: stable baselines model
+    :return: dict with "data", "params" and "pytorch_variables", to give to :func:`write_model_snapshot`
+    """
+    from stable_baselines3.common.save_util import recursive_getattr
+
+    data = model.__dict__.copy()
+    exclude = set(model._excluded_save_params())
+    state_dicts_names, torch_variable_names = model._get_torch_save_params()
+    for torch_var in state_dicts_names:
+        exclude.add(torch_var.split(".")[0])
+    # the replay buffer is already excluded by the off policy models, never copy it
+    exclude.add("replay_buffer")
+    for param_name in exclude:
+        data.pop(param_name, None)
+
+    pytorch_variables = None
+    if torch_variable_names is not None:
+        pytorch_variables = {name: recursive_getattr(model, name) for name in torch_variable_names}
+
+    return copy.deepcopy({
+        "data": data,
+        "params": model.get_parameters(),
+        "pytorch_variables": pytorch_variables,
+    })
+
+
+def snapshot_replay_buffer(replay_buffer):
+    """
+    Copy of a replay buffer that does not share its storage with the buffer: the arrays (and the dicts of arrays of
+    the dict observations) are copied, `pos` and `full` are copied with the other attributes. The training can go on
+    filling the buffer while the copy is pickled by another thread.
+
+    :param replay_buffer: stable baselines replay buffer
+    :return: the copy, to give to :func:`write_pickle_snapshot`
+    """
+    snapshot = copy.copy(replay_buffer)
+    for name, value in vars(replay_buffer).items():
+        if isinstance(value, np.ndarray):
+            setattr(snapshot, name, value.copy())
+        elif isinstance(value, dict) and value and all(isinstance(item, np.ndarray) for item in value.values()):
+            setattr(snapshot, name, {key: item.copy() for key, item in value.items()})
+    return snapshot
+
+
+def _atomic_write(path, write_function, *args):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write_function(f, *args)
+    os.replace(tmp_path, path)
+
+
+def write_model_snapshot(path, snapshot):
+    """
+    Serialize a snapshot of :func:`snapshot_model` as a stable baselines zip file.
+    The file is written next to `path` and renamed once complete, so a reader never finds a partial checkpoint.
+
+    :param path: path of the zip file
+    :param snapshot: output of :func:`snapshot_model`
+    """
+    from stable_baselines3.common.save_util import save_to_zip_file
+
+    _atomic_write(path, lambda f: save_to_zip_file(f, data=snapshot["data"], params=snapshot["params"],
+                                                   pytorch_variables=snapshot["pytorch_variables"]))
+
+
+def write_pickle_snapshot(path, obj):
+    """
+    Pickle an object (for example the replay buffer), with the same atomic rename as :func:`write_model_snapshot`
+    """
+    from stable_baselines3.common.save_util import save_to_pkl
+
+    _atomic_write(path, lambda f: save_to_pkl(f, obj))
+
+
+def write_bytes_snapshot(path, data):
+    """
+    Write already pickled bytes, with the same atomic rename as :func:`write_model_snapshot`
+    """
+    _atomic_write(path, lambda f: f.write(data))
+
+
+class AsyncCheckpointCallback(CheckpointCallback):
+    """
+    `CheckpointCallback` that does not block the training while the checkpoint is written.
+
+    Every `save_freq` calls the model is copied in memory (with the replay buffer if `save_replay_buffer`, see
+    :func:`snapshot_replay_buffer`, and the VecNormalize statistics pickled if `save_vecnormalize`), then a background
+    thread serializes the copy and renames it into place. The training only stalls for the copy, or when the previous
+    checkpoint is still being written. The files have the same names as the ones of `CheckpointCallback`, so the
+    training can be resumed from them (see :func:`find_resume_checkpoint`).
+
+    Copying the replay buffer needs as much memory again as the buffer while the checkpoint is written.
+
+    >>> a simple example:
+        "callbacks": {
+            "save_progress": {
+                "class": AsyncCheckpointCallback,
+                "kwargs": {
+                    "save_freq": 50000,
+                    "save_path": SAVE_PATH,
+                    "name_prefix": "PPO"
+                }
+            }
+        }
+    """
+
+    def __init__(self, save_freq, save_path, name_prefix="rl_model", save_replay_buffer=False,
+                 save_vecnormalize=False, verbose=0):
+        super().__init__(save_freq, save_path, name_prefix=name_prefix, verbose=verbose)
+        # set here, older stable baselines versions of CheckpointCallback don't have these arguments
+        self.save_replay_buffer = save_replay_buffer
+        self.save_vecnormalize = save_vecnormalize
+        self._executor = None
+        self._pending = None
+
+    def _path(self, checkpoint_type="", extension="zip"):
+        file_name = F"{self.name_prefix}_{checkpoint_type}{self.num_timesteps}_steps.{extension}"
+        return os.path.join(self.save_path, file_name)
+
+    def _on_training_start(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+
+    def _on_step(self):
+        if self.n_calls % self.save_freq != 0:
+            return True
+        # at most one checkpoint is written at a time, it bounds the memory used by the snapshots
+        self.wait()
+        os.makedirs(self.save_path, exist_ok=True)
+
+        writes = [(write_model_snapshot, self._path(), snapshot_model(self.model))]
+        if self.save_vecnormalize and self.model.get_vec_normalize_env() is not None:
+            # only running statistics (the wrapped env is not pickled), small enough to be pickled here
+            writes.append((write_bytes_snapshot, self._path("vecnormalize_", "pkl"),
+                           pickle.dumps(self.model.get_vec_normalize_env())))
+        if self.save_replay_buffer and getattr(self.model, "replay_buffer", None) is not None:
+            writes.append((write_pickle_snapshot, self._path("replay_buffer_", "pkl"),
+                           snapshot_replay_buffer(self.model.replay_buffer)))
+
+        self._pending = self._executor.submit(self._write, writes)
+        return True
+
+    def _write(self, writes):
+        for write_function, path, snapshot in writes:
+            write_function(path, snapshot)
+            if self.verbose > 1:
+                print(F"Saving model checkpoint to {path}")
+            log.debug(F"Checkpoint written in [{path}]")
+
+    def wait(self):
+        """
+        Wait until the checkpoint being written (if any) is on disk. Errors of the writer are logged.
+        """
+        if self._pending is None:
+            return
+        try:
+            self._pending.result()
+        except Exception as e:
+            log.warning(F"Checkpoint could not be written: {e}")
+        self._pending = None
+
+    def _on_training_end(self):
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import time
+
+from stable_baselines3.common.callbacks import BaseCallback
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+SUMMARY_FILE = "throughput.json"
+ENV_TIMINGS = ("env_step", "heuristic", "conversion")
+
+
+class ThroughputCallback(BaseCallback):
+    """
+    Measure where the training time goes: steps per second, grid2op steps per gym step and the wall time split
+    into env step / heuristic / conversion (measured by :class:`src.envs.gymenv_heuristics.GymEnvWithHeuristics`)
+    and learner update (time spent outside of the rollouts).
+
+    Values are recorded in the stable baselines logger ("throughput/..." in tensorboard) at the end of each
+    rollout, and a summary of the whole training is written in `<save_path>/throughput.json`.
+
+    The environments report their timings in the "throughput" key of the step info. Environments that are not
+    a `GymEnvWithHeuristics` only get the steps per second and the rollout / learner times.
+
+    It is attached by :func:`src.trainner.default.train_agent` unless "throughput" is False in the training_kwargs.
+
+    >>> a simple example:
+        "training_kwargs": {
+            "total_timesteps": 100000,
+            "throughput": False  # do not record the throughput
+        }
+    """
+
+    def __init__(self, save_path=None, verbose=0):
+        """
+        :param save_path: folder of the json summary, no summary is written if None
+        :param verbose: verbosity level
+        """
+        super().__init__(verbose)
+        self.save_path = save_path
+        self._start_time = None
+        self._start_timesteps = 0
+        self._rollout_start = None
+        self._rollout_end = None
+        self._rollout_timesteps = 0
+        self._last_learner_time = 0.
+        self._learner_time = 0.
+        self._rollout_time = 0.
+        self._env_stats = self._new_env_stats()
+        self._rollout_env_stats = self._new_env_stats()
+
+    @staticmethod
+    def _new_env_stats():
+        stats = {key: 0. for key in ENV_TIMINGS}
+        stats["g2op_steps"] = 0
+        stats["reported"] = False
+        return stats
+
+    def _summary(self, wall_time, timesteps, env_stats, rollout_time, learner_time):
+        summary = {
+            "timesteps": timesteps,
+            "wall_time": wall_time,
+            "steps_per_sec": timesteps / wall_time if wall_time > 0 else 0.,
+            "rollout_time": rollout_time,
+            "learner_time": learner_time,
+        }
+        if env_stats["reported"]:
+            # the envs of a vec env run in parallel, their time is the mean time of one env
+            n_envs = self.training_env.num_envs
+            for key in ENV_TIMINGS:
+                summary[F"{key}_time"] = env_stats[key] / n_envs
+            summary["g2op_steps_per_gym_step"] = env_stats["g2op_steps"] / timesteps if timesteps > 0 else 0.
+        return summary
+
+    def _on_training_start(self):
+        self._start_time = time.perf_counter()
+        self._start_timesteps = self.num_timesteps
+
+    def _on_rollout_start(self):
+        now = time.perf_counter()
+        if self._rollout_end is not None:
+            # time between two rollouts is spent updating the model
+            self._last_learner_time = now - self._rollout_end
+            self._learner_time += self._last_learner_time
+        self._rollout_start = now
+        self._rollout_timesteps = self.num_timesteps
+        self._rollout_env_stats = self._new_env_stats()
+
+    def _on_step(self):
+        for info in self.locals.get("infos", []):
+            throughput = info.get("throughput")
+            if throughput is None:
+                continue
+            for stats in (self._env_stats, self._rollout_env_stats):
+                for key, value in throughput.items():
+                    stats[key] = stats.get(key, 0) + value
+                stats["reported"] = True
+        return True
+
+    def _on_rollout_end(self):
+        now = time.perf_counter()
+        rollout_time = now - self._rollout_start
+        self._rollout_time += rollout_time
+        self._rollout_end = now
+
+        summary = self._summary(rollout_time, self.num_timesteps - self._rollout_timesteps, self._rollout_env_stats,
+                                rollout_time, self._last_learner_time)
+        for key, value in summary.items():
+            self.logger.record(F"throughput/{key}", value)
+
+    def _on_training_end(self):
+        if self._rollout_end is not None:
+            self._learner_time += time.perf_counter() - self._rollout_end
+        summary = self._summary(time.perf_counter() - self._start_time, self.num_timesteps - self._start_timesteps,
+                                self._env_stats, self._rollout_time, self._learner_time)
+        log.info(F"Training throughput: {summary}")
+        if self.save_path is not None:
+            os.makedirs(self.save_path, exist_ok=True)
+            with open(os.path.join(self.save_path, SUMMARY_FILE), "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=4)
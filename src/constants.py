@@ -1,6 +1,11 @@
+import os
+
 '''
 '''
 
+# root of the repository, the default paths are relative to it
+AUTOGRID_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 EVALUATION_DEFAULT="DEFAULT"
 EVALUATION_L2RPN="L2RPN2022"
 EVALUATION_L2RPN2022="L2RPN2022"
@@ -0,0 +1,127 @@
+import logging
+
+from src.helpers import UnfingerprintableError
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+class EnvPool(object):
+    '''
+    Pool of environments reused between experiments that use the same environment definition.
+
+    Environments are identified by the fingerprint of their :class:`src.envs.env_spec.EnvSpec`
+    (env_class + env_args + env_kwargs). Released environments are kept alive (at most `max_size` of them,
+    the least recently used ones are closed first) and are reset to a clean state before being handed out again:
+    they are seeded again and their chronics are rewound, so they behave like a new environment of the spec.
+    Pooled environments are always seeded, with the seed of the experiment or, if it has none, with a seed derived
+    from the fingerprint of the spec.
+
+    >>> a simple example:
+        "core": {
+            "env_pool": 2
+        },
+
+        0 (the default) disables the pool: every environment is closed once its experiment ends.
+        Specs whose arguments can't be fingerprinted (see :func:`src.helpers.fingerprint`) are never pooled.
+    '''
+
+    def __init__(self, max_size=0):
+        '''
+        Args:
+            :max_size (int): maximum number of idle environments kept alive
+        '''
+        self.max_size = max_size
+        self._idle = []  # list of (fingerprint, env), the least recently used first
+        self._in_use = {}  # id(env) -> fingerprint
+
+    def acquire(self, env_spec, backend_class=False, seed=None):
+        '''
+        Get an environment for the spec, reusing a pooled one if available
+
+        Args:
+            :env_spec (EnvSpec): definition of the environment
+            :backend_class (class): backend class given to :func:`EnvSpec.make`
+            :seed (int): seed of the environment, if None a pooled environment gets the seed derived from its spec
+                and a new environment that can't be pooled is not seeded
+
+        Returns:
+            :the environment
+        '''
+        key = None
+        if self.max_size > 0:
+            try:
+                key = env_spec.fingerprint(backend_class)
+            except UnfingerprintableError as e:
+                log.warning(F"Environment of [{env_spec}] can't be pooled: {e}")
+        if seed is None and key is not None:
+            seed = self.spec_seed(key)
+        env = None
+        for index in range(len(self._idle) - 1, -1, -1):
+            if key is not None and self._idle[index][0] == key:
+                env = self._idle.pop(index)[1]
+                break
+
+        if env is None:
+            env = env_spec.make(backend_class)
+            if seed is not None and hasattr(env, "seed"):
+                env.seed(seed)
+        else:
+            log.info(F"Reusing pooled environment [{env}]")
+            self.reset_env(env, seed)
+        if key is not None:
+            self._in_use[id(env)] = key
+        return env
+
+    @staticmethod
+    def spec_seed(key):
+        '''
+        Seed of the pooled environments of a spec that have no seed
+
+        Args:
+            :key (string): the fingerprint of the spec
+
+        Returns:
+            :int: a seed derived from the fingerprint
+        '''
+        return int(key[:7], 16)
+
+    def release(self, env):
+        '''
+        Give back an environment to the pool. Environments that were not created by the pool are closed.
+
+        Args:
+            :env: the environment
+        '''
+        key = self._in_use.pop(id(env), None)
+        if key is None or self.max_size <= 0:
+            env.close()
+            return
+        self._idle.append((key, env))
+        while len(self._idle) > self.max_size:
+            _, old_env = self._idle.pop(0)
+            log.debug(F"Closing least recently used pooled environment [{old_env}]")
+            old_env.close()
+
+    @staticmethod
+    def reset_env(env, seed=None):
+        '''
+        Bring a used environment back to the state of a new one: it is seeded and its chronics are rewound.
+        The episode is not reset, the experiment resets it like the one of a new environment.
+
+        Args:
+            :env: the environment
+            :seed (int): new seed of the environment, if None the seed is not changed
+        '''
+        if seed is not None and hasattr(env, "seed"):
+            env.seed(seed)
+        if hasattr(env, "chronics_handler"):
+            env.chronics_handler.reset()
+
+    def close(self):
+        '''
+        Close all the idle environments of the pool
+        '''
+        for _, env in self._idle:
+            env.close()
+        self._idle = []
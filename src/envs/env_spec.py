@@ -0,0 +1,75 @@
+import inspect
+import logging
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+class EnvSpec(object):
+    '''
+    Lazy environment definition: the factory used to create the environment plus its arguments.
+
+    The environment is only created when :func:`EnvSpec.make` is called (when the experiment starts),
+    so a configuration file can be imported without building its environment, and every experiment
+    or worker process can build its own instance from the same definition.
+
+    >>> a simple example:
+        "env": {
+            "env": EnvSpec(grid2op.make, "l2rpn_wcci_2022", difficulty="competition", backend=LightSimBackend),
+            "gymenv_class": GymEnv
+        }
+
+        It is equivalent to the "env_class", "env_args" and "env_kwargs" keys of the env configuration.
+    '''
+
+    def __init__(self, env_class, *env_args, **env_kwargs):
+        '''
+        Args:
+            :env_class (class or function): factory used to create the environment, for example grid2op.make
+            :env_args: positional arguments of the factory
+            :env_kwargs: keyword arguments of the factory.
+                If "backend" is a class (or function) a new backend is created each time the env is made.
+        '''
+        self.env_class = env_class
+        self.env_args = list(env_args)
+        self.env_kwargs = dict(env_kwargs)
+
+    def make(self, backend_class=False):
+        '''
+        Create a new environment
+
+        Args:
+            :backend_class (class): backend class to use if the env_kwargs does not define a backend class
+
+        Returns:
+            :the new environment
+        '''
+        env_kwargs = dict(self.env_kwargs)
+        backend = env_kwargs.get("backend", False)
+        if backend and (inspect.isclass(backend) or inspect.isfunction(backend)):
+            log.debug(F"Creating backend [{backend}]")
+            env_kwargs["backend"] = backend()
+        elif backend_class and (inspect.isclass(backend_class) or inspect.isfunction(backend_class)):
+            env_kwargs["backend"] = backend_class()
+        elif backend:
+            log.warning(F"Backend instance [{backend}] is shared by every environment made from this spec, "
+                        F"use the backend class instead")
+
+        log.debug(F'Creating a new environment using {self.env_class}({self.env_args, env_kwargs})')
+        return self.env_class(*self.env_args, **env_kwargs)
+
+    def fingerprint(self, backend_class=False):
+        '''
+        Stable hash of the spec, two specs with the same fingerprint make equivalent environments
+
+        Args:
+            :backend_class (class): backend class given to :func:`EnvSpec.make`
+
+        Returns:
+            :String: the fingerprint of the spec
+        '''
+        from src.helpers import fingerprint
+        return fingerprint({"spec": self, "backend_class": backend_class})
+
+    def __repr__(self):
+        return F"EnvSpec({self.env_class}, *{self.env_args}, **{self.env_kwargs})"
@@ -6,6 +6,7 @@
 # SPDX-License-Identifier: MPL-2.0
 # This file is part of L2RPN Baselines, L2RPN Baselines a repository to host baselines for l2rpn competitions.
 
+import time
 from abc import abstractmethod
 from typing import Tuple, Dict, List
 import numpy as np
@@ -14,6 +15,8 @@ from grid2op.Observation import BaseObservation
 from grid2op.Action import BaseAction
 from grid2op.gym_compat import GymEnv
 
+from src.envs.simulate_gate import ParallelSimulateGate, SimulateGate
+
 
 class GymEnvWithHeuristics(GymEnv):
     """This abstract class is used to perform some actions, independantly of a RL
@@ -52,12 +55,46 @@ class GymEnvWithHeuristics(GymEnv):
 
     The agent then only "sees" what is not processed by the heuristic. It is trained only on the relevant "state".
 
+    With `merge_reco=True`, the powerlines returned by :func:`GymEnvWithHeuristics.reconnection_actions` are
+    reconnected together (as many per action as allowed by the `MAX_LINE_STATUS_CHANGED` parameter of the
+    environment) instead of one grid2op step per powerline.
+
+    With `simulate_gate=True`, the action of the agent is played only if its simulated reward is at least the one
+    of doing nothing (see :class:`src.envs.simulate_gate.SimulateGate` and :func:`GymEnvWithHeuristics.gate_action`).
+    Doing nothing is simulated once per observation handed to the agent, in `step` and `reset`.
+    With `top_k > 0` the `top_k` best actions of the policy (see :func:`GymEnvWithHeuristics.set_candidate_policy`)
+    are simulated too and the best one is played, and with `simulate_workers > 1` the simulations run in
+    forked processes (see :class:`src.envs.simulate_gate.ParallelSimulateGate`). The gate is only applied at
+    training time, unless `gate_inference=True`: then the agent trained with the env gates its actions too.
+
     """
     POSSIBLE_REWARD_CUMUL = ["init", "last", "sum", "max"]
 
-    def __init__(self, env_init, *args, reward_cumul="init", **kwargs):
+    def __init__(self, env_init, *args, reward_cumul="init", merge_reco=False, simulate_gate=False, top_k=0,
+                 simulate_workers=0, gate_inference=False, **kwargs):
         super().__init__(env_init, *args, **kwargs)
         self._reward_cumul = reward_cumul
+        self._merge_reco = merge_reco
+        # wall time (in seconds) and grid2op steps since the last gym step, reported in the "throughput" key of info
+        # (read by src.callbacks.throughput.ThroughputCallback)
+        self._throughput = self._new_throughput()
+        # actions used by the heuristics, built once (they must not be modified)
+        self.do_nothing_action = self.init_env.action_space({})
+        self._reco_actions = tuple(self.init_env.action_space({"set_line_status": [(line_id, +1)]})
+                                   for line_id in range(self.init_env.n_line))
+        self.simulate_gate = None
+        if simulate_gate and simulate_workers > 1:
+            self.simulate_gate = ParallelSimulateGate(self.do_nothing_action, n_workers=simulate_workers)
+        elif simulate_gate:
+            self.simulate_gate = SimulateGate(self.do_nothing_action)
+        # the inference agent (Grid2OpGymAgent) gates its actions only if asked
+        self.gate_inference = gate_inference and self.simulate_gate is not None
+        # top-k candidates of the policy also simulated by the gate, see set_candidate_policy
+        self.top_k = top_k
+        self.candidate_policy = None
+        self._last_gym_obs = None
+        # the grid2op observation handed to the agent, on which its action is gated
+        self._last_g2op_obs = None
 
         if not self._reward_cumul in type(self).POSSIBLE_REWARD_CUMUL:
             raise RuntimeError("Wrong argument for the reward_cumul parameters. "
@@ -111,6 +148,37 @@ class GymEnvWithHeuristics(GymEnv):
         """
         return []
 
+    def reconnection_actions(self, g2op_obs: BaseObservation) -> List[BaseAction]:
+        """Return the (prebuilt) actions reconnecting each powerline that is disconnected and has no cooldown.
+
+        If the env was created with `merge_reco=True`, the powerlines are grouped in actions of at most
+        `MAX_LINE_STATUS_CHANGED` powerlines, so `k` powerlines are reconnected in `ceil(k / limit)` grid2op steps.
+
+        Parameters
+        ----------
+        g2op_obs : BaseObservation
+            The grid2op observation
+
+        Returns
+        -------
+        List[BaseAction]
+            One action per powerline (or group of powerlines) to reconnect, the empty list if there is none.
+        """
+        to_reco = (g2op_obs.time_before_cooldown_line == 0) & (~g2op_obs.line_status)
+        reco_id = np.flatnonzero(to_reco)
+        if not self._merge_reco or reco_id.shape[0] <= 1:
+            return [self._reco_actions[line_id] for line_id in reco_id]
+
+        limit = max(int(self.init_env.parameters.MAX_LINE_STATUS_CHANGED), 1)
+        res = []
+        for start in range(0, reco_id.shape[0], limit):
+            chunk = reco_id[start:start + limit]
+            if chunk.shape[0] == 1:
+                res.append(self._reco_actions[chunk[0]])
+            else:
+                res.append(self.init_env.action_space({"set_line_status": [(line_id, +1) for line_id in chunk]}))
+        return res
+
     def apply_heuristics_actions(self,
                                  g2op_obs: BaseObservation,
                                  reward: float,
@@ -163,10 +231,12 @@ class GymEnvWithHeuristics(GymEnv):
         tmp_info = info
         while need_action:
             need_action = False
+            start = time.perf_counter()
             g2op_actions = self.heuristic_actions(g2op_obs, tmp_reward, done, tmp_info)
+            self._throughput["heuristic"] += time.perf_counter() - start
             for g2op_act in g2op_actions:
                 need_action = True
-                tmp_obs, tmp_reward, tmp_done, tmp_info = self.init_env.step(g2op_act)
+                tmp_obs, tmp_reward, tmp_done, tmp_info = self._g2op_step(g2op_act)
                 g2op_obs = tmp_obs
                 done = tmp_done
 
@@ -200,6 +270,67 @@ class GymEnvWithHeuristics(GymEnv):
         """
         return grid2op_action
 
+    def set_candidate_policy(self, candidate_policy):
+        """Set the function giving the best actions of the policy, simulated by the gate when `top_k > 0`.
+
+        Parameters
+        ----------
+        candidate_policy : callable
+            `candidate_policy(gym_obs, k)` returns the `k` best gym actions of the policy for the gym observation,
+            for example :func:`src.agents.Grid2OpSB3.SB3AgentGrid2Op.get_top_k_acts`
+        """
+        self.candidate_policy = candidate_policy
+
+    def candidate_actions(self, gym_obs) -> List[BaseAction]:
+        """Return the (fixed) grid2op actions of the top-k gym actions of the candidate policy, the empty list if
+        there is no candidate policy or `top_k` is 0.
+        """
+        if not self.top_k or self.candidate_policy is None or gym_obs is None:
+            return []
+        return [self.fix_action(self.action_space.from_gym(gym_act))
+                for gym_act in self.candidate_policy(gym_obs, self.top_k)]
+
+    def gate_action(self, g2op_obs, grid2op_action, candidates=()):
+        """This function is called on the (fixed) action of the agent just before it is applied at training
+        time (:func:`GymEnvWithHeuristics.step`), and at inference time (in the "GymAgent") if `gate_inference=True`.
+
+        If the env was created with `simulate_gate=True`, it replaces the action by "do nothing" when doing nothing
+        is expected to be better (see :class:`src.envs.simulate_gate.SimulateGate`). Otherwise it does nothing.
+
+        Parameters
+        ----------
+        g2op_obs : BaseObservation
+            The current observation, on which the actions are simulated
+        grid2op_action : BaseAction
+            The action of the agent
+        candidates : List[BaseAction]
+            Other actions to compare with the action of the agent (see :func:`GymEnvWithHeuristics.candidate_actions`)
+
+        Returns
+        -------
+        BaseAction
+            The action to play
+        """
+        if self.simulate_gate is None:
+            return grid2op_action
+        return self.simulate_gate.choose(g2op_obs, grid2op_action, candidates)
+
+    @staticmethod
+    def _new_throughput():
+        return {"env_step": 0., "heuristic": 0., "conversion": 0., "g2op_steps": 0}
+
+    def _g2op_step(self, g2op_act):
+        start = time.perf_counter()
+        res = self.init_env.step(g2op_act)
+        self._throughput["env_step"] += time.perf_counter() - start
+        self._throughput["g2op_steps"] += 1
+        return res
+
+    def _report_throughput(self, info):
+        info["throughput"] = self._throughput
+        self._throughput = self._new_throughput()
+        return info
+
     def step(self, gym_action):
         """This function implements the special case of the "step" function (as seen by the "gym environment") that might
         call multiple times the "step" function of the underlying "grid2op environment" depending on the
@@ -234,13 +365,27 @@ class GymEnvWithHeuristics(GymEnv):
             Other type of informations
 
         """
+        start = time.perf_counter()
         g2op_act_tmp = self.action_space.from_gym(gym_action)
+        self._throughput["conversion"] += time.perf_counter() - start
         g2op_act = self.fix_action(g2op_act_tmp)
-        g2op_obs, reward, done, info = self.init_env.step(g2op_act)
+        if self.simulate_gate is not None:
+            g2op_act = self.gate_action(self._last_g2op_obs, g2op_act, self.candidate_actions(self._last_gym_obs))
+        g2op_obs, reward, done, info = self._g2op_step(g2op_act)
         if not done:
             g2op_obs, reward, done, info = self.apply_heuristics_actions(g2op_obs, reward, done, info)
+        start = time.perf_counter()
         gym_obs = self.observation_space.to_gym(g2op_obs)
-        return gym_obs, float(reward), done, info
+        if done:
+            # the vec envs keep the terminal observation after the reset, which may reuse the buffer of the
+            # observation space (see src.envs.spaces.FastBoxGymObsSpace)
+            gym_obs = np.array(gym_obs)
+        self._throughput["conversion"] += time.perf_counter() - start
+        self._last_gym_obs = gym_obs
+        self._last_g2op_obs = g2op_obs
+        if self.simulate_gate is not None and not done:
+            self.simulate_gate.prepare(g2op_obs)
+        return gym_obs, float(reward), done, self._report_throughput(info)
 
     def reset(self, seed=None, return_info=False, options=None):
         """This function implements the "reset" function. It is called at the end of every episode and
@@ -269,12 +414,29 @@ class GymEnvWithHeuristics(GymEnv):
 
             # convert back the observation to gym
             gym_obs = self.observation_space.to_gym(g2op_obs)
+        self._last_gym_obs = gym_obs
+        self._last_g2op_obs = g2op_obs
+        if self.simulate_gate is not None:
+            self.simulate_gate.prepare(g2op_obs)
 
         if return_info:
             return gym_obs, info
         else:
             return gym_obs
 
+    def action_masks(self):
+        """Legality mask of the gym actions on the current observation (as used by the sb3-contrib maskable
+        algorithms). Only a :class:`src.envs.spaces.MaskedDiscreteActSpace` action space has a mask, None otherwise.
+        """
+        if hasattr(self.action_space, "legal_mask"):
+            return self.action_space.legal_mask(self.init_env.current_obs)
+        return None
+
+    def close(self):
+        if self.simulate_gate is not None:
+            self.simulate_gate.close()
+        super().close()
+
 
 class GymEnvWithReco(GymEnvWithHeuristics):
     """This specific type of environment with "heuristics" / "expert rules" / "expert actions" is an
@@ -301,16 +463,8 @@ class GymEnvWithReco(GymEnvWithHeuristics):
         See return values of :func:`GymEnvWithHeuristics.heuristic_actions`
         """
 
-        # computes which powerline can be reconnected
-        to_reco = (g2op_obs.time_before_cooldown_line == 0) & (~g2op_obs.line_status)
-        res = []
-        if np.any(to_reco):
-            # If I can reconnect any, I do it
-            reco_id = np.where(to_reco)[0]
-            for line_id in reco_id:
-                g2op_act = self.init_env.action_space({"set_line_status": [(line_id, +1)]})
-                res.append(g2op_act)
-        return res
+        # If I can reconnect any powerline, I do it
+        return self.reconnection_actions(g2op_obs)
 
 
 class GymEnvWithRecoWithDN(GymEnvWithHeuristics):
@@ -329,11 +483,19 @@ class GymEnvWithRecoWithDN(GymEnvWithHeuristics):
 
         Sometimes, 90% of the thermal limit is too high, sometimes it is too low.
 
+    With `skip_forecasts=True`, the forecasts are deactivated during the "do nothing" stretches (when the grid is
+    safe): the heuristic only reads `rho`, `line_status` and `time_before_cooldown_line`. They are reactivated, and the
+    observation given to the agent is rebuilt with its forecasts (used by `obs.simulate`), when the agent is asked to
+    act. Grid2op still computes the power flow and the rest of the observation at each step, so the saving is only
+    the forecasts update.
+
     """
 
-    def __init__(self, env_init, *args, reward_cumul="init", safe_max_rho=0.9, **kwargs):
+    def __init__(self, env_init, *args, reward_cumul="init", safe_max_rho=0.9, skip_forecasts=False, **kwargs):
         super().__init__(env_init, reward_cumul=reward_cumul, *args, **kwargs)
         self._safe_max_rho = safe_max_rho
+        self._skip_forecasts = skip_forecasts
+        self._forecasts_off = False
 
     def heuristic_actions(self, g2op_obs, reward, done, info) -> List[BaseAction]:
         """To match the description of the environment, this heuristic will:
@@ -351,15 +513,37 @@ class GymEnvWithRecoWithDN(GymEnvWithHeuristics):
         See return values of :func:`GymEnvWithHeuristics.heuristic_actions`
         """
 
-        to_reco = (g2op_obs.time_before_cooldown_line == 0) & (~g2op_obs.line_status)
-        res = []
-        if np.any(to_reco):
-            # reconnect something if it can be
-            reco_id = np.where(to_reco)[0]
-            for line_id in reco_id:
-                g2op_act = self.init_env.action_space({"set_line_status": [(line_id, +1)]})
-                res.append(g2op_act)
-        elif g2op_obs.rho.max() <= self._safe_max_rho:
+        # reconnect something if it can be
+        res = self.reconnection_actions(g2op_obs)
+        if not res and g2op_obs.rho.max() <= self._safe_max_rho:
             # play do nothing if there is "no problem" according to the "rule of thumb"
-            res = [self.init_env.action_space()]
+            res = [self.do_nothing_action]
         return res
+
+    def _g2op_step(self, g2op_act):
+        if self._skip_forecasts and not self._forecasts_off and g2op_act is self.do_nothing_action:
+            # a safe stretch starts, the forecasts are not needed until the agent acts again
+            self.init_env.deactivate_forecast()
+            self._forecasts_off = True
+        return super()._g2op_step(g2op_act)
+
+    def apply_heuristics_actions(self, g2op_obs, reward, done, info):
+        """Same as :func:`GymEnvWithHeuristics.apply_heuristics_actions`, without the forecasts during the safe
+        stretches if the env was created with `skip_forecasts=True`.
+        """
+        if not self._skip_forecasts:
+            return super().apply_heuristics_actions(g2op_obs, reward, done, info)
+        try:
+            g2op_obs, reward, done, info = super().apply_heuristics_actions(g2op_obs, reward, done, info)
+        finally:
+            skipped = self._forecasts_off
+            if skipped:
+                self.init_env.reactivate_forecast()
+                self._forecasts_off = False
+        if skipped and not done:
+            # the agent gets the complete observation: the cached observation of the env (returned by get_obs) is
+            # rebuilt by the observation space, which also syncs the simulation env skipped with the forecasts
+            self.init_env._last_obs = None
+            self.init_env.current_obs = self.init_env.get_obs()
+            g2op_obs = self.init_env.get_obs()
+        return g2op_obs, reward, done, info
@@ -0,0 +1,284 @@
+import logging
+import multiprocessing as mp
+import traceback
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from stable_baselines3.common.env_util import is_wrapped
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper, VecEnv
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+class _SharedBuffers(object):
+    '''
+    Observations, rewards and dones of all the workers, stored in shared memory numpy arrays
+    '''
+
+    def __init__(self, memories, obs_shape, obs_dtype, owner):
+        self._memories = memories
+        self._owner = owner
+        n_envs = obs_shape[0]
+        self.obs = np.ndarray(obs_shape, dtype=obs_dtype, buffer=memories[0].buf)
+        self.rewards = np.ndarray((n_envs,), dtype=np.float32, buffer=memories[1].buf)
+        self.dones = np.ndarray((n_envs,), dtype=np.bool_, buffer=memories[2].buf)
+
+    @classmethod
+    def create(cls, n_envs, observation_space):
+        obs_shape = (n_envs,) + tuple(observation_space.shape)
+        obs_dtype = np.dtype(observation_space.dtype)
+        sizes = [int(np.prod(obs_shape)) * obs_dtype.itemsize,
+                 n_envs * np.dtype(np.float32).itemsize,
+                 n_envs * np.dtype(np.bool_).itemsize]
+        memories = [shared_memory.SharedMemory(create=True, size=max(size, 1)) for size in sizes]
+        return cls(memories, obs_shape, obs_dtype, owner=True)
+
+    @classmethod
+    def attach(cls, names, obs_shape, obs_dtype):
+        memories = [_attach_shared_memory(name) for name in names]
+        return cls(memories, obs_shape, obs_dtype, owner=False)
+
+    def description(self):
+        return [memory.name for memory in self._memories], self.obs.shape, self.obs.dtype
+
+    def close(self):
+        del self.obs, self.rewards, self.dones
+        for memory in self._memories:
+            memory.close()
+            if self._owner:
+                memory.unlink()
+
+
+def _attach_shared_memory(name):
+    '''
+    Open a shared memory created by another process, without taking its ownership: only the process that created
+    the memory may unlink it
+    '''
+    try:
+        # python >= 3.13, the memory is not registered to the resource tracker
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # the workers started by multiprocessing share the resource tracker of the parent, where the memory is already
+    # registered: registering it again is a no-op, and the parent unregisters it when it unlinks it.
+    # A worker with its own tracker must unregister it, otherwise its tracker unlinks the memory when it exits.
+    shared_tracker = getattr(resource_tracker._resource_tracker, "_fd", None) is not None
+    memory = shared_memory.SharedMemory(name=name)
+    if not shared_tracker:
+        resource_tracker.unregister(memory._name, "shared_memory")
+    return memory
+
+
+def _worker(remote, parent_remote, env_fn_wrapper, index):
+    parent_remote.close()
+    env = None
+    buffers = None
+    while True:
+        try:
+            cmd, data = remote.recv()
+        except EOFError:
+            break
+        try:
+            # the environment is built by the first command, so an error of the env_fn is sent to the parent
+            if env is None:
+                env = env_fn_wrapper.var()
+            if cmd == "step":
+                observation, reward, done, info = env.step(data)
+                if done:
+                    # save final observation where user can get it, then reset
+                    info["terminal_observation"] = observation
+                    observation = env.reset()
+                buffers.obs[index] = observation
+                buffers.rewards[index] = reward
+                buffers.dones[index] = done
+                result = info
+            elif cmd == "reset":
+                buffers.obs[index] = env.reset()
+                result = None
+            elif cmd == "attach":
+                buffers = _SharedBuffers.attach(*data)
+                result = None
+            elif cmd == "get_spaces":
+                result = (env.observation_space, env.action_space)
+            elif cmd == "seed":
+                result = env.seed(data)
+            elif cmd == "render":
+                result = env.render(data)
+            elif cmd == "close":
+                if env is not None:
+                    env.close()
+                if buffers is not None:
+                    buffers.close()
+                remote.close()
+                break
+            elif cmd == "env_method":
+                method = getattr(env, data[0])
+                result = method(*data[1], **data[2])
+            elif cmd == "get_attr":
+                result = getattr(env, data)
+            elif cmd == "set_attr":
+                result = setattr(env, data[0], data[1])
+            elif cmd == "is_wrapped":
+                result = is_wrapped(env, data)
+            else:
+                raise NotImplementedError(F"`{cmd}` is not implemented in the worker")
+        except Exception:
+            if cmd == "close":
+                break
+            # the parent raises the error, the worker stays alive until it is closed
+            remote.send((False, traceback.format_exc()))
+            continue
+        remote.send((True, result))
+
+
+def _receive(remotes):
+    '''
+    Receive the results of the workers. The results of all of them are received before an error is raised, so the
+    pipes stay in sync
+
+    :raise RuntimeError: with the traceback of the worker, if a worker failed or died
+    '''
+    results, errors = [], []
+    for remote in remotes:
+        try:
+            success, result = remote.recv()
+        except (EOFError, ConnectionResetError):
+            success, result = False, "the worker process died"
+        if not success:
+            errors.append(result)
+        results.append(result)
+    if errors:
+        raise RuntimeError(F"SharedMemoryVecEnv worker failed:\n{errors[0]}")
+    return results
+
+
+class SharedMemoryVecEnv(VecEnv):
+    '''
+    Vectorized environment where each environment runs in its own process, like stable baselines `SubprocVecEnv`,
+    but the observations, rewards and dones are written by the workers into preallocated shared memory numpy
+    buffers. The pipe only carries the actions, the `info` dicts and the "step done" signal, so the
+    (big) observation vectors are never pickled.
+
+    Only `Box` observation spaces are supported.
+
+    :param env_fns: functions that create the environments to run in subprocesses
+    :param start_method: multiprocessing start method ("forkserver", "spawn", "fork"), by default "forkserver"
+        if available, "spawn" otherwise
+    '''
+
+    def __init__(self, env_fns, start_method=None):
+        self.waiting = False
+        self.closed = False
+        n_envs = len(env_fns)
+
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_envs)])
+        self.processes = []
+        for index, (work_remote, remote, env_fn) in enumerate(zip(self.work_remotes, self.remotes, env_fns)):
+            args = (work_remote, remote, CloudpickleWrapper(env_fn), index)
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        self.remotes[0].send(("get_spaces", None))
+        try:
+            observation_space, action_space = _receive(self.remotes[:1])[0]
+        except RuntimeError:
+            self.close()
+            raise
+        if observation_space.shape is None or len(observation_space.shape) == 0:
+            self.close()
+            raise RuntimeError(F"SharedMemoryVecEnv only supports Box observation spaces, not {observation_space}")
+
+        self._buffers = _SharedBuffers.create(n_envs, observation_space)
+        for remote in self.remotes:
+            remote.send(("attach", self._buffers.description()))
+        try:
+            _receive(self.remotes)
+        except RuntimeError:
+            self.close()
+            raise
+        log.debug(F"SharedMemoryVecEnv with [{n_envs}] workers and observation buffer {self._buffers.obs.shape}")
+        VecEnv.__init__(self, n_envs, observation_space, action_space)
+
+    def step_async(self, actions):
+        for remote, action in zip(self.remotes, actions):
+            remote.send(("step", action))
+        self.waiting = True
+
+    def step_wait(self):
+        self.waiting = False
+        infos = _receive(self.remotes)
+        return self._buffers.obs.copy(), self._buffers.rewards.copy(), self._buffers.dones.copy(), infos
+
+    def seed(self, seed=None):
+        for idx, remote in enumerate(self.remotes):
+            remote.send(("seed", seed + idx if seed is not None else None))
+        return _receive(self.remotes)
+
+    def reset(self):
+        for remote in self.remotes:
+            remote.send(("reset", None))
+        _receive(self.remotes)
+        return self._buffers.obs.copy()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.waiting:
+            self.waiting = False
+            try:
+                _receive(self.remotes)
+            except RuntimeError as e:
+                log.warning(F"Closing SharedMemoryVecEnv after a worker error: {e}")
+        for remote in self.remotes:
+            try:
+                remote.send(("close", None))
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+        for process in self.processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        if getattr(self, "_buffers", None) is not None:
+            self._buffers.close()
+            self._buffers = None
+
+    def get_images(self):
+        for pipe in self.remotes:
+            pipe.send(("render", "rgb_array"))
+        return _receive(self.remotes)
+
+    def get_attr(self, attr_name, indices=None):
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(("get_attr", attr_name))
+        return _receive(target_remotes)
+
+    def set_attr(self, attr_name, value, indices=None):
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(("set_attr", (attr_name, value)))
+        _receive(target_remotes)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(("env_method", (method_name, method_args, method_kwargs)))
+        return _receive(target_remotes)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(("is_wrapped", wrapper_class))
+        return _receive(target_remotes)
+
+    def _get_target_remotes(self, indices):
+        indices = self._get_indices(indices)
+        return [self.remotes[i] for i in indices]
@@ -0,0 +1,179 @@
+import logging
+
+from src.helpers import fork_executor, fork_workers, get_fork_state
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+class SimulateGate(object):
+    '''
+    Play an action only if it is expected to be better than doing nothing: both are simulated (`obs.simulate`)
+    and the one with the best simulated reward is played.
+
+    Simulations are cached for the current state of the grid, keyed by (env step, rho) and action, so an action
+    is simulated at most once per state. Doing nothing is simulated once per state, when the observation is handed
+    to the agent (see :func:`SimulateGate.prepare`), and this simulation is reused by every gate of the state: the
+    training env, the top-k candidates and the inference agent. A gate then only simulates the actions it compares
+    with doing nothing.
+    The gate is used by the training env (:func:`src.envs.gymenv_heuristics.GymEnvWithHeuristics.step`), and by the
+    inference agent (:func:`src.agents.grid2OpGymAgent.Grid2OpGymAgent.act`) only if the env was created with
+    `gate_inference=True`.
+
+    >>> a simple example:
+        "env": {
+            "gymenv_class": GymEnvWithRecoWithDN,
+            "gymenv_kwargs": {"simulate_gate": True}
+        }
+    '''
+
+    def __init__(self, do_nothing_action):
+        '''
+        Args:
+            :do_nothing_action (BaseAction): the do nothing action of the environment
+        '''
+        self.do_nothing_action = do_nothing_action
+        self._do_nothing_key = hash(do_nothing_action.to_vect().tobytes())
+        self._state = None
+        self._cache = {}
+
+    @staticmethod
+    def state_key(g2op_obs):
+        '''
+        Key of the state of the grid: the env step, and the flows to tell apart two episodes at the same step
+        '''
+        return g2op_obs.current_step, hash(g2op_obs.rho.tobytes())
+
+    def action_key(self, g2op_act):
+        '''
+        Key of an action in the cache, "do_nothing" for any action equal to the do nothing action
+        '''
+        if g2op_act is self.do_nothing_action:
+            return "do_nothing"
+        key = hash(g2op_act.to_vect().tobytes())
+        return "do_nothing" if key == self._do_nothing_key else key
+
+    def simulate(self, g2op_obs, g2op_act):
+        '''
+        Simulate an action on the state of the observation, the result is cached for this state
+
+        Args:
+            :g2op_obs (BaseObservation): the current observation
+            :g2op_act (BaseAction): the action to simulate
+
+        Returns:
+            :the output of `g2op_obs.simulate(g2op_act)`: (obs, reward, done, info)
+        '''
+        state = self.state_key(g2op_obs)
+        if state != self._state:
+            self._state = state
+            self._cache = {}
+        key = self.action_key(g2op_act)
+        if key not in self._cache:
+            self._cache[key] = g2op_obs.simulate(g2op_act)
+        return self._cache[key]
+
+    def prepare(self, g2op_obs):
+        '''
+        Simulate doing nothing on the state of a new observation, before the agent acts on it.
+        The env calls it when it builds the observation of the agent, the gates of this state reuse the result.
+
+        Args:
+            :g2op_obs (BaseObservation): the observation handed to the agent
+        '''
+        self.simulate(g2op_obs, self.do_nothing_action)
+
+    def simulate_many(self, g2op_obs, g2op_acts):
+        '''
+        Simulate several actions on the state of the observation
+
+        Returns:
+            :list: the simulated rewards, in the order of the actions
+        '''
+        return [self.simulate(g2op_obs, g2op_act)[1] for g2op_act in g2op_acts]
+
+    def choose(self, g2op_obs, g2op_act, candidates=()):
+        '''
+        Get the action to play: the action (`g2op_act` or one of the `candidates`) with the best simulated reward
+        if it is at least the one of doing nothing, the do nothing action otherwise.
+        Ties are won by the first action, so `g2op_act` is kept when the candidates are not better.
+
+        Args:
+            :g2op_obs (BaseObservation): the current observation
+            :g2op_act (BaseAction): the action selected by the agent
+            :candidates (list of BaseAction): other actions to consider, for example the top-k actions of the policy
+
+        Returns:
+            :BaseAction: the action to play
+        '''
+        g2op_acts = [act for act in [g2op_act, *candidates] if self.action_key(act) != "do_nothing"]
+        if not g2op_acts:
+            return self.do_nothing_action
+        rewards = self.simulate_many(g2op_obs, g2op_acts + [self.do_nothing_action])
+        best = max(range(len(g2op_acts)), key=lambda index: rewards[index])
+        if rewards[-1] > rewards[best]:
+            return self.do_nothing_action
+        return g2op_acts[best]
+
+    def close(self):
+        pass
+
+
+def _simulate_chunk(g2op_acts):
+    """
+    Simulate actions on the observation inherited from the gate (see :func:`ParallelSimulateGate.simulate_many`)
+    """
+    g2op_obs = get_fork_state("simulate_obs")
+    return [g2op_obs.simulate(g2op_act) for g2op_act in g2op_acts]
+
+
+class ParallelSimulateGate(SimulateGate):
+    '''
+    :class:`SimulateGate` that runs the simulations of the actions in parallel, on `n_workers` forked processes.
+    The processes are forked for each batch of simulations, so they inherit the live environment and the observation
+    (see :func:`src.helpers.fork_executor`) and each one simulates a chunk of the actions. Only the results are
+    pickled back: the simulated observations have no simulation environment, they can't be simulated again.
+
+    Forking costs a few milliseconds per batch, it pays off when the batch has many actions (`top_k`) and a
+    simulation is slow (large grids). Without the 'fork' start method the simulations run one after the other.
+
+    >>> a simple example:
+        "env": {
+            "gymenv_class": GymEnvWithRecoWithDN,
+            "gymenv_kwargs": {"simulate_gate": True, "top_k": 16, "simulate_workers": 4}
+        }
+    '''
+
+    def __init__(self, do_nothing_action, n_workers=2):
+        '''
+        Args:
+            :do_nothing_action (BaseAction): the do nothing action of the environment
+            :n_workers (int): number of processes
+        '''
+        super().__init__(do_nothing_action)
+        self.n_workers = fork_workers(n_workers, "ParallelSimulateGate")
+
+    def simulate_many(self, g2op_obs, g2op_acts):
+        state = self.state_key(g2op_obs)
+        if state != self._state:
+            self._state = state
+            self._cache = {}
+        keys = [self.action_key(g2op_act) for g2op_act in g2op_acts]
+        missing = {}
+        for key, g2op_act in zip(keys, g2op_acts):
+            if key not in self._cache:
+                missing[key] = g2op_act
+
+        if len(missing) == 1 or self.n_workers == 1:
+            for key, g2op_act in missing.items():
+                self._cache[key] = g2op_obs.simulate(g2op_act)
+        elif missing:
+            missing_keys = list(missing.keys())
+            chunks = [missing_keys[worker::self.n_workers] for worker in range(self.n_workers)]
+            chunks = [chunk for chunk in chunks if chunk]
+            with fork_executor(len(chunks), simulate_obs=g2op_obs) as executor:
+                results = executor.map(_simulate_chunk, [[missing[key] for key in chunk] for chunk in chunks])
+                for chunk, chunk_results in zip(chunks, results):
+                    for key, result in zip(chunk, chunk_results):
+                        self._cache[key] = result
+        return [self._cache[key][1] for key in keys]
@@ -0,0 +1,148 @@
+import logging
+
+import numpy as np
+from grid2op.gym_compat import BoxGymObsSpace, DiscreteActSpace
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+class FastBoxGymObsSpace(BoxGymObsSpace):
+    '''
+    `BoxGymObsSpace` with a faster `to_gym`: each conversion writes the attributes directly into a preallocated
+    buffer, at the position `BoxGymObsSpace` gives them, without the intermediate arrays (type conversion,
+    `subtract`, `divide`) and the final array.
+
+    The first conversion is checked against `BoxGymObsSpace.to_gym`, if they don't match the fast path is disabled.
+
+    By default the returned array is the buffer itself, which is overwritten by the next conversion: the
+    observation must be used (or copied) before the next conversion. The vectorized environments keep the terminal
+    observation of an episode after the reset: :class:`src.envs.gymenv_heuristics.GymEnvWithHeuristics` copies it,
+    with other gym environments use `copy_obs=True` to get a copy of the buffer at each conversion.
+
+    >>> a simple example:
+        "observation_space": {
+            "class": FastBoxGymObsSpace,
+            "observation_space_kwargs": {
+                "attr_to_keep": ["rho", "line_status", "thermal_limit"]
+            }
+        }
+    '''
+
+    def __init__(self, grid2op_observation_space, attr_to_keep=None, subtract=None, divide=None, functs=None,
+                 copy_obs=False, **kwargs):
+        '''
+        Args:
+            :grid2op_observation_space: same as `BoxGymObsSpace`
+            :attr_to_keep (list): same as `BoxGymObsSpace`
+            :subtract (dict): same as `BoxGymObsSpace`
+            :divide (dict): same as `BoxGymObsSpace`
+            :functs (dict): same as `BoxGymObsSpace`
+            :copy_obs (bool): return a copy of the buffer instead of the buffer itself
+        '''
+        base_kwargs = {key: value for key, value in (("attr_to_keep", attr_to_keep), ("subtract", subtract),
+                                                      ("divide", divide), ("functs", functs)) if value is not None}
+        super().__init__(grid2op_observation_space, **base_kwargs, **kwargs)
+        self._fast_subtract = subtract if subtract is not None else {}
+        self._fast_divide = divide if divide is not None else {}
+        self._fast_functs = functs if functs is not None else {}
+        self._copy_obs = copy_obs
+        self._layout = None
+        self._buffer = None
+        self._fast = True
+
+    def _write(self, grid2op_observation, attr_nm, view):
+        if attr_nm in self._fast_functs:
+            # like BoxGymObsSpace, the output of the functions is not normalized
+            view[:] = np.asarray(self._fast_functs[attr_nm][0](grid2op_observation)).reshape(-1)
+            return
+        view[:] = getattr(grid2op_observation, attr_nm).reshape(-1)
+        if attr_nm in self._fast_subtract:
+            np.subtract(view, self._fast_subtract[attr_nm], out=view, casting="unsafe")
+        if attr_nm in self._fast_divide:
+            np.divide(view, self._fast_divide[attr_nm], out=view, casting="unsafe")
+
+    def _build_layout(self, grid2op_observation):
+        # same order and positions as BoxGymObsSpace.to_gym
+        self._buffer = np.zeros(self.shape, dtype=self.dtype)
+        self._layout = []
+        start = 0
+        for attr_nm, end in zip(self._attr_to_keep, self._dims):
+            self._layout.append((attr_nm, self._buffer[start:end]))
+            start = end
+
+        expected = super().to_gym(grid2op_observation)
+        try:
+            fast_gym_obs = self._fast_to_gym(grid2op_observation)
+            self._fast = np.allclose(fast_gym_obs, expected, equal_nan=True)
+        except Exception as e:
+            log.warning(F"FastBoxGymObsSpace conversion failed: {e}")
+            self._fast = False
+        if not self._fast:
+            log.warning("FastBoxGymObsSpace conversion does not match BoxGymObsSpace, using the BoxGymObsSpace "
+                        "conversion")
+
+    def _fast_to_gym(self, grid2op_observation):
+        for attr_nm, view in self._layout:
+            self._write(grid2op_observation, attr_nm, view)
+        return self._buffer.copy() if self._copy_obs else self._buffer
+
+    def to_gym(self, grid2op_observation):
+        if self._fast and self._layout is None:
+            self._build_layout(grid2op_observation)
+        if not self._fast:
+            return super().to_gym(grid2op_observation)
+        return self._fast_to_gym(grid2op_observation)
+
+
+class MaskedDiscreteActSpace(DiscreteActSpace):
+    '''
+    `DiscreteActSpace` that gives the legality mask of the actions for an observation
+    (:func:`MaskedDiscreteActSpace.legal_mask`), computed with the powerlines and substations each action impacts,
+    and cached for the current observation.
+
+    >>> a simple example:
+        "action_space": {
+            "class": MaskedDiscreteActSpace
+        }
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lines_impacted = None
+        self._subs_impacted = None
+        self._mask_key = None
+        self._mask = None
+
+    def _build_impact(self):
+        lines_impacted, subs_impacted = [], []
+        for act_id in range(self.n):
+            lines, subs = self.from_gym(act_id).get_topological_impact()
+            lines_impacted.append(lines)
+            subs_impacted.append(subs)
+        self._lines_impacted = np.array(lines_impacted, dtype=bool)
+        self._subs_impacted = np.array(subs_impacted, dtype=bool)
+
+    def legal_mask(self, g2op_obs):
+        '''
+        Actions that can be played on the observation: the ones that don't change a powerline or a substation
+        in cooldown.
+
+        Args:
+            :g2op_obs (BaseObservation): the observation
+
+        Returns:
+            :numpy array of bool: True for the legal actions
+        '''
+        key = (g2op_obs.current_step, g2op_obs.time_before_cooldown_line.tobytes(),
+               g2op_obs.time_before_cooldown_sub.tobytes())
+        if key == self._mask_key:
+            return self._mask
+        if self._lines_impacted is None:
+            self._build_impact()
+        lines_in_cooldown = g2op_obs.time_before_cooldown_line > 0
+        subs_in_cooldown = g2op_obs.time_before_cooldown_sub > 0
+        self._mask = ~(self._lines_impacted[:, lines_in_cooldown].any(axis=1) |
+                       self._subs_impacted[:, subs_in_cooldown].any(axis=1))
+        self._mask_key = key
+        return self._mask
+
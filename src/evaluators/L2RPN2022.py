@@ -3,6 +3,9 @@ import logging
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+import atexit
+import contextlib
+import functools
 import time
 import os
 import shutil
@@ -123,7 +126,123 @@ def write_gif(output_dir, agent_path, episode_name, start_step, end_step):
     except Exception as exc_:
         print("Cannot create GIF export with error \n{}".format(exc_))
 
-def evaluate_agent(agent,save_path=False,gif_episode=None,gif_start=0,gif_end=50,cleanup=False,verbose=False):
+DEFAULT_INPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "L2RPN2022_Data")
+
+
+@functools.lru_cache(maxsize=None)
+def load_config(input_dir=DEFAULT_INPUT_DIR):
+    """
+    :param input_dir: Path to the dataset
+    :return: The L2RPN2022_config.json of the dataset, loaded once per process (it must not be modified)
+    """
+    with open(os.path.join(input_dir, "L2RPN2022_config.json"), "r") as f:
+        return json.load(f)
+
+
+def get_backend_class():
+    try:
+        from lightsim2grid import LightSimBackend
+        return LightSimBackend
+    except:
+        print(BACKEND_WARN)
+        from grid2op.Backend import PandaPowerBackend
+        return PandaPowerBackend
+
+
+class EvaluationContext(object):
+    """
+    The scoring environment of the dataset and its ScoreL2RPN2022 (with the `_statistics_*` references of the
+    dataset), built once and shared by all the agents evaluated by a process (see :func:`get_evaluation_context`).
+    """
+
+    def __init__(self, input_dir=DEFAULT_INPUT_DIR, nb_process_stats=1):
+        """
+        :param input_dir: Path to the dataset to create the environment
+        :param nb_process_stats: Number of processes computing the reference statistics (if missing)
+        """
+        self.input_dir = input_dir
+        self.nb_process_stats = nb_process_stats
+        self.config = load_config(input_dir)
+        backend_cls = get_backend_class()
+
+        # import the rewards and other things
+        other_rewards = {}
+
+        # add the other rewards to compute the real score
+        key_score = self.config.get("score_config",{}).get("key_score",{})
+        if key_score in other_rewards:
+            print(KEY_OVERLOAD_WARN.format(key_score))
+        other_rewards[key_score] = L2RPNWCCI2022ScoreFun
+
+        log.debug(F"Creating the L2RPN2022 evaluation environment from [{input_dir}]")
+        # create the real environment
+        self.real_env = grid2op.make(input_dir,
+                                     reward_class=RedispReward,
+                                     other_rewards=other_rewards,
+                                     backend=backend_cls(),
+                                     )
+
+        max_int = np.iinfo(dt_int).max
+        # env seeds are read from the json, the scenarios are played in the order of the chronics
+        self.env_seeds = [int(self.config["episodes_info"][os.path.split(el)[-1]]["seed"]) for el in
+                          sorted(self.real_env.chronics_handler.real_data.subpaths)][:int(self.config["nb_scenario"])]
+        # agent seeds are generated with the provided random seed (same sequence as np.random.seed + randint)
+        self.agent_seeds = list(np.random.RandomState(int(self.config["score_config"]["seed"]))
+                                .randint(max_int, size=int(self.config["nb_scenario"])))
+        self.scores = ScoreL2RPN2022(env=self.real_env,
+                                     env_seeds=self.env_seeds,
+                                     agent_seeds=self.agent_seeds,
+                                     nb_scenario=int(self.config["nb_scenario"]),
+                                     min_losses_ratio=float(self.config["score_config"]["min_losses_ratio"]),
+                                     verbose=0,
+                                     max_step=-1,
+                                     nb_process_stats=nb_process_stats)
+
+    def reset(self, verbose=False):
+        """
+        Bring the context back to its initial state before evaluating a new agent
+        """
+        # this is called after, so that no one can change this sequence. The agent seeds are drawn again, so the
+        # global random state is the one left by the original evaluation, which drew them from it
+        np.random.seed(int(self.config["score_config"]["seed"]))
+        np.random.randint(np.iinfo(dt_int).max, size=int(self.config["nb_scenario"]))
+        self.scores.verbose = 0 if not verbose else 2
+        self.real_env.set_id(0)
+        self.real_env.reset()
+
+    def close(self):
+        self.real_env.close()
+
+
+# evaluation contexts of this process, by dataset
+_EVALUATION_CONTEXTS = {}
+
+
+def get_evaluation_context(input_dir=DEFAULT_INPUT_DIR, nb_process_stats=1):
+    """
+    :param input_dir: Path to the dataset
+    :param nb_process_stats: Number of processes computing the reference statistics, if the context is created
+    :return: The EvaluationContext of the dataset, created on the first call
+    """
+    input_dir = os.path.abspath(input_dir)
+    if input_dir not in _EVALUATION_CONTEXTS:
+        _EVALUATION_CONTEXTS[input_dir] = EvaluationContext(input_dir, nb_process_stats=nb_process_stats)
+    elif _EVALUATION_CONTEXTS[input_dir].nb_process_stats != nb_process_stats:
+        log.warning(F"Reusing the evaluation context of [{input_dir}] created with nb_process_stats="
+                    F"{_EVALUATION_CONTEXTS[input_dir].nb_process_stats}, nb_process_stats={nb_process_stats} "
+                    F"is ignored (the reference statistics are already loaded)")
+    return _EVALUATION_CONTEXTS[input_dir]
+
+
+@atexit.register
+def close_evaluation_contexts():
+    for context in _EVALUATION_CONTEXTS.values():
+        context.close()
+    _EVALUATION_CONTEXTS.clear()
+
+
+def evaluate_agent(agent,save_path=False,gif_episode=None,gif_start=0,gif_end=50,cleanup=False,verbose=False,
+                   nb_process=1,nb_process_stats=None,agent_factory=None):
     """
     :param agent: Agent to evaluate, The agent must have been created using the L2RPN_2022 env
     :param input_dir: Path to the dataset to create the environment
@@ -133,11 +252,14 @@ def evaluate_agent(agent,save_path=False,gif_episode=None,gif_start=0,gif_end=50
     :param gif_end: int, End step for gif generation
     :param cleanup: Cleanup runner logs
     :param verbose: Verbose runner output
+    :param nb_process: Number of processes scoring the scenarios
+    :param nb_process_stats: Number of processes computing the reference statistics (if missing), nb_process by default
+    :param agent_factory: Used when nb_process > 1, each process rebuilds the agent with it instead of receiving
+        a pickled copy (see :class:`src.agents.rebuildable.RebuildableAgent`), ignored otherwise. Each process
+        pays the construction of the environment of the agent once
     :return:
     """
-    input_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "L2RPN2022_Data")
-    with open(os.path.join(input_dir, "L2RPN2022_config.json"), "r") as f:
-        config = json.load(f)
+    input_dir = DEFAULT_INPUT_DIR
 
     # create output dir if not existing
     if not os.path.exists(save_path):
@@ -146,14 +268,6 @@ def evaluate_agent(agent,save_path=False,gif_episode=None,gif_start=0,gif_end=50
     log.debug("input dir: {}".format(input_dir))
     log.debug("output dir: {}".format(save_path))
 
-    try:
-        from lightsim2grid import LightSimBackend
-        backend_cls = LightSimBackend
-    except:
-        print(BACKEND_WARN)
-        from grid2op.Backend import PandaPowerBackend
-        backend_cls = PandaPowerBackend
-
     # create the agent
     try:
         submitted_agent = agent
@@ -166,42 +280,23 @@ def evaluate_agent(agent,save_path=False,gif_episode=None,gif_start=0,gif_end=50
         print(BASEAGENT_ERR)
         raise RuntimeError(BASEAGENT_ERR)
 
-    # import the rewards and other things
-    other_rewards = {}
-
-    # add the other rewards to compute the real score
-    key_score = config.get("score_config",{}).get("key_score",{})
-    if key_score in other_rewards:
-        print(KEY_OVERLOAD_WARN.format(key_score))
-    other_rewards[key_score] = L2RPNWCCI2022ScoreFun
-
-    # create the real environment
-    real_env = grid2op.make(input_dir,
-                            reward_class=RedispReward,
-                            other_rewards=other_rewards,
-                            backend=backend_cls(),
-                            )
-
-    # this is called after, so that no one can change this sequence
-    np.random.seed(int(config["score_config"]["seed"]))
-    max_int = np.iinfo(dt_int).max
-    # env seeds are read from the json
-    env_seeds = [int(config["episodes_info"][os.path.split(el)[-1]]["seed"]) for el in
-                 sorted(real_env.chronics_handler.real_data.subpaths)]
-    # agent seeds are generated with the provided random seed
-    agent_seeds = list(np.random.randint(max_int, size=int(config["nb_scenario"])))
+    rebuildable = contextlib.nullcontext(submitted_agent)
+    if nb_process > 1 and agent_factory is not None:
+        from src.agents.rebuildable import RebuildableAgent
+        rebuildable = RebuildableAgent(submitted_agent, agent_factory)
+    elif nb_process > 1:
+        log.warning("No agent_factory given, the agent is pickled to be sent to each scoring process")
+
+    # the environment and the reference statistics are built once per process, then reused by every agent
+    context = get_evaluation_context(input_dir,
+                                     nb_process_stats=nb_process if nb_process_stats is None else nb_process_stats)
+    context.reset(verbose)
+    scores = context.scores
     path_save = os.path.abspath(save_path)
-    scores = ScoreL2RPN2022(env=real_env,
-                            env_seeds=env_seeds,
-                            agent_seeds=agent_seeds,
-                            nb_scenario=int(config["nb_scenario"]),
-                            min_losses_ratio=float(config["score_config"]["min_losses_ratio"]),
-                            verbose=0 if not verbose else 2,
-                            max_step=-1,
-                            nb_process_stats=1)
     print(STARTING_THE_EVALUATION)
     beg_ = time.perf_counter()
-    scores, n_played, total_ts = scores.get(submitted_agent, path_save=path_save, nb_process=1)
+    with rebuildable as submitted_agent:
+        scores, n_played, total_ts = scores.get(submitted_agent, path_save=path_save, nb_process=nb_process)
     res_scores = {"scores": [float(score) for score in scores],
                   "n_played": [int(el) for el in n_played],
                   "total_ts": [int(el) for el in total_ts]}
@@ -218,7 +313,6 @@ def evaluate_agent(agent,save_path=False,gif_episode=None,gif_start=0,gif_end=50
                   gif_start, gif_end)
         end_ = time.perf_counter()
         print(f"[INFO] gif writing time: {end_ - beg_:.2f}s")
-    real_env.close()
 
     if cleanup:
         cmds = [
@@ -353,9 +447,8 @@ def process_scores(agent_dir):
 
     save_all_score = True
 
-    input_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "L2RPN2022_Data")
-    with open(os.path.join(input_dir, "L2RPN2022_config.json"), "r") as f:
-        config = json.load(f)
+    input_dir = DEFAULT_INPUT_DIR
+    config = load_config(input_dir)
 
     # Fail if input doesn't exists
     if not os.path.exists(agent_dir):
@@ -4,10 +4,18 @@ log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 import os, json
+from concurrent.futures import as_completed
+import numpy as np
 import pandas as pd
 
 import matplotlib.pyplot as plt
 
+from src.evaluators.results import RESULTS_STREAM_FILE, ResultStream, read_results
+from src.helpers import fork_executor, fork_workers, get_fork_state
+
+# seed of the first evaluated episode, the episode `i` is played with the seed `DEFAULT_EVALUATION_SEED + i`
+DEFAULT_EVALUATION_SEED = 0
+
 
 def plot_score(score_list, ylabel="Reward", xlabel="Epoch (Episode)", title="", marker=".", linestyle="None",save_path=False):
     plt.plot(score_list, marker=marker, linestyle=linestyle)
@@ -37,68 +45,208 @@ def plot_score_dict(score_dict,save_path=False):
     plot_score(eplist, title=F"Episode length",ylabel="Steps",save_path=save_path)
 
 
+def _play_episode(env, agent, state, max_steps=10000, verbose=False):
+    score = 0
+    reward = 0
+    done = False
+    t = 0
+    for t in range(1, max_steps + 1):
+        action = agent.act(state, reward, done)
+        #TODO: make the render dependant of the environment used. grid2op is state.render but anm is env.render
+        #if render_step:
+        #    _ = state.render()
+        state, reward, done, info = env.step(action)
+        if verbose > 2:
+            print(F"step: {t} \t-reward: {reward} \t-done: {done}")
+        score += reward
+        if done:
+            if verbose:
+                print(F"DONE == TRUE after {t} steps. Score: {score}")
+            if verbose>1:
+                for item in info:
+                    print(F"={item}=")
+                    print(info.get(item))
+                print("==STATE==")
+                print(state)
+                print("==Action==")
+                print(action)
+                print("==Done==")
+            break
+    return score, t
+
+
+def _reset(env, seed=None):
+    if seed is not None and hasattr(env, "seed"):
+        env.seed(seed)
+    return env.reset()
+
+
+# environment and agent of a worker process, built on its first episode
+_EVAL_WORKER = None
+
+
+def _evaluate_episode_worker(i_episode):
+    global _EVAL_WORKER
+    worker_factory, max_steps, verbose, seed = get_fork_state("evaluation_args")
+    if _EVAL_WORKER is None:
+        _EVAL_WORKER = worker_factory()
+    env, agent = _EVAL_WORKER
+    state = _reset(env, None if seed is None else seed + i_episode)
+    score, steps = _play_episode(env, agent, state, max_steps, verbose)
+    return i_episode, score, steps
+
+
+def _evaluate_parallel(worker_factory, episodes, max_steps, verbose, seed, n_workers):
+    '''
+    Run the episodes in forked worker processes, each worker builds its own environment and agent with
+    `worker_factory` and plays the episodes it receives. The results are yielded as the episodes finish.
+    '''
+    with fork_executor(n_workers, evaluation_args=(worker_factory, max_steps, verbose, seed)) as executor:
+        futures = [executor.submit(_evaluate_episode_worker, i_episode) for i_episode in range(episodes)]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _evaluate_sequential(env, agent, episodes, max_steps=10000, verbose=False, seed=None):
+    for i_episode in range(0, episodes):
+        state = _reset(env, None if seed is None else seed + i_episode)
+        score, t = _play_episode(env, agent, state, max_steps, verbose)
+        yield i_episode, score, t
+
+
+def _evaluate_batched(envs, agent, episodes, max_steps=10000, verbose=False, seed=None):
+    '''
+    Play the episodes on the environments in lockstep: at each tick the agent gets the observations of all the
+    environments with a running episode (`agent.act_batch`), so the policy is called once per tick.
+    When an episode finishes its environment starts the next episode, or is masked out if there is none left.
+    The results are yielded as the episodes finish.
+    '''
+    batch_size = len(envs)
+    next_episode = 0
+    slot_episodes = [None] * batch_size
+    states = [None] * batch_size
+    rewards = np.zeros(batch_size)
+    dones = np.zeros(batch_size, dtype=bool)
+    scores = np.zeros(batch_size)
+    steps = np.zeros(batch_size, dtype=np.int64)
+    active = np.zeros(batch_size, dtype=bool)
+
+    def _start(slot):
+        nonlocal next_episode
+        active[slot] = next_episode < episodes
+        if not active[slot]:
+            return
+        slot_episodes[slot] = next_episode
+        states[slot] = _reset(envs[slot], None if seed is None else seed + next_episode)
+        rewards[slot], dones[slot], scores[slot], steps[slot] = 0, False, 0, 0
+        if hasattr(agent, "reset_slot"):
+            agent.reset_slot(slot)
+        next_episode += 1
+
+    for slot in range(batch_size):
+        _start(slot)
+    while active.any():
+        slots = np.flatnonzero(active)
+        actions = agent.act_batch([states[slot] for slot in slots], rewards[slots], dones[slots], slots=slots)
+        for slot, action in zip(slots, actions):
+            states[slot], rewards[slot], dones[slot], info = envs[slot].step(action)
+            scores[slot] += rewards[slot]
+            steps[slot] += 1
+            if verbose > 2:
+                print(F"episode: {slot_episodes[slot]} \tstep: {steps[slot]} \t-reward: {rewards[slot]} "
+                      F"\t-done: {dones[slot]}")
+            if dones[slot] or steps[slot] >= max_steps:
+                if verbose and dones[slot]:
+                    print(F"DONE == TRUE after {steps[slot]} steps. Score: {scores[slot]}")
+                yield slot_episodes[slot], float(scores[slot]), int(steps[slot])
+                _start(slot)
+
+
 def test_and_evaluate_agent(env, agent, episodes=100, max_steps=10000,
-                            plot_scores=False,save_path=False,verbose=False,render_step=False):
+                            plot_scores=False,save_path=False,verbose=False,render_step=False,
+                            n_workers=1, seed=DEFAULT_EVALUATION_SEED, worker_factory=None, batch_size=1, env_factory=None,
+                            fsync_every=10):
+    '''
+    Play `episodes` episodes of the agent and save their scores (scores.json and meanscores.pd in `save_path`)
+
+    Args:
+        :n_workers (int): number of (forked) worker processes playing the episodes, 1 plays them in this process
+        :seed (int): the episode `i` is played with the environment seeded with `seed + i`, so the scores don't
+            depend on the number of workers, the batch size or the episodes played before by the environment.
+            None keeps the random state of the environments.
+        :worker_factory (callable): needed when `n_workers > 1`, called once by each worker, returns a new
+            (env, agent) couple (see :func:`src.evaluators.evaluator.evaluate_agent`)
+        :batch_size (int): number of episodes played in lockstep in this process, with one (batched) call to the
+            policy per step (see `act_batch` of the agents). Only used when `n_workers` is 1.
+        :env_factory (callable): creates the `batch_size - 1` other environments, by default `env.copy`
+        :fsync_every (int): the scores are streamed to `save_path`/scores.jsonl as the episodes finish,
+            and synced to disk every `fsync_every` episodes (see :class:`src.evaluators.results.ResultStream`)
+    '''
+    if n_workers > 1 and worker_factory is None:
+        log.warning("Parallel evaluation needs a worker_factory, playing the episodes sequentially")
+        n_workers = 1
+    n_workers = min(fork_workers(n_workers, "Parallel evaluation"), episodes)
+    if env_factory is None and hasattr(env, "copy"):
+        env_factory = env.copy
+    if batch_size > 1 and (not hasattr(agent, "act_batch") or env_factory is None):
+        log.warning(F"Batched evaluation needs an agent with act_batch and an env_factory, "
+                    F"playing the episodes one by one")
+        batch_size = 1
+    batch_size = min(batch_size, episodes)
+
+    envs = [env]
+    if n_workers > 1:
+        log.info(F"Evaluating [{episodes} episodes] with [{n_workers}] workers")
+        results = _evaluate_parallel(worker_factory, episodes, max_steps, verbose, seed, n_workers)
+    elif batch_size > 1:
+        log.info(F"Evaluating [{episodes} episodes] in batches of [{batch_size}] environments")
+        envs += [env_factory() for _ in range(batch_size - 1)]
+        results = _evaluate_batched(envs, agent, episodes, max_steps, verbose, seed)
+    else:
+        results = _evaluate_sequential(env, agent, episodes, max_steps, verbose, seed)
 
     scores = {}  # puntuaciones de cada episodio
-
-    for i_episode in range(0, episodes):
-        state = env.reset()
-        score = 0
-        reward = 0
-        done = False
-
-        for t in range(1,max_steps+1):
-            action = agent.act(state, reward, done)
-            #TODO: make the render dependant of the environment used. grid2op is state.render but anm is env.render
-            #if render_step:
-            #    _ = state.render()
-            state, reward, done, info = env.step(action)
-            if verbose > 2:
-                print(F"step: {t} \t-reward: {reward} \t-done: {done}")
-            score += reward
-            if done:
-                if verbose:
-                    print(F"DONE == TRUE after {t} steps. Score: {score}")
-                if verbose>1:
-                    for item in info:
-                        print(F"={item}=")
-                        print(info.get(item))
-                    print("==STATE==")
-                    print(state)
-                    print("==Action==")
-                    print(action)
-                    print("==Done==")
-                break
-        scores[F"{i_episode}"] = {"score": score, "steps": t}
+    # every finished episode is written to the stream, so an interrupted evaluation keeps its results
+    stream_path = os.path.join(save_path, RESULTS_STREAM_FILE) if save_path else None
+    with ResultStream(stream_path, fsync_every=fsync_every) as stream:
+        for i_episode, score, t in results:
+            if verbose and (n_workers > 1 or batch_size > 1):
+                print(F"Episode [{i_episode}] finished. Score: {score} Steps: {t}")
+            stream.append({"episode": i_episode, "score": score, "steps": t})
+            scores[F"{i_episode}"] = {"score": score, "steps": t}
+    for extra_env in envs[1:]:
+        extra_env.close()
+    # keep the episode order of the sequential evaluation
+    scores = {F"{i_episode}": scores[F"{i_episode}"] for i_episode in range(episodes)}
     log.debug(scores)
-    df = pd.DataFrame.from_dict(scores,orient='index')
-    log.info(F"Mean Scores over [{episodes} episodes] : \n{df.mean()}")
-    print(F"Mean score over [{episodes} episodes] : \n{df.mean()}")
+    mean_scores = stream.mean()
+    log.info(F"Mean Scores over [{episodes} episodes] : \n{mean_scores}")
+    print(F"Mean score over [{episodes} episodes] : \n{mean_scores}")
     if plot_scores:
         plot_score_dict(scores,save_path)
     if save_path:
-        if not os.path.exists(save_path):
-            os.makedirs(save_path)
         with open(F'{os.path.join(save_path,"scores.json")}', 'w') as scoreFile:
             print(json.dumps(scores, indent=4), file=scoreFile)
         with open(F'{os.path.join(save_path,"meanscores.pd")}', 'w') as scoreFile:
-            print(df.mean(), file=scoreFile)
+            print(mean_scores, file=scoreFile)
 
     return scores
 
 
 def pandas_from_score_dict(score_dict):
-    jsons_data = pd.DataFrame(columns=['score', 'steps'])
-
-    for index in score_dict:
-        dat = score_dict.get(index)
+    return pd.DataFrame.from_dict(score_dict, orient="index", columns=['score', 'steps'])
 
-        score = dat.get("score")
-        steps = dat.get("steps")
 
-        jsons_data.loc[index] = [score, steps]
-    return jsons_data
+def pandas_from_score_stream(path):
+    '''
+    Scores of a result stream (scores.jsonl) written by :func:`test_and_evaluate_agent`, indexed by episode
+    like :func:`pandas_from_score_dict`
+    '''
+    df = read_results(path)
+    if df.empty:
+        return pd.DataFrame(columns=['score', 'steps'])
+    df.index = df["episode"].astype(str)
+    return df[['score', 'steps']]
 
 
 def get_mean_of_score_dict(score_dict):
@@ -108,23 +256,20 @@ def get_mean_of_score_dict(score_dict):
 if __name__ == "__main__":
 
     path_to_json = './scores'
-    json_files = [pos_json for pos_json in os.listdir(path_to_json) if pos_json.endswith('.json')]
+    json_files = [pos_json for pos_json in os.listdir(path_to_json) if pos_json.endswith(('.json', '.jsonl'))]
 
     dataframes = {}
     for file_index, js in enumerate(json_files):
-        jsons_data = pd.DataFrame(columns=['Agent', 'Score (Reward sum before failure)', 'Steps before failure'])
         agent_name = js.rpartition("_scores")[0]
-        with open(os.path.join(path_to_json, js)) as json_file:
-
-            json_text = json.load(json_file)
-            for index in json_text:
-                dat = json_text.get(index)
-                # here you need to know the layout of your json and each json has to have
-                # the same structure (obviously not the structure I have here)
-                score = dat.get("score")
-                steps = dat.get("steps")
-                # here I push a list of data into a pandas DataFrame at row given by 'index'
-                jsons_data.loc[index] = [agent_name, score, steps]
+        if js.endswith('.jsonl'):
+            # result stream written while evaluating (see src.evaluators.results.ResultStream)
+            jsons_data = pandas_from_score_stream(os.path.join(path_to_json, js))
+        else:
+            with open(os.path.join(path_to_json, js)) as json_file:
+                jsons_data = pandas_from_score_dict(json.load(json_file))
+        jsons_data = jsons_data.rename(columns={"score": 'Score (Reward sum before failure)',
+                                                "steps": 'Steps before failure'})
+        jsons_data.insert(0, 'Agent', agent_name)
         dataframes[agent_name] = jsons_data
 
     Metrics = pd.DataFrame(columns=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'])
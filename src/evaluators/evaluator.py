@@ -1,12 +1,85 @@
+import contextlib
+import functools
 import logging
 import os
 import inspect
+import tempfile
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 from src import constants
 
+
+def make_evaluation_worker_factory(agent, experiment_config, save_path):
+    '''
+    Factory of the (env, agent) couples of the parallel evaluation workers: each worker creates its own
+    environment from the EnvSpec of the experiment and loads the agent with the agent maker of the experiment.
+    An agent loaded from disk and not trained is loaded from its "load_path", otherwise it is saved in `save_path`
+    by this function: the folder must exist until the end of the evaluation (see :func:`evaluation_worker_factory`).
+
+    Args:
+        :agent: the evaluated agent
+        :experiment_config (dict): configuration of the experiment
+        :save_path (string): folder where the agent is saved for the workers
+
+    Returns:
+        :callable: the factory, None if the experiment has no EnvSpec or the agent can't be saved
+    '''
+    env_spec = experiment_config.get("env").get("env_spec", None)
+    if env_spec is None:
+        log.warning("Parallel evaluation needs an EnvSpec (src.envs.env_spec) to create the environment of "
+                    "each worker")
+        return None
+    agent_config = dict(experiment_config.get("agent"))
+    nn_model = getattr(agent, "nn_model", None)
+    if agent_config.get("load_path", None) is not None and experiment_config.get("training", False) is False:
+        # the agent on disk is the evaluated agent
+        log.debug(F"The evaluation workers load the agent from [{agent_config.get('load_path')}]")
+    elif nn_model is not None and hasattr(nn_model, "save"):
+        load_path = os.path.join(save_path, "evaluated_agent")
+        log.debug(F"Saving the evaluated agent in [{load_path}] for the evaluation workers")
+        nn_model.save(load_path)
+        agent_config["load_path"] = load_path
+        agent_config["iter_num"] = None
+    else:
+        log.warning(F"Agent [{agent}] can't be saved for the evaluation workers")
+        return None
+    backend_class = experiment_config.get("env_backend_class", False)
+
+    def _worker_factory():
+        from src.makers.maker import create_agent
+        try:
+            import torch
+            # one thread per worker, the workers already use all the cpus
+            torch.set_num_threads(1)
+        except ImportError:
+            pass
+        worker_config = dict(experiment_config)
+        worker_config["env"] = dict(experiment_config.get("env"))
+        worker_config["env"]["env"] = env_spec.make(backend_class)
+        worker_config["env"]["n_envs"] = 1
+        worker_config["agent"] = agent_config
+        worker_config["training"] = False
+        return worker_config["env"]["env"], create_agent(worker_config)
+
+    return _worker_factory
+
+
+@contextlib.contextmanager
+def evaluation_worker_factory(agent, experiment_config):
+    '''
+    Context manager of :func:`make_evaluation_worker_factory`: the agent is saved for the workers in a temporary
+    folder, deleted when the block exits.
+
+    >>> a simple example:
+        with evaluation_worker_factory(agent, experiment_config) as worker_factory:
+            default.test_and_evaluate_agent(env, agent, worker_factory=worker_factory, n_workers=8)
+    '''
+    with tempfile.TemporaryDirectory(prefix="autogrid_eval_") as save_path:
+        yield make_evaluation_worker_factory(agent, experiment_config, save_path)
+
+
 def evaluate_agent(agent,experiment_config,eval_override=None):
     #Get evaluation method
     evaluation = experiment_config.get("evaluation")
@@ -35,11 +108,21 @@ def evaluate_agent(agent,experiment_config,eval_override=None):
 
     if evaluation in [constants.EVALUATION_DEFAULT, True]:
         from src.evaluators import default
-        return default.test_and_evaluate_agent(
-            experiment_config.get("env").get("env"),
-            agent,
-            **evaluation_kwargs
-        )
+        env_factory = None
+        env_spec = experiment_config.get("env").get("env_spec", None)
+        if evaluation_kwargs.get("batch_size", 1) > 1 and env_spec is not None:
+            env_factory = functools.partial(env_spec.make, experiment_config.get("env_backend_class", False))
+        factory_context = contextlib.nullcontext()
+        if evaluation_kwargs.get("n_workers", 1) > 1:
+            factory_context = evaluation_worker_factory(agent, experiment_config)
+        with factory_context as worker_factory:
+            return default.test_and_evaluate_agent(
+                experiment_config.get("env").get("env"),
+                agent,
+                worker_factory=worker_factory,
+                env_factory=env_factory,
+                **evaluation_kwargs
+            )
 
     elif evaluation in [constants.EVALUATION_GRID2OP, True]:
         from src.evaluators import baseline
@@ -51,9 +134,16 @@ def evaluate_agent(agent,experiment_config,eval_override=None):
 
     elif evaluation == constants.EVALUATION_L2RPN2022:
         from src.evaluators import L2RPN2022
-        return L2RPN2022.evaluate_agent(
-            agent,
-            **evaluation_kwargs)
+        factory_context = contextlib.nullcontext()
+        if evaluation_kwargs.get("nb_process", 1) > 1:
+            # the scoring processes rebuild the agent from disk (each one builds a training env) instead of
+            # receiving a pickled copy, the saved agent is removed when the block exits
+            factory_context = evaluation_worker_factory(agent, experiment_config)
+        with factory_context as agent_factory:
+            return L2RPN2022.evaluate_agent(
+                agent,
+                agent_factory=agent_factory,
+                **evaluation_kwargs)
 
     elif evaluation in [constants.EVALUATION_CITYLEARN_ENV]:
         from src.evaluators import citylearn
@@ -0,0 +1,147 @@
+import io
+import json
+import logging
+import math
+import os
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+RESULTS_STREAM_FILE = "scores.jsonl"
+
+
+class RunningStats(object):
+    '''
+    Count, mean, variance, min and max of a series of values, updated one value at a time (Welford's algorithm)
+    '''
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, value):
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def variance(self):
+        '''
+        Sample variance (same as pandas `std() ** 2`), nan with less than 2 values
+        '''
+        if self.count < 2:
+            return math.nan
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean if self.count else math.nan, "std": self.std,
+                "min": self.min if self.count else math.nan, "max": self.max if self.count else math.nan}
+
+
+class ResultStream(object):
+    '''
+    Append-only stream of evaluation results: one JSON line per finished episode, so the results of an
+    interrupted evaluation are not lost. The lines are flushed when written and synced to disk (fsync) every
+    `fsync_every` lines and when the stream is closed. The summary statistics of the numeric fields are updated
+    with each line (see :class:`RunningStats`), without keeping the results in memory.
+
+    >>> a simple example:
+        with ResultStream(os.path.join(save_path, RESULTS_STREAM_FILE)) as stream:
+            for i_episode in range(episodes):
+                ...
+                stream.append({"episode": i_episode, "score": score, "steps": steps})
+        print(stream.summary())
+        df = read_results(os.path.join(save_path, RESULTS_STREAM_FILE))
+    '''
+
+    def __init__(self, path=None, fsync_every=10, append=False):
+        '''
+        Args:
+            :path (string): file of the stream, if None only the statistics are computed
+            :fsync_every (int): number of lines between two fsync
+            :append (bool): keep the lines already in the file, by default a new stream is started
+        '''
+        self.path = path
+        self.fsync_every = max(int(fsync_every), 1)
+        self.stats = {}
+        self._pending = 0
+        self._file = None
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def append(self, record):
+        '''
+        Write a result (a dict) and update the statistics of its numeric fields
+        '''
+        for key, value in record.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and key != "episode":
+                self.stats.setdefault(key, RunningStats()).update(value)
+        if self._file is None:
+            return
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def summary(self):
+        '''
+        Returns:
+            :pandas DataFrame: the statistics (count, mean, std, min, max) of each numeric field, one row per field
+        '''
+        return pd.DataFrame.from_dict({key: stats.to_dict() for key, stats in self.stats.items()}, orient="index")
+
+    def mean(self):
+        '''
+        Returns:
+            :pandas Series: the mean of each numeric field
+        '''
+        return pd.Series({key: stats.mean for key, stats in self.stats.items()}, dtype=float)
+
+    def close(self):
+        if self._file is not None:
+            if self._pending:
+                self._sync()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_results(path):
+    '''
+    Load a result stream (see :class:`ResultStream`) with a single vectorized read.
+    A truncated last line (an evaluation killed while writing) is ignored.
+
+    Returns:
+        :pandas DataFrame: one row per result
+    '''
+    try:
+        return pd.read_json(path, lines=True)
+    except ValueError:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        log.warning(F"Ignoring the truncated last line of the result stream [{path}]")
+        return pd.read_json(io.StringIO("\n".join(lines[:-1])), lines=True) if len(lines) > 1 else pd.DataFrame()
@@ -1,8 +1,14 @@
+import contextlib
 import copy
+import functools
+import hashlib
 import inspect
+import json
 import logging
+import multiprocessing
 import os
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from typing import List
 
 from src.constants import ALL_ATTR_ACT
@@ -261,4 +267,179 @@ def create_experiment_gitignore(file_path):
     if not os.path.exists(file_path):
         os.makedirs(file_path)
     with open(os.path.join(file_path,".gitignore"),"w") as f:
-        f.write("*")
\ No newline at end of file
+        f.write("*")
+
+def qualified_name(obj):
+    """
+    Qualified name (module + name) of a class or function
+
+    :param obj: class or function
+    :return: String with the qualified name, for example "grid2op.MakeEnv.Make.make"
+    """
+    module = getattr(obj, "__module__", None) or ""
+    name = getattr(obj, "__qualname__", None) or getattr(obj, "__name__", None) or type(obj).__qualname__
+    return F"{module}.{name}" if module else name
+
+
+class UnfingerprintableError(ValueError):
+    """
+    Raised by :func:`fingerprint` for values whose content can't be hashed (cyclic or opaque instances)
+    """
+    pass
+
+
+# maximum depth of the instance attributes hashed by fingerprint
+FINGERPRINT_MAX_DEPTH = 16
+
+
+def _source(obj):
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return None
+
+
+def _cell_contents(cell):
+    try:
+        return cell.cell_contents
+    except ValueError:  # empty cell
+        return None
+
+
+def _instance_state(obj):
+    to_dict = getattr(obj, "to_dict", None)
+    if callable(to_dict):
+        try:
+            return to_dict()
+        except Exception:
+            pass
+    if hasattr(obj, "__dict__"):
+        return vars(obj)
+    raise UnfingerprintableError(F"Can't fingerprint the content of an instance of [{qualified_name(type(obj))}]")
+
+
+def _fingerprint_data(obj, _path=()):
+    from src.envs.env_spec import EnvSpec
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if inspect.ismodule(obj):
+        return obj.__name__
+    if inspect.isclass(obj) or inspect.isbuiltin(obj):
+        return {"name": qualified_name(obj), "source": _source(obj)}
+    if inspect.isfunction(obj) or inspect.ismethod(obj):
+        # the source tells apart two lambdas of a module, and changes when the body is edited,
+        # the values captured by a closure (for example the arguments of a filter factory) are part of the function
+        function = getattr(obj, "__func__", obj)
+        closure = [_cell_contents(cell) for cell in (function.__closure__ or ())]
+        return {"name": qualified_name(obj), "source": _source(obj),
+                "defaults": _fingerprint_data(function.__defaults__, _path),
+                "closure": _fingerprint_data(closure, _path)}
+    if hasattr(obj, "tolist"):
+        # numpy arrays and scalars
+        return _fingerprint_data(obj.tolist(), _path)
+
+    if id(obj) in _path:
+        raise UnfingerprintableError(F"Can't fingerprint a cyclic reference to [{qualified_name(type(obj))}]")
+    if len(_path) >= FINGERPRINT_MAX_DEPTH:
+        raise UnfingerprintableError(F"Can't fingerprint [{qualified_name(type(obj))}], too deeply nested")
+    _path = _path + (id(obj),)
+    if isinstance(obj, dict):
+        return {str(key): _fingerprint_data(value, _path) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_fingerprint_data(item, _path) for item in obj]
+    if isinstance(obj, (set, frozenset)):
+        return sorted(json.dumps(_fingerprint_data(item, _path), sort_keys=True) for item in obj)
+    if isinstance(obj, functools.partial):
+        return {"partial": _fingerprint_data(obj.func, _path), "args": _fingerprint_data(obj.args, _path),
+                "kwargs": _fingerprint_data(obj.keywords, _path)}
+    if isinstance(obj, EnvSpec):
+        return {"env_class": _fingerprint_data(obj.env_class, _path),
+                "env_args": _fingerprint_data(obj.env_args, _path),
+                "env_kwargs": _fingerprint_data(obj.env_kwargs, _path)}
+    # any other instance (grid2op Parameters, rewards...) is identified by its class and its content
+    return {"instance": _fingerprint_data(type(obj), _path),
+            "state": _fingerprint_data(_instance_state(obj), _path)}
+
+
+def fingerprint(obj):
+    """
+    Stable hash of a configuration value.
+    Classes and functions are identified by their qualified name and their source code, and the other
+    instances by their class and their content (`to_dict()` if they have one, their attributes otherwise).
+    Values whose content can't be hashed (cyclic or opaque instances, like environments and backends)
+    raise :class:`UnfingerprintableError`.
+
+    :param obj: configuration value (dict, list, class, EnvSpec...)
+    :return: String with the sha256 hex digest of the value
+    """
+    data = json.dumps(_fingerprint_data(obj), sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+# state inherited by the forked worker processes, by name (see fork_state and fork_executor)
+_FORK_STATE = {}
+
+
+def fork_workers(n_workers, what="Parallel execution"):
+    """
+    Number of forked worker processes that can be used: `n_workers` (None means one per cpu),
+    or 1 if the 'fork' start method is not available
+
+    :param n_workers: requested number of workers
+    :param what: name of the parallel task, for the warning
+    :return: int with the number of workers
+    """
+    if n_workers is None or n_workers is True:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(int(n_workers or 1), 1)
+    if n_workers > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        log.warning(F"{what} needs the 'fork' start method, running sequentially")
+        n_workers = 1
+    return n_workers
+
+
+@contextlib.contextmanager
+def fork_state(**state):
+    """
+    Make objects available to the processes forked inside the context, without pickling them
+    (classes, functions, environments...). The processes read them with :func:`get_fork_state`.
+    The previous values are restored when the context exits.
+
+    >>> a simple example:
+        with fork_state(action_space=action_space):
+            ... fork the workers, that call get_fork_state("action_space")
+    """
+    previous = {key: _FORK_STATE[key] for key in state if key in _FORK_STATE}
+    _FORK_STATE.update(state)
+    try:
+        yield
+    finally:
+        for key in state:
+            _FORK_STATE.pop(key, None)
+        _FORK_STATE.update(previous)
+
+
+def get_fork_state(key, default=None):
+    """
+    Object set with :func:`fork_state` by the process that forked this one
+
+    :param key: name of the object
+    :param default: value returned if there is no such object
+    """
+    return _FORK_STATE.get(key, default)
+
+
+@contextlib.contextmanager
+def fork_executor(n_workers, **state):
+    """
+    ProcessPoolExecutor of `n_workers` forked processes, the `state` is inherited by the workers
+    (see :func:`fork_state`). The workers are forked when the tasks are submitted, inside the context.
+
+    >>> a simple example:
+        with fork_executor(4, env_name=env_name) as executor:
+            results = list(executor.map(worker_function, tasks))
+    """
+    with fork_state(**state):
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("fork")) as executor:
+            yield executor
+
@@ -1,10 +1,17 @@
 import glob, os
 import argparse
 import importlib
+import importlib.util
 import sys
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
 
 from src import AutoGrid
+from src.constants import AUTOGRID_PATH
 
 
 def create_main_argparse():
@@ -17,6 +24,17 @@ def create_main_argparse():
     group.add_argument("--folder", dest='execute_folder',
                        help='Treat the first parameter as a folder and execute all the configuration files inside it',
                        action='store_true')
+    group.add_argument("--file", dest='execute_file',
+                       help='Treat the first parameter as the path of a configuration file and execute it',
+                       action='store_true')
+    parser.add_argument("--jobs", dest='jobs', type=int, default=1,
+                        help='Number of configuration files executed at the same time in --folder mode')
+    parser.add_argument("--log-dir", dest='log_dir', default="folder_logs",
+                        help='Folder where the logs of each configuration file are written in --folder mode')
+    parser.add_argument("--force", dest='force', action='store_true',
+                        help='Run every phase of the experiments again, even if they are in the artifact store')
+    parser.add_argument("--log-file", dest='log_file', default=None,
+                        help='Override the file logger filename of the configuration')
 
     return parser
 
@@ -44,8 +62,93 @@ def check_packages():
         print("========================================")
 
 
+CONFIG_WITHOUT_GET_CONFIG = 30
+
+
+def load_config_file(file_path):
+    """
+    Import a configuration file from its path
+
+    :param file_path: path of the python configuration file
+    :return: the imported module
+    """
+    spec = importlib.util.spec_from_file_location(Path(file_path).stem, file_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_config_file(file_path, force_log=False, log_dir="folder_logs", force=False):
+    """
+    Execute a configuration file on its own python process.
+    The console output is written to "<log_dir>/<file_name>.out" and the file logger to "<log_dir>/<file_name>.log"
+
+    :param file_path: path of the python configuration file
+    :param force_log: Force the log level of the execution
+    :param log_dir: folder where the logs are written
+    :param force: run every phase again, even if it is in the artifact store
+    :return: dict with the execution summary of the file
+    """
+    name = Path(file_path).stem
+    log_file = os.path.join(log_dir, F"{name}.log")
+    out_file = os.path.join(log_dir, F"{name}.out")
+    command = [sys.executable, "-m", "src.main", file_path, "--file", "--log-file", log_file]
+    if force_log:
+        command += ["--log", force_log]
+    if force:
+        command += ["--force"]
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [AUTOGRID_PATH, env.get("PYTHONPATH")]))
+
+    start = time.perf_counter()
+    with open(out_file, "w", encoding="utf-8") as out:
+        process = subprocess.run(command, stdout=out, stderr=subprocess.STDOUT, env=env)
+    wall_time = time.perf_counter() - start
+
+    if process.returncode == 0:
+        status = "OK"
+    elif process.returncode == CONFIG_WITHOUT_GET_CONFIG:
+        status = "SKIPPED"
+    else:
+        status = "FAILED"
+    return {"config": file_path, "status": status, "return_code": process.returncode,
+            "wall_time (s)": round(wall_time, 2), "log": out_file}
+
+
+def run_folder(folder, jobs=1, force_log=False, log_dir="folder_logs", force=False):
+    """
+    Execute all the configuration files of a folder on a pool of at most `jobs` concurrent processes,
+    and print a summary table at the end.
+
+    :param folder: folder with the python configuration files
+    :param jobs: maximum number of configuration files executed at the same time
+    :param force_log: Force the log level of the executions
+    :param log_dir: folder where the logs of each file are written
+    :param force: run every phase again, even if it is in the artifact store
+    :return: pandas DataFrame with the summary of the executions
+    """
+    files = sorted(file for file in glob.glob(os.path.join(folder, "*.py"))
+                   if os.path.basename(file) != "__init__.py")
+    os.makedirs(log_dir, exist_ok=True)
+    print(F"Executing {len(files)} configuration files from [{folder}] with {jobs} jobs")
+
+    summary = []
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = [executor.submit(run_config_file, file, force_log, log_dir, force) for file in files]
+        for future in as_completed(futures):
+            result = future.result()
+            print(F"[{result['status']}] {result['config']} ({result['wall_time (s)']}s)")
+            summary.append(result)
+
+    summary = pd.DataFrame(summary, columns=["config", "status", "return_code", "wall_time (s)", "log"])
+    summary = summary.sort_values("config", ignore_index=True)
+    print("=" * 80)
+    print(summary.to_string(index=False))
+    print("=" * 80)
+    return summary
+
+
 if __name__ == "__main__":
-    check_packages()
     parser = create_main_argparse()
 
     parsed, unknown = parser.parse_known_args()
@@ -58,7 +161,12 @@ if __name__ == "__main__":
             # you can pass any arguments to add_argument
             parser.add_argument(arg, type=str)
     args = parser.parse_args()
-    if args.execute_folder == False and not importlib.util.find_spec(args.config_filename, package="experiments"):
+    if args.execute_file == False:
+        check_packages()
+    if args.execute_file == True and not os.path.isfile(args.config_filename):
+        print(F"ERROR: Configuration file [{args.config_filename}] not found.")
+        sys.exit(10)
+    if args.execute_folder == False and args.execute_file == False and not importlib.util.find_spec(args.config_filename, package="experiments"):
         print(F"ERROR: Configuration file [{args.config_filename}] not found.")
         sys.exit(10)
     if args.execute_folder == True and not os.path.exists(args.config_filename):
@@ -66,15 +174,19 @@ if __name__ == "__main__":
         sys.exit(20)
     force_log = args.force_log if args.force_log != "False" else False
 
-    #Todo: pensar si la ejecucion de carpetas merece la pena, y/o si habria que paralelizarla.
     if args.execute_folder == True:
-        for file in glob.glob(args.config_filename + "/*.py"):
-            print("=")
-            print("\r\rExecuting configuration: " + file + "\r")
-            print("=")
-            config_json = importlib.import_module(args.config_filename,package="experiments")
-            main = AutoGrid.main(config_json, force_log=force_log)
-            main.run()
+        summary = run_folder(args.config_filename, jobs=args.jobs, force_log=force_log, log_dir=args.log_dir,
+                             force=args.force)
+        if (summary["status"] == "FAILED").any():
+            sys.exit(1)
+    elif args.execute_file == True:
+        config_module = load_config_file(args.config_filename)
+        if not hasattr(config_module, "get_config"):
+            print(F"Configuration file [{args.config_filename}] has no get_config function, skipping it.")
+            sys.exit(CONFIG_WITHOUT_GET_CONFIG)
+        main = AutoGrid.main(config_module.get_config(), force_log=force_log,
+                             command_line_arguments=args)
+        main.run()
     else:
         config_json = importlib.import_module(args.config_filename,package="experiments")
         main = AutoGrid.main(config_json.get_config(), force_log=force_log,
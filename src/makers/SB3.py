@@ -1,3 +1,5 @@
+import copy
+import functools
 import logging
 
 import gym
@@ -8,21 +10,69 @@ log.setLevel(logging.DEBUG)
 import inspect
 import os
 
+from src.callbacks.checkpoint import find_resume_checkpoint
 
 
-def create_agent_sb3(experiment_config):
+def load_checkpoint_state(agent, checkpoint):
+    """
+    Load the replay buffer and VecNormalize statistics saved with a checkpoint into a resumed agent.
+    If the environment of the model is not normalized, it is wrapped into a VecNormalize with the saved statistics.
 
-    # Get basic variables
-    load_path = experiment_config.get("agent").get("load_path", None)
-    name = experiment_config.get("name", "DAFAULT_NAME")
-    env = experiment_config.get("env").get("env")
-    Grid2OpAgentClass = experiment_config.get("agent").get("agent", False)
-    if Grid2OpAgentClass is False:
-        from src.agents.Grid2OpSB3 import SB3AgentGrid2Op
-        Grid2OpAgentClass = SB3AgentGrid2Op
+    :param agent: the agent loaded from the checkpoint
+    :param checkpoint: checkpoint found by :func:`src.callbacks.checkpoint.find_latest_checkpoint`
+    """
+    nn_model = agent.nn_model
+    if checkpoint.get("replay_buffer") is not None and hasattr(nn_model, "load_replay_buffer"):
+        log.info(F"Loading replay buffer [{checkpoint.get('replay_buffer')}]")
+        nn_model.load_replay_buffer(checkpoint.get("replay_buffer"))
+    if checkpoint.get("vecnormalize") is not None:
+        from stable_baselines3.common.vec_env import VecNormalize
+        vec_normalize = nn_model.get_vec_normalize_env()
+        venv = nn_model.get_env() if vec_normalize is None else vec_normalize.venv
+        if venv is None:
+            log.warning(F"VecNormalize statistics [{checkpoint.get('vecnormalize')}] not loaded: "
+                        F"the model has no environment")
+            return
+        if vec_normalize is None:
+            log.warning(F"The environment of the model is not a VecNormalize, it is wrapped into one with the "
+                        F"statistics of the checkpoint [{checkpoint.get('vecnormalize')}]")
+        log.info(F"Loading VecNormalize statistics [{checkpoint.get('vecnormalize')}]")
+        nn_model.set_env(VecNormalize.load(checkpoint.get("vecnormalize"), venv))
 
-    log.debug(F"Environment [{env}]")
-    _ = env.reset()
+
+def set_candidate_policy(agent, env_gym, vec_env=None):
+    """
+    Make the simulate gate of the training environments compare the actions with the top-k actions of the policy
+    (see :func:`src.envs.gymenv_heuristics.GymEnvWithHeuristics.set_candidate_policy`), if the gym environment
+    has `top_k > 0`. Only the environments stepped in this process can call the policy: the environments of
+    the `SubprocVecEnv` and `SharedMemoryVecEnv` workers gate the actions without candidates.
+
+    :param agent: the agent, with a `get_top_k_acts` method
+    :param env_gym: the gym environment of the experiment
+    :param vec_env: the vectorized environment, if the agent is trained with one
+    """
+    if not getattr(env_gym, "top_k", 0) or not hasattr(agent, "get_top_k_acts"):
+        return
+    if vec_env is None:
+        env_gym.set_candidate_policy(agent.get_top_k_acts)
+        return
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    if isinstance(vec_env, DummyVecEnv):
+        vec_env.env_method("set_candidate_policy", agent.get_top_k_acts)
+    else:
+        log.warning(F"The top-k actions of the policy can't be simulated by the environments of the "
+                    F"[{type(vec_env).__name__}] workers, their simulate gate has no candidates. "
+                    F"Use \"vec_env_class\": \"dummy\" to simulate them")
+
+
+def make_gym_env(env, experiment_config):
+    """
+    Wrap an environment into the gym environment of the experiment, with its custom observation and action spaces
+
+    :param env: the environment (grid2op env or gym env)
+    :param experiment_config: experiment configuration with the "env", "observation_space" and "action_space" keys
+    :return: the gym environment
+    """
     if isinstance(env,gym.Env):
         env_gym = env
     else:
@@ -72,6 +122,143 @@ def create_agent_sb3(experiment_config):
             env_gym.action_space = action_space_class
         log.debug(F"Gym action_space [{env_gym.action_space}]")
 
+    return env_gym
+
+
+def _make_vec_env_worker(gym_config, rank, seed):
+    """
+    Build the gym environment of a vectorized environment worker from the EnvSpec of the experiment
+    """
+    env = gym_config.get("env").get("env_spec").make(gym_config.get("env_backend_class", False))
+    env_gym = make_gym_env(env, gym_config)
+    _seed_vec_env_worker(env_gym, rank, seed)
+    return env_gym
+
+
+def _copy_vec_env_worker(env, gym_config, rank, seed):
+    """
+    Build the gym environment of a vectorized environment worker from a copy of the experiment environment
+    """
+    env = env.copy() if hasattr(env, "copy") else copy.deepcopy(env)
+    env_gym = make_gym_env(env, gym_config)
+    _seed_vec_env_worker(env_gym, rank, seed)
+    return env_gym
+
+
+def _seeded_vec_env_worker(env_gym, seed):
+    """
+    Use the gym environment of the experiment as the first worker (rank 0)
+    """
+    _seed_vec_env_worker(env_gym, 0, seed)
+    return env_gym
+
+
+def _seed_vec_env_worker(env_gym, rank, seed):
+    """
+    Give each worker its own seed, and for grid2op environments its own chronics offset
+    """
+    init_env = getattr(env_gym, "init_env", None)
+    if init_env is not None:
+        init_env.seed(seed + rank)
+        init_env.set_id(rank)
+    elif hasattr(env_gym, "seed"):
+        env_gym.seed(seed + rank)
+
+
+def make_vec_env(experiment_config, env_gym, n_envs):
+    """
+    Create a vectorized environment with `n_envs` copies of the gym environment of the experiment.
+
+    With an EnvSpec ("env_spec", see :class:`src.envs.env_spec.EnvSpec`) each copy is built inside its own
+    `SubprocVecEnv` worker process. With "vec_env_class": "shared_memory" the workers are a
+    :class:`src.envs.shared_memory_vec_env.SharedMemoryVecEnv`, which returns the observations through shared memory
+    instead of pickling them over the pipes. Otherwise (or with "vec_env_class": "dummy") the copies are made from the
+    experiment environment and stepped sequentially with a `DummyVecEnv`.
+
+    >>> a simple example:
+        "env": {
+            "env": EnvSpec(grid2op.make, "l2rpn_wcci_2022", backend=LightSimBackend),
+            "gymenv_class": GymEnv,
+            "n_envs": 8,
+            "vec_env_class": "subproc",
+            "vec_env_start_method": "forkserver",
+            "seed": 0
+        }
+
+    :param experiment_config: experiment configuration
+    :param env_gym: the gym environment of the experiment
+    :param n_envs: number of environments
+    :return: the vectorized environment
+    """
+    from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+    from src.envs.shared_memory_vec_env import SharedMemoryVecEnv
+
+    env_config = experiment_config.get("env")
+    env_spec = env_config.get("env_spec", None)
+    vec_env_class = env_config.get("vec_env_class", "subproc")
+    seed = env_config.get("seed", None) or 0
+    # only the picklable part of the configuration is sent to the workers
+    gym_config = {
+        "env": {key: value for key, value in env_config.items() if key != "env"},
+        "env_backend_class": experiment_config.get("env_backend_class", False),
+        "observation_space": experiment_config.get("observation_space", False),
+        "action_space": experiment_config.get("action_space", False),
+    }
+
+    if vec_env_class in ("subproc", "shared_memory") and env_spec is not None:
+        env_fns = [functools.partial(_make_vec_env_worker, gym_config, rank, seed) for rank in range(n_envs)]
+        start_method = env_config.get("vec_env_start_method", None)
+        if vec_env_class == "shared_memory":
+            log.info(F"Creating SharedMemoryVecEnv with [{n_envs}] environments")
+            return SharedMemoryVecEnv(env_fns, start_method=start_method)
+        log.info(F"Creating SubprocVecEnv with [{n_envs}] environments")
+        return SubprocVecEnv(env_fns, start_method=start_method)
+
+    if vec_env_class in ("subproc", "shared_memory"):
+        log.warning(F"{vec_env_class} vec env needs an EnvSpec to build the environments on the workers, "
+                    F"using DummyVecEnv")
+    log.info(F"Creating DummyVecEnv with [{n_envs}] environments")
+    env = env_config.get("env")
+    env_fns = [functools.partial(_seeded_vec_env_worker, env_gym, seed)] + \
+              [functools.partial(_copy_vec_env_worker, env, gym_config, rank, seed) for rank in range(1, n_envs)]
+    return DummyVecEnv(env_fns)
+
+
+def create_agent_sb3(experiment_config):
+
+    # Get basic variables
+    load_path = experiment_config.get("agent").get("load_path", None)
+    iter_num = experiment_config.get("agent").get("iter_num", None)
+    checkpoint = None
+    name = experiment_config.get("name", "DAFAULT_NAME")
+    env = experiment_config.get("env").get("env")
+    Grid2OpAgentClass = experiment_config.get("agent").get("agent", False)
+    if Grid2OpAgentClass is False:
+        from src.agents.Grid2OpSB3 import SB3AgentGrid2Op
+        Grid2OpAgentClass = SB3AgentGrid2Op
+
+    if load_path is None and experiment_config.get("agent").get("resume", False) \
+            and experiment_config.get("training", False) is not False:
+        # resume the training from the last CheckpointCallback snapshot if there is one
+        checkpoint = find_resume_checkpoint(experiment_config.get("training_kwargs", {}).get("callbacks", {}))
+        if checkpoint is not None:
+            if "iter_num" not in inspect.signature(Grid2OpAgentClass).parameters:
+                # the checkpoint path is the name prefix, it can only be loaded with its iter_num
+                raise ValueError(F"Can't resume from checkpoint [{checkpoint.get('path')}]: the agent class "
+                                 F"[{Grid2OpAgentClass}] has no 'iter_num' argument to load it")
+            log.info(F"Resuming training from checkpoint [{checkpoint.get('path')}] at step [{checkpoint.get('iter_num')}]")
+            load_path = checkpoint.get("path")
+            iter_num = checkpoint.get("iter_num")
+
+    log.debug(F"Environment [{env}]")
+    _ = env.reset()
+    env_gym = make_gym_env(env, experiment_config)
+
+    vec_env = None
+    n_envs = experiment_config.get("env").get("n_envs", 1)
+    if n_envs > 1:
+        vec_env = make_vec_env(experiment_config, env_gym, n_envs)
+
     model_class = experiment_config.get("agent").get("class")
     kwargs = experiment_config.get("agent").get("net_kwargs", {})
     logs_dir = experiment_config.get("agent").get("net_kwargs", {}).get("tensorboard_log", None)
@@ -82,7 +269,7 @@ def create_agent_sb3(experiment_config):
                 os.mkdir(logs_dir)
 
         nn_kwargs = {
-            "env": env_gym,
+            "env": env_gym if vec_env is None else vec_env,
             "verbose": True,  # TODO add as parameter
             **kwargs
         }
@@ -96,16 +283,29 @@ def create_agent_sb3(experiment_config):
                          nn_kwargs=nn_kwargs,
                          )
     else:
+        agent_kwargs = {}
+        agent_parameters = inspect.signature(Grid2OpAgentClass).parameters
+        if iter_num is not None and "iter_num" in agent_parameters:
+            agent_kwargs["iter_num"] = iter_num
+        if vec_env is not None and "load_env" in agent_parameters:
+            # the model is loaded with the vectorized env, its n_envs is checked against the saved one by SB3
+            agent_kwargs["load_env"] = vec_env
         agent = Grid2OpAgentClass(env.action_space,
                          env_gym.action_space,
                          env_gym.observation_space,
                          nn_type=model_class,
                          gymenv=env_gym,
-                         nn_path=load_path
-                         #iter_num="500000"
-                         #TODO: Add option for Agent kwargs like iter_num
+                         nn_path=load_path,
+                         **agent_kwargs
                          )
         log.info(F"Loaded agent from [{load_path}] ")
+        if vec_env is not None and "load_env" not in agent_kwargs:
+            agent.nn_model.set_env(vec_env)
+        if checkpoint is not None:
+            load_checkpoint_state(agent, checkpoint)
+            experiment_config["agent"]["resumed_num_timesteps"] = checkpoint.get("iter_num")
+
+    set_candidate_policy(agent, env_gym, vec_env)
 
     #env_gym.close() #SINCE THE GYM_ENV IS USEED IN CASE OF HEURISTIC HACTONS THE ENV CANT BE CLOSED
     #TODO - THE ENV MUST BE CLOSE SOMEWHERE ELSE AT THE END OF THE EXPERIMENT
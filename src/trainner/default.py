@@ -1,5 +1,6 @@
 import inspect
 import logging
+import os
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -9,13 +10,45 @@ def train_agent(agent,
     """
     Default training function that calls agent.train()
     :param agent: agent class to train
-    :param trainner_kwargs: extra training arguments used by the agent
+    :param trainner_kwargs: extra training arguments used by the agent.
+        "throughput" (default True) attaches a :class:`src.callbacks.throughput.ThroughputCallback`
+        to the agents whose learn function accepts callbacks: True writes its summary in the folder of the model
+        ("save_path" is the path of the model without extension), a string is the folder of the summary,
+        False does not attach it.
     :return: the trained agent
     """
+    throughput = trainner_kwargs.pop("throughput", True)
     learn_signature = inspect.signature(agent.learn)
+    accepts_kwargs = any(parameter.kind == inspect.Parameter.VAR_KEYWORD
+                         for parameter in learn_signature.parameters.values())
     for arg in list(trainner_kwargs.keys()):
-        if arg not in learn_signature.parameters:
-            trainner_kwargs.pop("save_path")
+        if arg not in learn_signature.parameters and not accepts_kwargs:
+            trainner_kwargs.pop(arg)
             log.warning(F"Removing '{arg}' from '{agent.learn}' function, since its not a valid parameter")
+    if throughput and "callbacks" in learn_signature.parameters:
+        add_throughput_callback(trainner_kwargs, throughput)
     agent.learn(**trainner_kwargs)
     return agent
+
+
+def add_throughput_callback(trainner_kwargs, throughput=True):
+    """
+    Add a :class:`src.callbacks.throughput.ThroughputCallback` to the "callbacks" of the training arguments,
+    unless a "throughput" callback is already configured
+    :param trainner_kwargs: training arguments, modified in place
+    :param throughput: True to write the summary in the folder of the model, or the folder of the summary
+    """
+    try:
+        from src.callbacks.throughput import ThroughputCallback
+    except ImportError as e:
+        log.warning(F"The throughput callback is not available ({e}), the training throughput is not recorded")
+        return
+    throughput_path = throughput if isinstance(throughput, str) else None
+    if throughput_path is None and trainner_kwargs.get("save_path", None) is not None:
+        throughput_path = os.path.dirname(trainner_kwargs.get("save_path"))
+    callbacks = dict(trainner_kwargs.get("callbacks") or {})
+    callbacks.setdefault("throughput", {
+        "class": ThroughputCallback,
+        "kwargs": {"save_path": throughput_path}
+    })
+    trainner_kwargs["callbacks"] = callbacks
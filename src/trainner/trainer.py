@@ -20,6 +20,16 @@ def train_agent(agent,experiment_config):
     if save_path is None and global_save_path:
         trainner_kwargs["save_path"] = os.path.join(global_save_path, experiment_name)
 
+    resumed_num_timesteps = experiment_config.get("agent", {}).get("resumed_num_timesteps", 0)
+    if resumed_num_timesteps:
+        # continue the resumed training with the remaining timesteps only
+        trainner_kwargs = dict(trainner_kwargs)
+        total_timesteps = trainner_kwargs.get("total_timesteps", 1)
+        trainner_kwargs["total_timesteps"] = max(total_timesteps - resumed_num_timesteps, 0)
+        trainner_kwargs["reset_num_timesteps"] = False
+        log.info(F"Agent resumed at step [{resumed_num_timesteps}], "
+                 F"training the remaining [{trainner_kwargs['total_timesteps']}] timesteps")
+
     if trainner in [constants.TRAINING_DEFAULT]:
         return default.train_agent(
             agent,
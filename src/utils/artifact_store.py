@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+MANIFEST_FILE = "manifest.json"
+MODEL_NAME = "model"
+EVALUATION_FILE = "evaluation.json"
+
+
+def _atomic_write(file_path, data):
+    # readers never see a partially written file: write a temporary file, then rename it
+    tmp_file = F"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp_file, file_path)
+
+
+class ArtifactStore(object):
+    '''
+    Local store of the trained models and evaluation outputs of the experiments.
+    Artifacts are saved in a folder named after the hash of the experiment configuration,
+    so an experiment that did not change can reuse them instead of training / evaluating again.
+
+    >>> store layout:
+        <path>/<experiment hash>/manifest.json
+        <path>/<experiment hash>/model.zip
+        <path>/<experiment hash>/evaluation.json
+    '''
+
+    def __init__(self, path):
+        '''
+        Args:
+            :path (string): root folder of the store
+        '''
+        self.path = path
+
+    def experiment_dir(self, experiment_hash):
+        return os.path.join(self.path, experiment_hash)
+
+    def manifest(self, experiment_hash):
+        '''
+        Get the manifest of an experiment
+
+        Args:
+            :experiment_hash (string): hash of the experiment configuration
+
+        Returns:
+            :dict: the phases already done for the experiment, empty if the experiment is not in the store
+        '''
+        manifest_file = os.path.join(self.experiment_dir(experiment_hash), MANIFEST_FILE)
+        if not os.path.exists(manifest_file):
+            return {}
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _update_manifest(self, experiment_hash, **values):
+        manifest = self.manifest(experiment_hash)
+        manifest.update(values)
+        os.makedirs(self.experiment_dir(experiment_hash), exist_ok=True)
+        _atomic_write(os.path.join(self.experiment_dir(experiment_hash), MANIFEST_FILE),
+                      json.dumps(manifest, indent=4))
+
+    def model_path(self, experiment_hash):
+        '''
+        Path (without the .zip extension) of the trained model of an experiment
+        '''
+        return os.path.join(self.experiment_dir(experiment_hash), MODEL_NAME)
+
+    def has_model(self, experiment_hash):
+        return self.manifest(experiment_hash).get("training", False) is not False
+
+    def save_model(self, experiment_hash, agent, experiment_name=None):
+        '''
+        Save the trained model of an agent in the store.
+        Only agents with a `nn_model` that can be saved (stable baselines models) are stored.
+
+        Args:
+            :experiment_hash (string): hash of the experiment configuration
+            :agent: the trained agent
+            :experiment_name (string): name of the experiment, saved in the manifest for reference
+
+        Returns:
+            :bool: True if the model was stored
+        '''
+        nn_model = getattr(agent, "nn_model", None)
+        if nn_model is None or not hasattr(nn_model, "save"):
+            log.debug(F"Agent [{agent}] has no model to store")
+            return False
+        os.makedirs(self.experiment_dir(experiment_hash), exist_ok=True)
+        nn_model.save(self.model_path(experiment_hash))
+        self._update_manifest(experiment_hash, name=experiment_name, training=MODEL_NAME)
+        log.info(F"Trained model stored in [{self.model_path(experiment_hash)}]")
+        return True
+
+    def has_evaluation(self, experiment_hash):
+        return self.manifest(experiment_hash).get("evaluation", False) is not False
+
+    def save_evaluation(self, experiment_hash, result, experiment_name=None):
+        '''
+        Save the evaluation output of an experiment in the store.
+        Outputs that can't be written as json are replaced by None (the evaluation files are kept in
+        the evaluation save_path anyway).
+
+        Args:
+            :experiment_hash (string): hash of the experiment configuration
+            :result: output of the evaluation
+            :experiment_name (string): name of the experiment, saved in the manifest for reference
+        '''
+        try:
+            data = json.dumps({"result": result}, indent=4)
+        except (TypeError, ValueError):
+            log.debug(F"Evaluation output of [{experiment_name}] can't be written as json, storing None")
+            data = json.dumps({"result": None}, indent=4)
+        os.makedirs(self.experiment_dir(experiment_hash), exist_ok=True)
+        _atomic_write(os.path.join(self.experiment_dir(experiment_hash), EVALUATION_FILE), data)
+        self._update_manifest(experiment_hash, name=experiment_name, evaluation=EVALUATION_FILE)
+
+    def load_evaluation(self, experiment_hash):
+        with open(os.path.join(self.experiment_dir(experiment_hash), EVALUATION_FILE), "r", encoding="utf-8") as f:
+            return json.load(f).get("result")
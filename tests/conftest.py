@@ -0,0 +1,112 @@
+import os
+import sys
+
+# the tests import the AutoGrid modules as "src.*", like the experiments do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import functools
+import pickle
+import types
+
+import pytest
+
+
+class _FakeVecEnv(object):
+    def __init__(self, env_fns, start_method=None):
+        self.env_fns = env_fns
+        self.start_method = start_method
+
+
+class _FakeDummyVecEnv(_FakeVecEnv):
+    def __init__(self, env_fns):
+        super().__init__(env_fns)
+        self.envs = [env_fn() for env_fn in env_fns]
+
+    def env_method(self, method_name, *method_args, **method_kwargs):
+        return [getattr(env, method_name)(*method_args, **method_kwargs) for env in self.envs]
+
+
+class _FakeCheckpointCallback(object):
+    def __init__(self, save_freq, save_path, name_prefix="rl_model", save_replay_buffer=False,
+                 save_vecnormalize=False, verbose=0):
+        self.save_freq = save_freq
+        self.save_path = save_path
+        self.name_prefix = name_prefix
+        self.save_replay_buffer = save_replay_buffer
+        self.save_vecnormalize = save_vecnormalize
+        self.verbose = verbose
+        self.n_calls = 0
+        self.num_timesteps = 0
+        self.model = None
+
+    def init_callback(self, model):
+        self.model = model
+        self._on_training_start()
+
+    def _on_training_start(self):
+        pass
+
+
+def _save_to_zip_file(f, data=None, params=None, pytorch_variables=None):
+    pickle.dump({"data": data, "params": params, "pytorch_variables": pytorch_variables}, f)
+
+
+def _save_to_pkl(f, obj):
+    pickle.dump(obj, f)
+
+
+def _recursive_getattr(obj, attr):
+    return functools.reduce(getattr, [obj] + attr.split("."))
+
+
+class _FakeVecNormalize(object):
+    def __init__(self, venv, path=None):
+        self.venv = venv
+        self.path = path
+
+    @classmethod
+    def load(cls, load_path, venv):
+        return cls(venv, load_path)
+
+
+@pytest.fixture
+def fake_sb3(monkeypatch):
+    '''
+    Minimal stand-in of the stable_baselines3 modules imported by AutoGrid, to test the code around the models
+    without installing stable baselines (and torch). The AutoGrid modules that import it are imported again
+    by the test, and forgotten after it.
+    '''
+    sb3 = types.SimpleNamespace(
+        callbacks=types.SimpleNamespace(BaseCallback=_FakeCheckpointCallback,
+                                        CheckpointCallback=_FakeCheckpointCallback),
+        vec_env=types.SimpleNamespace(VecEnv=_FakeVecEnv, DummyVecEnv=_FakeDummyVecEnv,
+                                      SubprocVecEnv=type("SubprocVecEnv", (_FakeVecEnv,), {}),
+                                      VecNormalize=_FakeVecNormalize),
+    )
+    modules = {
+        "stable_baselines3": {},
+        "stable_baselines3.common": {},
+        "stable_baselines3.common.callbacks": vars(sb3.callbacks),
+        "stable_baselines3.common.vec_env": vars(sb3.vec_env),
+        "stable_baselines3.common.vec_env.base_vec_env": {"VecEnv": _FakeVecEnv, "CloudpickleWrapper": object},
+        "stable_baselines3.common.env_util": {"is_wrapped": lambda env, wrapper_class: False},
+        "stable_baselines3.common.save_util": {"save_to_zip_file": _save_to_zip_file, "save_to_pkl": _save_to_pkl,
+                                               "recursive_getattr": _recursive_getattr},
+    }
+    autogrid_modules = ["src.callbacks.checkpoint", "src.callbacks.throughput", "src.envs.shared_memory_vec_env",
+                        "src.makers.SB3"]
+    for name in autogrid_modules:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+        package, _, module_name = name.rpartition(".")
+        if package in sys.modules:
+            monkeypatch.delattr(sys.modules[package], module_name, raising=False)
+    for name, attributes in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        monkeypatch.setitem(sys.modules, name, module)
+    yield sb3
+    for name in autogrid_modules:
+        sys.modules.pop(name, None)
+        package, _, module_name = name.rpartition(".")
+        if package in sys.modules:
+            vars(sys.modules[package]).pop(module_name, None)
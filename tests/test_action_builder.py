@@ -0,0 +1,90 @@
+import warnings
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.actions.builder import ELEMENT_CATEGORIES, count_elements, max_elements_filter
+
+# action vectors of 2 lines, 3 elements of the topology and 1 generator
+ACTION_SPACE = SimpleNamespace(attr_list_vect=["_set_line_status", "_switch_line_status", "_set_topo_vect",
+                                               "_change_bus_vect", "_redispatch", "_curtail"],
+                               shape=np.array([2, 2, 3, 3, 1, 1]))
+
+
+def _vector(set_line_status=(0, 0), switch_line_status=(0, 0), set_topo_vect=(0, 0, 0), change_bus_vect=(0, 0, 0),
+            redispatch=(0,), curtail=(-1,)):
+    return np.concatenate([set_line_status, switch_line_status, set_topo_vect, change_bus_vect, redispatch, curtail])
+
+
+def test_count_elements():
+    vectors = np.array([
+        _vector(),
+        _vector(set_line_status=(1, -1)),
+        _vector(switch_line_status=(1, 1), change_bus_vect=(1, 0, 1)),
+        _vector(set_topo_vect=(2, -1, 1), redispatch=(1.5,), curtail=(0.5,)),
+    ])
+    counts = count_elements(ACTION_SPACE, vectors)
+    assert set(counts) == set(ELEMENT_CATEGORIES)
+    assert counts["reconnections"].tolist() == [0, 1, 0, 0]
+    assert counts["disconnections"].tolist() == [0, 1, 0, 0]
+    assert counts["switch_line"].tolist() == [0, 0, 2, 0]
+    assert counts["bus_switch"].tolist() == [0, 0, 2, 0]
+    assert counts["assigned_bus"].tolist() == [0, 0, 0, 2]
+    assert counts["disconnect_bus"].tolist() == [0, 0, 0, 1]
+    assert counts["redispatch"].tolist() == [0, 0, 0, 1]
+    assert counts["curtailment"].tolist() == [0, 0, 0, 1]
+    # no storage in the action vectors
+    assert counts["storage"].tolist() == [0, 0, 0, 0]
+
+
+def test_max_elements_filter():
+    vectors = np.array([_vector(), _vector(set_line_status=(1, -1)), _vector(set_topo_vect=(2, -1, 1))])
+    counts = count_elements(ACTION_SPACE, vectors)
+    assert max_elements_filter(2)(counts).tolist() == [True, True, False]
+    assert max_elements_filter(0, categories=("assigned_bus", "disconnect_bus"))(counts).tolist() == \
+        [True, True, False]
+
+
+def _baseline_filter(action):
+    # element count of the filters of the L2RPN experiments, with action.impact_on_objects()
+    act_dict = action.impact_on_objects()
+    elem = act_dict["force_line"]["reconnections"]["count"]
+    elem += act_dict["force_line"]["disconnections"]["count"]
+    elem += act_dict["switch_line"]["count"]
+    elem += len(act_dict["topology"]["bus_switch"])
+    elem += len(act_dict["topology"]["assigned_bus"])
+    elem += len(act_dict["topology"]["disconnect_bus"])
+    elem += len(act_dict["redispatch"]["generators"])
+    return elem <= 3
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_same_actions_as_id_to_act(n_workers):
+    grid2op = pytest.importorskip("grid2op")
+    from grid2op.Converter import IdToAct
+
+    from src.actions.builder import enumerate_actions
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        env = grid2op.make("l2rpn_case14_sandbox", test=True)
+    try:
+        converter = IdToAct(env.action_space)
+        converter.init_converter()
+        converter.filter_action(_baseline_filter)
+        expected = {tuple(action.to_vect()) for action in converter.all_actions}
+
+        categories = [category for category in ELEMENT_CATEGORIES if category not in ("curtailment", "storage")]
+        vectors = enumerate_actions(env.action_space, action_filter=max_elements_filter(3, categories),
+                                    n_workers=n_workers)
+        assert len(vectors) == len(expected)
+        assert {tuple(vector) for vector in vectors} == expected
+
+        # the vectors are accepted by IdToAct
+        loaded = IdToAct(env.action_space)
+        loaded.init_converter(all_actions=vectors)
+        assert loaded.n == converter.n
+    finally:
+        env.close()
@@ -0,0 +1,45 @@
+import os
+import warnings
+
+import pytest
+
+np = pytest.importorskip("numpy")
+grid2op = pytest.importorskip("grid2op")
+
+from src.actions import cache
+from src.actions.builder import max_elements_filter
+from src.actions.cache import ActionSpaceCache
+
+ENUMERATE_KWARGS = {"change_line_status": False, "set_topo_vect": False, "change_bus_vect": False, "n_workers": 1}
+
+
+@pytest.fixture
+def env():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        env = grid2op.make("l2rpn_case14_sandbox", test=True)
+    yield env
+    env.close()
+
+
+def test_default_path_is_in_the_repository():
+    assert os.path.isabs(cache.DEFAULT_CACHE_PATH)
+
+
+def test_action_space_is_enumerated_once(env, tmp_path, monkeypatch):
+    action_cache = ActionSpaceCache(str(tmp_path))
+    actions = action_cache.get(env.action_space, **ENUMERATE_KWARGS)
+    key = ActionSpaceCache.key(env.action_space, **ENUMERATE_KWARGS)
+    assert os.path.isfile(action_cache.file_path(key))
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("the action space must be loaded from the cache")
+    monkeypatch.setattr(cache, "enumerate_actions", _fail)
+    assert np.array_equal(action_cache.get(env.action_space, **ENUMERATE_KWARGS), actions)
+
+
+def test_filter_is_part_of_the_key(env):
+    assert ActionSpaceCache.key(env.action_space, **ENUMERATE_KWARGS) != \
+        ActionSpaceCache.key(env.action_space, action_filter=max_elements_filter(1), **ENUMERATE_KWARGS)
+    assert ActionSpaceCache.key(env.action_space, action_filter=max_elements_filter(1)) != \
+        ActionSpaceCache.key(env.action_space, action_filter=max_elements_filter(2))
@@ -0,0 +1,54 @@
+import json
+import os
+
+from src.utils.artifact_store import EVALUATION_FILE, MANIFEST_FILE, ArtifactStore
+
+
+class FakeModel(object):
+    def save(self, path):
+        with open(F"{path}.zip", "w") as f:
+            f.write("model")
+
+
+class FakeAgent(object):
+    def __init__(self):
+        self.nn_model = FakeModel()
+
+
+def test_empty_store(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    assert store.manifest("hash") == {}
+    assert not store.has_model("hash")
+    assert not store.has_evaluation("hash")
+
+
+def test_save_and_load_evaluation(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    store.save_evaluation("hash", {"0": {"score": 1.5, "steps": 10}}, "experiment")
+    assert store.has_evaluation("hash")
+    assert store.load_evaluation("hash") == {"0": {"score": 1.5, "steps": 10}}
+    assert store.manifest("hash") == {"name": "experiment", "evaluation": EVALUATION_FILE}
+    # no temporary file is left behind
+    assert sorted(os.listdir(store.experiment_dir("hash"))) == [EVALUATION_FILE, MANIFEST_FILE]
+
+
+def test_evaluation_that_is_not_json_is_stored_as_none(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    store.save_evaluation("hash", object())
+    assert store.load_evaluation("hash") is None
+
+
+def test_save_model_updates_the_manifest(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    assert store.save_model("hash", FakeAgent(), "experiment")
+    assert store.has_model("hash")
+    assert os.path.isfile(F"{store.model_path('hash')}.zip")
+    store.save_evaluation("hash", [1, 2])
+    with open(os.path.join(store.experiment_dir("hash"), MANIFEST_FILE)) as f:
+        assert json.load(f)["training"] == "model"
+
+
+def test_agents_without_model_are_not_stored(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    assert not store.save_model("hash", object())
+    assert not store.has_model("hash")
@@ -0,0 +1,84 @@
+import os
+import pickle
+import threading
+
+import numpy as np
+
+
+class FakeReplayBuffer(object):
+    def __init__(self):
+        self.observations = np.zeros((4, 2))
+        self.actions = {"discrete": np.zeros(4)}
+        self.pos = 0
+        self.full = False
+
+    def add(self, value):
+        self.observations[self.pos] = value
+        self.actions["discrete"][self.pos] = value
+        self.pos = (self.pos + 1) % 4
+        self.full = self.full or self.pos == 0
+
+
+class FakeModel(object):
+    '''
+    The parts of a stable baselines model used by the checkpoint snapshots
+    '''
+
+    def __init__(self):
+        self.learning_rate = 0.1
+        self.replay_buffer = FakeReplayBuffer()
+
+    def _excluded_save_params(self):
+        return ["replay_buffer"]
+
+    def _get_torch_save_params(self):
+        return [], None
+
+    def get_parameters(self):
+        return {"policy": {"weight": np.ones(2)}}
+
+    def get_vec_normalize_env(self):
+        return None
+
+
+def _load(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def test_replay_buffer_is_saved_as_it_was_at_the_checkpoint(fake_sb3, tmp_path, monkeypatch):
+    from src.callbacks import checkpoint
+
+    # the writer thread waits until the training has filled the buffer again
+    trained = threading.Event()
+    write_model_snapshot = checkpoint.write_model_snapshot
+
+    def slow_write_model_snapshot(path, snapshot):
+        trained.wait(10)
+        write_model_snapshot(path, snapshot)
+
+    monkeypatch.setattr(checkpoint, "write_model_snapshot", slow_write_model_snapshot)
+    model = FakeModel()
+    model.replay_buffer.add(1.)
+    model.replay_buffer.add(2.)
+    callback = checkpoint.AsyncCheckpointCallback(save_freq=1, save_path=str(tmp_path), name_prefix="DQN",
+                                                  save_replay_buffer=True)
+    callback.init_callback(model)
+    callback.n_calls = callback.num_timesteps = 2
+    try:
+        callback._on_step()
+        # the training goes on while the checkpoint is written
+        for value in [3., 4., 5.]:
+            model.replay_buffer.add(value)
+        trained.set()
+        callback.wait()
+    finally:
+        callback._on_training_end()
+
+    replay_buffer = _load(os.path.join(str(tmp_path), "DQN_replay_buffer_2_steps.pkl"))
+    np.testing.assert_array_equal(replay_buffer.observations[:, 0], [1., 2., 0., 0.])
+    np.testing.assert_array_equal(replay_buffer.actions["discrete"], [1., 2., 0., 0.])
+    assert replay_buffer.pos == 2 and not replay_buffer.full
+    # the live buffer is untouched
+    assert model.replay_buffer.pos == 1 and model.replay_buffer.full
+    assert _load(os.path.join(str(tmp_path), "DQN_2_steps.zip"))["data"]["learning_rate"] == 0.1
@@ -0,0 +1,92 @@
+import logging
+import multiprocessing
+import os
+
+import pytest
+
+from src.AutoGrid import main
+from src.envs.env_spec import EnvSpec
+
+needs_fork = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                                reason="the 'fork' start method is not available")
+
+
+class FakeEnv(object):
+    def seed(self, seed):
+        pass
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAgent(object):
+    def __init__(self, name):
+        self.name = name
+
+
+def make_agent(experiment_config):
+    if experiment_config["name"] == "broken":
+        raise RuntimeError("this agent can't be created")
+    return FakeAgent(experiment_config["name"])
+
+
+def evaluate(agent):
+    return {"agent": agent.name, "pid": os.getpid()}
+
+
+@pytest.fixture
+def root_handlers():
+    # main configures the root logger
+    handlers = logging.getLogger().handlers[:]
+    yield
+    for handler in logging.getLogger().handlers:
+        handler.close()
+    logging.getLogger().handlers = handlers
+
+
+def _config(tmp_path, parallel, experiments=("ok", "broken")):
+    return {
+        "core": {
+            "parallel": parallel,
+            "logger": {"console": {"level": "CRITICAL"},
+                       "file": {"level": "DEBUG", "filename": str(tmp_path / "execution_log.log"), "mode": "w"}}
+        },
+        "common": {
+            "env": {"env": EnvSpec(FakeEnv)},
+            "agent": {"maker": make_agent},
+            "evaluation": evaluate
+        },
+        "experiments": {name: {} for name in experiments}
+    }
+
+
+def test_get_parallel_workers(tmp_path, root_handlers):
+    assert main(_config(tmp_path, False)).get_parallel_workers() == 1
+    assert main(_config(tmp_path, 1)).get_parallel_workers() == 1
+    # no more workers than experiments
+    assert main(_config(tmp_path, 8)).get_parallel_workers() == (2 if "fork" in multiprocessing.get_all_start_methods()
+                                                                 else 1)
+    assert main(_config(tmp_path, True, experiments=["ok"])).get_parallel_workers() == 1
+
+
+@needs_fork
+def test_failed_experiment_does_not_stop_the_others(tmp_path, root_handlers):
+    autogrid = main(_config(tmp_path, 2))
+    assert autogrid.get_parallel_workers() == 2
+    results = autogrid.run()
+    assert results["broken"] is None
+    assert results["ok"]["agent"] == "ok"
+    # the experiment ran in a worker process
+    assert results["ok"]["pid"] != os.getpid()
+    assert autogrid.config_json["experiments"] == {}
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+    with open(tmp_path / "execution_log.log", "r", encoding="utf-8") as f:
+        log_text = f.read()
+    assert "Experiment [broken] failed" in log_text
+    # with the traceback of the worker
+    assert "this agent can't be created" in log_text
+    assert "Experiment [ok] finished" in log_text
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+pytest.importorskip("stable_baselines3")
+
+from src.callbacks.checkpoint import find_latest_checkpoint
+
+
+def _touch(folder, file_name):
+    with open(os.path.join(folder, file_name), "w") as f:
+        f.write("")
+
+
+def test_no_checkpoint(tmp_path):
+    assert find_latest_checkpoint(None, "PPO") is None
+    assert find_latest_checkpoint(str(tmp_path / "missing"), "PPO") is None
+    assert find_latest_checkpoint(str(tmp_path), "PPO") is None
+
+
+def test_latest_checkpoint_is_found(tmp_path):
+    for file_name in ["PPO_1000_steps.zip", "PPO_20000_steps.zip", "PPO_3000_steps.zip",
+                      "PPO_99999_steps.zip.tmp", "DQN_50000_steps.zip", "PPO_replay_buffer_20000_steps.pkl"]:
+        _touch(str(tmp_path), file_name)
+    checkpoint = find_latest_checkpoint(str(tmp_path), "PPO")
+    assert checkpoint == {
+        "path": os.path.join(str(tmp_path), "PPO"),
+        "iter_num": 20000,
+        "replay_buffer": os.path.join(str(tmp_path), "PPO_replay_buffer_20000_steps.pkl"),
+        "vecnormalize": None,
+    }
+
+
+def test_name_prefix_is_escaped(tmp_path):
+    _touch(str(tmp_path), "PPOX_10_steps.zip")
+    _touch(str(tmp_path), "PP._20_steps.zip")
+    assert find_latest_checkpoint(str(tmp_path), "PP.")["iter_num"] == 20
+    assert find_latest_checkpoint(str(tmp_path), "PPO") is None
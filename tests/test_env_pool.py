@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from src.envs.env_pool import EnvPool
+from src.envs.env_spec import EnvSpec
+
+
+class FakeEnv(object):
+    def __init__(self, name, param=None):
+        self.name = name
+        self.param = param
+        self.closed = False
+        self.seeds = []
+        self.resets = 0
+
+    def seed(self, seed):
+        self.seeds.append(seed)
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+
+class Cyclic(object):
+    def __init__(self):
+        self.me = self
+
+
+def test_pool_is_disabled_by_default():
+    pool = EnvPool()
+    spec = EnvSpec(FakeEnv, "env")
+    env = pool.acquire(spec)
+    pool.release(env)
+    assert env.closed
+    assert pool.acquire(spec) is not env
+
+
+def test_pool_reuses_released_envs():
+    pool = EnvPool(max_size=1)
+    spec = EnvSpec(FakeEnv, "env")
+    env = pool.acquire(spec, seed=1)
+    pool.release(env)
+    assert not env.closed
+    assert pool.acquire(spec, seed=2) is env
+    assert env.seeds == [1, 2]
+
+
+def test_new_envs_are_not_reset_by_the_pool():
+    pool = EnvPool(max_size=1)
+    spec = EnvSpec(FakeEnv, "env")
+    env = pool.acquire(spec, seed=7)
+    assert env.seeds == [7]
+    assert env.resets == 0
+    pool.release(env)
+    pool.acquire(spec, seed=7)
+    assert env.seeds == [7, 7]
+    assert env.resets == 0
+
+
+def test_pooled_envs_without_seed_get_the_seed_of_their_spec():
+    pool = EnvPool(max_size=1)
+    spec = EnvSpec(FakeEnv, "env")
+    env = pool.acquire(spec)
+    pool.release(env)
+    assert pool.acquire(spec) is env
+    seed = EnvPool.spec_seed(spec.fingerprint(False))
+    assert env.seeds == [seed, seed]
+
+
+def test_pooled_grid2op_env_behaves_like_a_new_one():
+    grid2op = pytest.importorskip("grid2op")
+    pytest.importorskip("pandapower")
+    spec = EnvSpec(grid2op.make, "rte_case5_example", test=True)
+    pool = EnvPool(max_size=1)
+    env = pool.acquire(spec, seed=3)
+    env.reset()
+    expected = (env.chronics_handler.get_id(), env.get_obs().load_p.copy())
+    env.step(env.action_space({}))
+    env.reset()
+    pool.release(env)
+    assert pool.acquire(spec, seed=3) is env
+    env.reset()
+    assert env.chronics_handler.get_id() == expected[0]
+    assert np.allclose(env.get_obs().load_p, expected[1])
+    pool.close()
+
+
+def test_pool_keeps_envs_with_different_instance_arguments_apart():
+    pool = EnvPool(max_size=2)
+    env = pool.acquire(EnvSpec(FakeEnv, "env", param={"limit": 1}))
+    pool.release(env)
+    assert pool.acquire(EnvSpec(FakeEnv, "env", param={"limit": 2})) is not env
+
+
+def test_pool_closes_least_recently_used_envs():
+    pool = EnvPool(max_size=1)
+    env_a = pool.acquire(EnvSpec(FakeEnv, "a"))
+    env_b = pool.acquire(EnvSpec(FakeEnv, "b"))
+    pool.release(env_a)
+    pool.release(env_b)
+    assert env_a.closed
+    assert not env_b.closed
+    pool.close()
+    assert env_b.closed
+
+
+def test_specs_that_cant_be_fingerprinted_are_not_pooled():
+    pool = EnvPool(max_size=1)
+    spec = EnvSpec(FakeEnv, "env", param=Cyclic())
+    env = pool.acquire(spec)
+    pool.release(env)
+    assert env.closed
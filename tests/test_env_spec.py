@@ -0,0 +1,45 @@
+from src.envs.env_spec import EnvSpec
+
+
+class FakeBackend(object):
+    pass
+
+
+class FakeEnv(object):
+    def __init__(self, name, backend=None, difficulty=None):
+        self.name = name
+        self.backend = backend
+        self.difficulty = difficulty
+
+
+def test_make_creates_a_new_env_with_the_arguments():
+    spec = EnvSpec(FakeEnv, "env", difficulty="competition")
+    env_a, env_b = spec.make(), spec.make()
+    assert env_a is not env_b
+    assert (env_a.name, env_a.difficulty, env_a.backend) == ("env", "competition", None)
+
+
+def test_backend_class_of_the_spec_is_instantiated_per_env():
+    spec = EnvSpec(FakeEnv, "env", backend=FakeBackend)
+    env_a, env_b = spec.make(), spec.make()
+    assert isinstance(env_a.backend, FakeBackend)
+    assert env_a.backend is not env_b.backend
+    # the spec keeps the class
+    assert spec.env_kwargs["backend"] is FakeBackend
+
+
+def test_backend_class_argument_is_used_when_the_spec_has_none():
+    assert isinstance(EnvSpec(FakeEnv, "env").make(FakeBackend).backend, FakeBackend)
+
+    class OtherBackend(object):
+        pass
+
+    assert isinstance(EnvSpec(FakeEnv, "env", backend=OtherBackend).make(FakeBackend).backend, OtherBackend)
+
+
+def test_backend_instance_is_shared(caplog):
+    backend = FakeBackend()
+    spec = EnvSpec(FakeEnv, "env", backend=backend)
+    with caplog.at_level("WARNING", logger="src.envs.env_spec"):
+        assert spec.make().backend is backend
+    assert "shared by every environment" in caplog.text
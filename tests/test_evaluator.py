@@ -0,0 +1,133 @@
+import os
+import sys
+import types
+
+import numpy as np
+
+import src.evaluators
+from src import constants
+from src.evaluators.evaluator import evaluate_agent, evaluation_worker_factory, make_evaluation_worker_factory
+
+
+class FakeModel(object):
+    def __init__(self):
+        self.saved_path = None
+
+    def save(self, path):
+        self.saved_path = path
+        with open(F"{path}.zip", "w") as f:
+            f.write("model")
+
+
+class FakeAgent(object):
+    def __init__(self, nn_model=None):
+        self.nn_model = nn_model
+
+
+class FakeEnvSpec(object):
+    def make(self, backend_class=False):
+        return "env"
+
+
+def _config(load_path=None, training=False):
+    return {"env": {"env_spec": FakeEnvSpec()}, "agent": {"load_path": load_path}, "training": training}
+
+
+def test_no_env_spec():
+    assert make_evaluation_worker_factory(FakeAgent(FakeModel()), {"env": {}, "agent": {}}, "unused") is None
+
+
+def test_agent_is_saved_in_a_temporary_folder():
+    nn_model = FakeModel()
+    with evaluation_worker_factory(FakeAgent(nn_model), _config()) as worker_factory:
+        assert worker_factory is not None
+        assert os.path.isfile(F"{nn_model.saved_path}.zip")
+    assert not os.path.exists(os.path.dirname(nn_model.saved_path))
+
+
+def test_loaded_agent_is_not_saved_again(tmp_path):
+    config = _config(load_path=str(tmp_path / "agent"))
+    assert make_evaluation_worker_factory(FakeAgent(FakeModel()), config, str(tmp_path / "save")) is not None
+    assert not os.path.exists(str(tmp_path / "save"))
+
+
+def test_agent_that_cant_be_saved():
+    assert make_evaluation_worker_factory(FakeAgent(), _config(), "unused") is None
+    # trained after it was loaded, the agent on disk is not the evaluated one
+    assert make_evaluation_worker_factory(FakeAgent(), _config(load_path="agent", training=True), "unused") is None
+
+
+def _l2rpn_config(nb_process):
+    config = _config()
+    config.update({"name": "test", "evaluation": constants.EVALUATION_L2RPN2022,
+                   "evaluation_kwargs": {"nb_process": nb_process}})
+    return config
+
+
+def test_l2rpn_factory_only_with_several_processes(monkeypatch):
+    factories = []
+    fake_module = types.ModuleType("src.evaluators.L2RPN2022")
+    fake_module.evaluate_agent = lambda agent, agent_factory=None, **kwargs: factories.append(agent_factory)
+    monkeypatch.setitem(sys.modules, "src.evaluators.L2RPN2022", fake_module)
+    monkeypatch.setattr(src.evaluators, "L2RPN2022", fake_module, raising=False)
+
+    nn_model = FakeModel()
+    evaluate_agent(FakeAgent(nn_model), _l2rpn_config(nb_process=1))
+    assert factories == [None]
+    assert nn_model.saved_path is None
+
+    evaluate_agent(FakeAgent(nn_model), _l2rpn_config(nb_process=2))
+    assert factories[-1] is not None
+    # the agent saved for the scoring processes is removed after the evaluation
+    assert not os.path.exists(os.path.dirname(nn_model.saved_path))
+
+
+class RandomEnv(object):
+    '''
+    Episodes of random length and rewards, given by the seed of the environment
+    '''
+
+    def __init__(self):
+        self.random = np.random.RandomState()
+
+    def seed(self, seed):
+        self.random = np.random.RandomState(seed)
+
+    def reset(self):
+        return 0
+
+    def step(self, action):
+        return 0, float(self.random.rand()), bool(self.random.rand() < 0.2), {}
+
+    def copy(self):
+        return RandomEnv()
+
+    def close(self):
+        pass
+
+
+class ConstantAgent(object):
+    def act(self, state, reward, done):
+        return 0
+
+
+def _random_worker_factory():
+    return RandomEnv(), ConstantAgent()
+
+
+def test_parallel_evaluation_gives_the_sequential_scores(tmp_path):
+    from src.evaluators import default
+
+    sequential = default.test_and_evaluate_agent(RandomEnv(), ConstantAgent(), episodes=6, max_steps=50)
+    parallel = default.test_and_evaluate_agent(RandomEnv(), ConstantAgent(), episodes=6, max_steps=50, n_workers=2,
+                                               worker_factory=_random_worker_factory,
+                                               save_path=str(tmp_path))
+    assert parallel == sequential
+    assert len({score["score"] for score in sequential.values()}) == 6
+
+    # the default seed makes the evaluation reproducible, whatever the environment played before
+    env = RandomEnv()
+    env.step(0)
+    assert default.test_and_evaluate_agent(env, ConstantAgent(), episodes=6, max_steps=50) == sequential
+    other_seed = default.test_and_evaluate_agent(RandomEnv(), ConstantAgent(), episodes=6, max_steps=50, seed=10)
+    assert other_seed != sequential
@@ -0,0 +1,72 @@
+import functools
+
+import pytest
+
+from src.envs.env_spec import EnvSpec
+from src.helpers import UnfingerprintableError, fingerprint
+
+
+class Parameters(object):
+    def __init__(self, max_line_status_changed=1):
+        self.MAX_LINE_STATUS_CHANGED = max_line_status_changed
+
+
+class DictParameters(object):
+    def __init__(self, value):
+        self.value = value
+        self.cache = object()  # not part of to_dict
+
+    def to_dict(self):
+        return {"value": self.value}
+
+
+class Cyclic(object):
+    def __init__(self):
+        self.me = self
+
+
+def _make(*args, **kwargs):
+    return args, kwargs
+
+
+def _filter_factory(max_elem):
+    def _filter(counts):
+        return counts <= max_elem
+    return _filter
+
+
+def test_plain_data_is_stable():
+    config = {"a": [1, 2.5, "x", None, True], "b": {"c": (1, 2)}, "d": {3, 1, 2}}
+    assert fingerprint(config) == fingerprint({"d": {2, 1, 3}, "b": {"c": [1, 2]}, "a": [1, 2.5, "x", None, True]})
+    assert fingerprint(config) != fingerprint({**config, "a": [1, 2.5, "x", None, False]})
+
+
+def test_instances_are_identified_by_their_content():
+    assert fingerprint(Parameters(1)) == fingerprint(Parameters(1))
+    assert fingerprint(Parameters(1)) != fingerprint(Parameters(2))
+    assert fingerprint(DictParameters(1)) == fingerprint(DictParameters(1))
+    assert fingerprint(DictParameters(1)) != fingerprint(DictParameters(2))
+
+
+def test_env_specs_with_different_instance_arguments_differ():
+    spec_1 = EnvSpec(_make, "env", param=Parameters(1))
+    spec_2 = EnvSpec(_make, "env", param=Parameters(2))
+    assert spec_1.fingerprint() != spec_2.fingerprint()
+    assert spec_1.fingerprint() == EnvSpec(_make, "env", param=Parameters(1)).fingerprint()
+
+
+def test_lambdas_of_a_module_differ():
+    first = lambda value: value + 1  # noqa: E731
+    second = lambda value: value + 2  # noqa: E731
+    assert fingerprint(first) != fingerprint(second)
+
+
+def test_closures_and_partials_include_their_arguments():
+    assert fingerprint(_filter_factory(3)) == fingerprint(_filter_factory(3))
+    assert fingerprint(_filter_factory(3)) != fingerprint(_filter_factory(4))
+    assert fingerprint(functools.partial(_make, 1)) != fingerprint(functools.partial(_make, 2))
+
+
+def test_cyclic_instances_cant_be_fingerprinted():
+    with pytest.raises(UnfingerprintableError):
+        fingerprint({"env": Cyclic()})
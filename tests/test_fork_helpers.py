@@ -0,0 +1,53 @@
+import multiprocessing
+
+import pytest
+
+from src.helpers import fork_executor, fork_state, fork_workers, get_fork_state
+
+needs_fork = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                                reason="the 'fork' start method is not available")
+
+
+def _read_state(key):
+    return get_fork_state(key)
+
+
+def _call_state(value):
+    return get_fork_state("function")(value)
+
+
+def test_fork_state_is_restored():
+    with fork_state(value=1):
+        assert get_fork_state("value") == 1
+        with fork_state(value=2):
+            assert get_fork_state("value") == 2
+        assert get_fork_state("value") == 1
+    assert get_fork_state("value") is None
+    assert get_fork_state("value", "default") == "default"
+
+
+def test_fork_state_is_removed_on_error():
+    with pytest.raises(ValueError):
+        with fork_state(value=1):
+            raise ValueError()
+    assert get_fork_state("value") is None
+
+
+def test_fork_workers():
+    assert fork_workers(1) == 1
+    assert fork_workers(0) == 1
+    assert fork_workers(None) >= 1
+
+
+@needs_fork
+def test_fork_executor_shares_unpicklable_state():
+    # a lambda can't be pickled, the workers inherit it
+    with fork_executor(2, function=lambda value: value * 2) as executor:
+        assert list(executor.map(_call_state, [1, 2, 3])) == [2, 4, 6]
+    assert get_fork_state("function") is None
+
+
+@needs_fork
+def test_fork_executor_state_is_visible_to_the_workers():
+    with fork_executor(2, name="worker state") as executor:
+        assert executor.submit(_read_state, "name").result() == "worker state"
@@ -0,0 +1,127 @@
+import warnings
+
+import pytest
+
+grid2op = pytest.importorskip("grid2op")
+pytest.importorskip("gym")
+
+from grid2op.gym_compat import BoxGymObsSpace, DiscreteActSpace
+
+from src.agents.grid2OpGymAgent import Grid2OpGymAgent
+from src.envs.gymenv_heuristics import GymEnvWithRecoWithDN
+
+
+class DisconnectAgent(Grid2OpGymAgent):
+    '''
+    The network always disconnects line 3, the heuristic actions are reversed by `clean_heuristic_actions`
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.cleaned = []
+        super().__init__(*args, nn_kwargs={}, **kwargs)
+
+    def get_act(self, gym_obs, reward, done):
+        return self._action_id
+
+    def load(self):
+        pass
+
+    def build(self):
+        self._action_id = next(act_id for act_id in range(self._gym_act_space.n)
+                               if self._gym_act_space.from_gym(act_id) ==
+                               self.action_space({"set_line_status": [(3, -1)]}))
+
+    def clean_heuristic_actions(self, observation, reward, done, action_list=None):
+        self.cleaned.append(action_list)
+        action_list.reverse()
+
+
+@pytest.fixture
+def gymenv():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        env = grid2op.make("l2rpn_case14_sandbox", test=True)
+    # never safe: the agent is asked to act when there is nothing to reconnect
+    gymenv = GymEnvWithRecoWithDN(env, safe_max_rho=-1.)
+    gymenv.action_space.close()
+    gymenv.action_space = DiscreteActSpace(env.action_space, attr_to_keep=["set_line_status"])
+    gymenv.observation_space.close()
+    gymenv.observation_space = BoxGymObsSpace(env.observation_space, attr_to_keep=["rho"])
+    yield gymenv
+    gymenv.close()
+
+
+def test_act_batch_keeps_the_heuristic_actions_of_each_environment(gymenv):
+    env = gymenv.init_env
+    agent = DisconnectAgent(env.action_space, gymenv.action_space, gymenv.observation_space, gymenv=gymenv)
+    obs = env.reset()
+    disconnected = obs.copy()
+    disconnected.line_status[[5, 7]] = False
+    disconnected.time_before_cooldown_line[:] = 0
+
+    actions = agent.act_batch([obs, disconnected], [0., 0.], [False, False], slots=[0, 1])
+    assert actions[0] == env.action_space({"set_line_status": [(3, -1)]})
+    # the heuristic reconnects the lines one by one, in the order of clean_heuristic_actions
+    assert actions[1] == env.action_space({"set_line_status": [(7, +1)]})
+    assert agent.cleaned[-1] is agent._slot_action_lists[1]
+    assert agent._action_list == []
+
+    # the other pending reconnection of environment 1 is played, environment 0 asks the network again
+    actions = agent.act_batch([obs, disconnected], [0., 0.], [False, False], slots=[0, 1])
+    assert actions[0] == env.action_space({"set_line_status": [(3, -1)]})
+    assert actions[1] == env.action_space({"set_line_status": [(5, +1)]})
+    assert agent._action_list == []
+
+    # act uses its own list
+    assert agent.act(disconnected, 0., False) == env.action_space({"set_line_status": [(7, +1)]})
+    assert agent.cleaned[-1] is agent._action_list
+
+
+class TopKAgent(DisconnectAgent):
+    def get_top_k_acts(self, gym_obs, k):
+        return list(range(k))
+
+
+def test_candidate_actions_only_with_gate_inference():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        env = grid2op.make("l2rpn_case14_sandbox", test=True)
+    for gate_inference, top_k, expected in [(False, 2, 0), (True, 0, 0), (True, 2, 2)]:
+        gymenv = GymEnvWithRecoWithDN(env, safe_max_rho=-1., simulate_gate=True, top_k=top_k,
+                                      gate_inference=gate_inference)
+        gymenv.action_space.close()
+        gymenv.action_space = DiscreteActSpace(env.action_space, attr_to_keep=["set_line_status"])
+        agent = TopKAgent(env.action_space, gymenv.action_space, gymenv.observation_space, gymenv=gymenv)
+        candidates = agent.get_candidate_actions(gymenv.reset())
+        assert candidates == [gymenv.fix_action(gymenv.action_space.from_gym(gym_act))
+                              for gym_act in range(expected)]
+        gymenv.close()
+    env.close()
+
+
+def test_sb3_top_k_acts_are_the_best_q_values():
+    pytest.importorskip("stable_baselines3")
+    import torch as th
+    from stable_baselines3 import DQN
+    from src.agents.Grid2OpSB3 import SB3AgentGrid2Op
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        env = grid2op.make("l2rpn_case14_sandbox", test=True)
+    gymenv = GymEnvWithRecoWithDN(env, safe_max_rho=-1.)
+    gymenv.action_space.close()
+    gymenv.action_space = DiscreteActSpace(env.action_space, attr_to_keep=["set_line_status"])
+    gymenv.observation_space.close()
+    gymenv.observation_space = BoxGymObsSpace(env.observation_space, attr_to_keep=["rho"])
+    try:
+        agent = SB3AgentGrid2Op(env.action_space, gymenv.action_space, gymenv.observation_space, nn_type=DQN,
+                                nn_kwargs={"policy": "MlpPolicy", "env": gymenv}, gymenv=gymenv)
+        gym_obs = gymenv.reset()
+        top_k = agent.get_top_k_acts(gym_obs, 3)
+        obs_tensor, _ = agent.nn_model.policy.obs_to_tensor(gym_obs)
+        with th.no_grad():
+            q_values = agent.nn_model.policy.q_net(obs_tensor).reshape(-1).numpy()
+        assert len(top_k) == 3
+        assert list(q_values[top_k]) == sorted(q_values, reverse=True)[:3]
+    finally:
+        gymenv.close()
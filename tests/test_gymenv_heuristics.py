@@ -0,0 +1,139 @@
+import warnings
+
+import pytest
+
+grid2op = pytest.importorskip("grid2op")
+pytest.importorskip("gym")
+
+import numpy as np
+from grid2op.Parameters import Parameters
+from grid2op.gym_compat import DiscreteActSpace
+
+from src.envs.gymenv_heuristics import GymEnvWithReco, GymEnvWithRecoWithDN
+
+
+def _make_env(max_line_status_changed):
+    param = Parameters()
+    param.MAX_LINE_STATUS_CHANGED = max_line_status_changed
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return grid2op.make("l2rpn_case14_sandbox", test=True, param=param)
+
+
+def _disconnected_obs(env, line_ids, cooldown_line_id=None):
+    obs = env.reset().copy()
+    obs.line_status[line_ids] = False
+    obs.time_before_cooldown_line[:] = 0
+    if cooldown_line_id is not None:
+        obs.time_before_cooldown_line[cooldown_line_id] = 2
+    return obs
+
+
+def _reconnected(action):
+    return sorted(int(line_id) for line_id in (action.line_set_status == 1).nonzero()[0])
+
+
+@pytest.mark.parametrize("limit, groups", [(1, [[1], [4], [7], [9], [12]]),
+                                           (2, [[1, 4], [7, 9], [12]]),
+                                           (5, [[1, 4, 7, 9, 12]])])
+def test_merge_reco_groups_by_max_line_status_changed(limit, groups):
+    env = _make_env(limit)
+    gymenv = GymEnvWithReco(env, merge_reco=True)
+    try:
+        obs = _disconnected_obs(env, [1, 4, 7, 9, 12, 14], cooldown_line_id=14)
+        actions = gymenv.reconnection_actions(obs)
+        assert [_reconnected(action) for action in actions] == groups
+        # a single powerline uses the prebuilt action, every group is legal
+        assert all(action is gymenv._reco_actions[group[0]] for action, group in zip(actions, groups)
+                   if len(group) == 1)
+        assert all(env._game_rules(action, env)[0] for action in actions)
+    finally:
+        gymenv.close()
+
+
+def test_one_action_per_powerline_without_merge_reco():
+    env = _make_env(3)
+    gymenv = GymEnvWithReco(env)
+    try:
+        actions = gymenv.reconnection_actions(_disconnected_obs(env, [1, 4, 7]))
+        assert actions == [gymenv._reco_actions[line_id] for line_id in [1, 4, 7]]
+        assert gymenv.reconnection_actions(env.reset()) == []
+    finally:
+        gymenv.close()
+
+
+def test_prebuilt_actions_are_not_modified_by_the_heuristics():
+    env = _make_env(1)
+    gymenv = GymEnvWithReco(env)
+    try:
+        gymenv.reset()
+        obs, *_ = env.step(env.action_space({"set_line_status": [(3, -1)]}))
+        for _ in range(env.parameters.NB_TIMESTEP_COOLDOWN_LINE):
+            obs, *_ = env.step(gymenv.do_nothing_action)
+        obs, _, done, _ = gymenv.apply_heuristics_actions(obs, 0., False, {})
+        assert not done and obs.line_status[3]
+        assert gymenv.do_nothing_action == env.action_space({})
+        assert all(action == env.action_space({"set_line_status": [(line_id, +1)]})
+                   for line_id, action in enumerate(gymenv._reco_actions))
+    finally:
+        gymenv.close()
+
+
+class SafeStretchEnv(GymEnvWithRecoWithDN):
+    '''
+    The grid is safe (do nothing) except every `period` steps, when the agent acts. Records whether the forecasts
+    were on at each grid2op step.
+    '''
+
+    def __init__(self, *args, period=3, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.period = period
+        self.forecasts = []
+
+    def heuristic_actions(self, g2op_obs, reward, done, info):
+        if g2op_obs.current_step % self.period:
+            return [self.do_nothing_action]
+        return []
+
+    def _g2op_step(self, g2op_act):
+        result = super()._g2op_step(g2op_act)
+        self.forecasts.append((g2op_act is self.do_nothing_action, self.init_env.with_forecast))
+        return result
+
+
+def _stretch_env(skip_forecasts):
+    env = _make_env(1)
+    env.seed(0)
+    env.set_id(0)
+    gymenv = SafeStretchEnv(env, skip_forecasts=skip_forecasts)
+    gymenv.action_space.close()
+    gymenv.action_space = DiscreteActSpace(env.action_space, attr_to_keep=["redispatch"])
+    return gymenv
+
+
+def test_skip_forecasts_during_the_safe_stretches():
+    gymenv = _stretch_env(skip_forecasts=True)
+    reference = _stretch_env(skip_forecasts=False)
+    try:
+        gymenv.reset()
+        reference.reset()
+        for _ in range(3):
+            g2op_obs, expected = gymenv.init_env.get_obs(), reference.init_env.get_obs()
+            assert g2op_obs.current_step == expected.current_step and g2op_obs.current_step % 3 == 0
+            # the observation of the agent is the one computed with the forecasts
+            np.testing.assert_allclose(g2op_obs.to_vect(), expected.to_vect())
+            # and it can be simulated, with the forecasts of the reference
+            sim_obs, sim_reward, sim_done, _ = g2op_obs.simulate(gymenv.do_nothing_action)
+            expected_sim_obs, expected_reward, expected_done, _ = expected.simulate(reference.do_nothing_action)
+            assert not sim_done and not expected_done
+            assert sim_reward == pytest.approx(expected_reward)
+            np.testing.assert_allclose(sim_obs.rho, expected_sim_obs.rho)
+            gymenv.step(1)
+            reference.step(1)
+        # the safe steps are played without forecasts, the steps of the agent with them
+        assert gymenv.forecasts and all(with_forecast != do_nothing for do_nothing, with_forecast in gymenv.forecasts)
+        assert all(with_forecast for _, with_forecast in reference.forecasts)
+        assert gymenv.init_env.with_forecast
+    finally:
+        gymenv.close()
+        reference.close()
@@ -0,0 +1,96 @@
+import json
+import os
+import shutil
+import warnings
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+grid2op = pytest.importorskip("grid2op")
+pytest.importorskip("matplotlib")
+pytest.importorskip("imageio")
+
+from grid2op.Agent import RandomAgent
+
+from src.evaluators import L2RPN2022
+
+
+@pytest.fixture(scope="module")
+def input_dir(tmp_path_factory):
+    '''
+    Small L2RPN2022-like dataset: the first 2 scenarios of the case14 sandbox cut to 30 steps, the reference
+    statistics are computed once for the module
+    '''
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        env = grid2op.make("l2rpn_case14_sandbox", test=True)
+        path_env = env.get_path_env()
+        env.close()
+    input_dir = str(tmp_path_factory.mktemp("dataset"))
+    shutil.copytree(path_env, input_dir, dirs_exist_ok=True, ignore=shutil.ignore_patterns("__pycache__", "_statistics_*"))
+    chronics = sorted(os.listdir(os.path.join(input_dir, "chronics")))
+    for name in chronics[2:]:
+        shutil.rmtree(os.path.join(input_dir, "chronics", name))
+    for name in chronics[:2]:
+        folder = os.path.join(input_dir, "chronics", name)
+        for file_name in os.listdir(folder):
+            if file_name.endswith(".csv.bz2"):
+                path = os.path.join(folder, file_name)
+                pd.read_csv(path, sep=";").head(30).to_csv(path, sep=";", index=False)
+    config = {"nb_scenario": 2,
+              "score_config": {"seed": 19350, "min_losses_ratio": 0.8, "key_score": "grid_operation_cost",
+                               "timeout": "4900", "total_timesteps": 1},
+              "episodes_info": {name: {"name": name, "seed": seed, "length": 1}
+                                for name, seed in zip(chronics[:2], [494712124, 1466041587])}}
+    with open(os.path.join(input_dir, "L2RPN2022_config.json"), "w") as f:
+        json.dump(config, f)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(L2RPN2022, "DEFAULT_INPUT_DIR", input_dir)
+        # the html report needs the 52 scenarios of the real dataset
+        monkeypatch.setattr(L2RPN2022, "process_scores", lambda agent_dir: None)
+        yield input_dir
+    L2RPN2022.close_evaluation_contexts()
+
+
+def _evaluate(agent, save_path):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        L2RPN2022.evaluate_agent(agent, save_path=save_path)
+    with open(os.path.join(save_path, L2RPN2022.SCORES_JSON), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_consecutive_evaluations_give_the_same_scores(input_dir, tmp_path):
+    context = L2RPN2022.get_evaluation_context(input_dir)
+    agent = RandomAgent(context.real_env.action_space)
+    first = _evaluate(agent, str(tmp_path / "first"))
+    # the scoring environment and the reference statistics of the first evaluation are reused
+    assert L2RPN2022.get_evaluation_context(input_dir) is context
+    second = _evaluate(agent, str(tmp_path / "second"))
+    assert first == second
+    assert len(first["scores"]) == 2
+
+
+def test_reused_context_logs_the_ignored_arguments(input_dir, caplog):
+    context = L2RPN2022.get_evaluation_context(input_dir, nb_process_stats=1)
+    with caplog.at_level("WARNING", logger=L2RPN2022.__name__):
+        assert L2RPN2022.get_evaluation_context(input_dir, nb_process_stats=2) is context
+    assert "nb_process_stats=2 is ignored" in caplog.text
+
+
+def test_reset_leaves_the_global_random_state_of_the_original_evaluation(input_dir):
+    import numpy as np
+    from grid2op.dtypes import dt_int
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        context = L2RPN2022.get_evaluation_context(input_dir)
+    # the original evaluation seeded the global generator and drew the agent seeds from it
+    np.random.seed(19350)
+    agent_seeds = list(np.random.randint(np.iinfo(dt_int).max, size=2))
+    expected = np.random.rand(3)
+    assert context.agent_seeds == agent_seeds
+
+    np.random.rand(5)
+    context.reset()
+    np.testing.assert_array_equal(np.random.rand(3), expected)
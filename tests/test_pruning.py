@@ -0,0 +1,66 @@
+import warnings
+
+import numpy as np
+import pytest
+
+grid2op = pytest.importorskip("grid2op")
+
+from src.actions import pruning
+from src.envs.env_spec import EnvSpec
+
+ENV_SPEC = EnvSpec(grid2op.make, "l2rpn_case14_sandbox", test=True)
+
+
+@pytest.fixture
+def vectors():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        env = ENV_SPEC.make()
+    actions = [env.action_space({})] + [env.action_space({"set_line_status": [(line_id, -1)]})
+                                        for line_id in range(8)]
+    env.close()
+    return np.array([action.to_vect() for action in actions])
+
+
+def test_prune_keeps_the_best_actions(vectors):
+    kept, counts = pruning.prune_action_space(ENV_SPEC, vectors, rho_threshold=0., max_steps=3,
+                                              scenarios=[0, 1], n_workers=1)
+    assert counts.shape == (vectors.shape[0],)
+    # 2 scenarios of 3 steps, at least one best action per step
+    assert counts.max() <= 6 and counts.sum() >= 6
+    keep = counts > 0
+    keep[0] = True
+    np.testing.assert_array_equal(kept, vectors[keep])
+    # most line disconnections never beat the others
+    assert kept.shape[0] < vectors.shape[0]
+
+
+def test_prune_is_the_same_with_several_workers(vectors):
+    _, counts = pruning.prune_action_space(ENV_SPEC, vectors, rho_threshold=0., max_steps=3,
+                                           scenarios=[0, 1], n_workers=1)
+    _, parallel_counts = pruning.prune_action_space(ENV_SPEC, vectors, rho_threshold=0., max_steps=3,
+                                                    scenarios=[0, 1], n_workers=2)
+    np.testing.assert_array_equal(counts, parallel_counts)
+
+
+def test_do_nothing_is_always_kept(vectors):
+    # no state is above the threshold: only do nothing is played
+    kept, counts = pruning.prune_action_space(ENV_SPEC, vectors, rho_threshold=10., max_steps=3,
+                                              scenarios=[0], n_workers=1)
+    assert not counts.any()
+    np.testing.assert_array_equal(kept, vectors[:1])
+
+
+def test_backend_class_is_used(vectors):
+    from grid2op.Backend import PandaPowerBackend
+
+    made = []
+
+    class RecordingBackend(PandaPowerBackend):
+        def __init__(self, *args, **kwargs):
+            made.append(self)
+            super().__init__(*args, **kwargs)
+
+    pruning.prune_action_space(ENV_SPEC, vectors, rho_threshold=10., max_steps=1, scenarios=[0], n_workers=1,
+                               backend_class=RecordingBackend)
+    assert made
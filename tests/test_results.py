@@ -0,0 +1,80 @@
+import json
+import math
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from src.evaluators.results import RESULTS_STREAM_FILE, ResultStream, RunningStats, read_results
+
+
+def test_running_stats_match_pandas():
+    values = [3., -1.5, 10., 2.25, 0.]
+    stats = RunningStats()
+    for value in values:
+        stats.update(value)
+    series = pd.Series(values)
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(series.mean())
+    assert stats.std == pytest.approx(series.std())
+    assert (stats.min, stats.max) == (series.min(), series.max())
+
+
+def test_running_stats_without_values():
+    stats = RunningStats()
+    assert all(math.isnan(value) for key, value in stats.to_dict().items() if key != "count")
+    stats.update(1)
+    assert math.isnan(stats.variance)
+    assert stats.to_dict()["mean"] == 1.
+
+
+def test_stream_writes_one_line_per_result(tmp_path):
+    path = str(tmp_path / "eval" / RESULTS_STREAM_FILE)
+    records = [{"episode": i, "score": float(i * 10), "steps": i + 1, "done": True, "name": F"ep_{i}"}
+               for i in range(5)]
+    with ResultStream(path, fsync_every=2) as stream:
+        for record in records:
+            stream.append(record)
+        # the lines are readable before the stream is closed
+        assert len(read_results(path)) == len(records)
+    with open(path, "r", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == records
+
+    # episode, booleans and strings have no statistics
+    summary = stream.summary()
+    assert sorted(summary.index) == ["score", "steps"]
+    assert summary.loc["score", "mean"] == pytest.approx(20.)
+    assert summary.loc["steps", "max"] == 5
+    assert stream.mean()["steps"] == pytest.approx(3.)
+    pd.testing.assert_frame_equal(read_results(path), pd.DataFrame(records), check_dtype=False)
+
+
+def test_stream_append_and_new(tmp_path):
+    path = str(tmp_path / RESULTS_STREAM_FILE)
+    with ResultStream(path) as stream:
+        stream.append({"episode": 0, "score": 1.})
+    with ResultStream(path, append=True) as stream:
+        stream.append({"episode": 1, "score": 2.})
+    assert list(read_results(path)["episode"]) == [0, 1]
+    with ResultStream(path) as stream:
+        stream.append({"episode": 2, "score": 3.})
+    assert list(read_results(path)["episode"]) == [2]
+
+
+def test_stream_without_file():
+    stream = ResultStream()
+    stream.append({"score": 1.})
+    stream.append({"score": 3.})
+    stream.close()
+    assert stream.mean()["score"] == 2.
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = str(tmp_path / RESULTS_STREAM_FILE)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"episode": 0, "score": 1.0}\n{"episode": 1, "score": 2.0}\n{"episode": 2, "sco')
+    assert list(read_results(path)["score"]) == [1., 2.]
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"episode": 0, "sco')
+    assert read_results(path).empty
@@ -0,0 +1,176 @@
+import logging
+import pickle
+
+import pytest
+
+
+class CandidateEnv(object):
+    def __init__(self, top_k=2):
+        self.top_k = top_k
+        self.candidate_policy = None
+
+    def set_candidate_policy(self, candidate_policy):
+        self.candidate_policy = candidate_policy
+
+
+class TopKAgent(object):
+    def get_top_k_acts(self, gym_obs, k):
+        return list(range(k))
+
+
+def test_candidate_policy_is_set_on_the_training_env(fake_sb3):
+    from src.makers.SB3 import set_candidate_policy
+
+    agent = TopKAgent()
+    env_gym = CandidateEnv()
+    set_candidate_policy(agent, env_gym)
+    assert env_gym.candidate_policy == agent.get_top_k_acts
+
+    env_gym = CandidateEnv(top_k=0)
+    set_candidate_policy(agent, env_gym)
+    assert env_gym.candidate_policy is None
+
+
+def test_candidate_policy_is_set_on_the_dummy_vec_env_copies(fake_sb3):
+    from src.makers.SB3 import set_candidate_policy
+
+    agent = TopKAgent()
+    env_gym = CandidateEnv()
+    vec_env = fake_sb3.vec_env.DummyVecEnv([lambda: env_gym, CandidateEnv])
+    set_candidate_policy(agent, env_gym, vec_env)
+    assert all(env.candidate_policy == agent.get_top_k_acts for env in vec_env.envs)
+
+
+def test_candidate_policy_of_subproc_workers_is_reported(fake_sb3, caplog):
+    from src.makers.SB3 import set_candidate_policy
+
+    env_gym = CandidateEnv()
+    vec_env = fake_sb3.vec_env.SubprocVecEnv([CandidateEnv, CandidateEnv])
+    with caplog.at_level(logging.WARNING):
+        set_candidate_policy(TopKAgent(), env_gym, vec_env)
+    assert env_gym.candidate_policy is None
+    assert "no candidates" in caplog.text
+
+
+class NormalizedModel(object):
+    def __init__(self, env, vec_normalize=None):
+        self.env = env if vec_normalize is None else vec_normalize
+        self.vec_normalize = vec_normalize
+
+    def get_env(self):
+        return self.env
+
+    def get_vec_normalize_env(self):
+        return self.vec_normalize
+
+    def set_env(self, env):
+        self.env = env
+
+
+class ModelAgent(object):
+    def __init__(self, nn_model):
+        self.nn_model = nn_model
+
+
+def test_vecnormalize_statistics_are_loaded(fake_sb3):
+    from src.makers.SB3 import load_checkpoint_state
+
+    venv = object()
+    model = NormalizedModel(venv, fake_sb3.vec_env.VecNormalize(venv))
+    load_checkpoint_state(ModelAgent(model), {"vecnormalize": "stats.pkl"})
+    assert isinstance(model.env, fake_sb3.vec_env.VecNormalize)
+    assert model.env.path == "stats.pkl" and model.env.venv is venv
+
+
+def test_env_without_vecnormalize_is_wrapped(fake_sb3, caplog):
+    from src.makers.SB3 import load_checkpoint_state
+
+    venv = object()
+    model = NormalizedModel(venv)
+    with caplog.at_level(logging.WARNING):
+        load_checkpoint_state(ModelAgent(model), {"vecnormalize": "stats.pkl"})
+    assert model.env.path == "stats.pkl" and model.env.venv is venv
+    assert "not a VecNormalize" in caplog.text
+
+    caplog.clear()
+    model = NormalizedModel(None)
+    with caplog.at_level(logging.WARNING):
+        load_checkpoint_state(ModelAgent(model), {"vecnormalize": "stats.pkl"})
+    assert model.env is None
+    assert "not loaded" in caplog.text
+
+
+gym = pytest.importorskip("gym")
+
+
+class FakeGymEnv(gym.Env):
+    def __init__(self, name="env"):
+        self.name = name
+        self.seeds = []
+
+    def seed(self, seed=None):
+        self.seeds.append(seed)
+
+    def copy(self):
+        return FakeGymEnv(self.name)
+
+
+def _experiment_config(vec_env_class, env_spec=True, start_method=None):
+    from src.envs.env_spec import EnvSpec
+
+    env = FakeGymEnv()
+    env_config = {"env": env, "vec_env_class": vec_env_class, "seed": 3}
+    if env_spec:
+        env_config["env_spec"] = EnvSpec(FakeGymEnv, "worker")
+    if start_method is not None:
+        env_config["vec_env_start_method"] = start_method
+    return {"env": env_config}, env
+
+
+@pytest.fixture
+def shared_memory_vec_env(fake_sb3, monkeypatch):
+    # the workers of the real SharedMemoryVecEnv are not started
+    from src.envs import shared_memory_vec_env
+
+    shared_memory_class = type("SharedMemoryVecEnv", (fake_sb3.vec_env.VecEnv,), {})
+    monkeypatch.setattr(shared_memory_vec_env, "SharedMemoryVecEnv", shared_memory_class)
+    return shared_memory_class
+
+
+@pytest.mark.parametrize("vec_env_class", ["subproc", "shared_memory"])
+def test_vec_env_workers_build_their_env_from_the_spec(fake_sb3, shared_memory_vec_env, vec_env_class):
+    from src.makers.SB3 import make_vec_env
+
+    experiment_config, env = _experiment_config(vec_env_class)
+    vec_env = make_vec_env(experiment_config, env, 3)
+    expected_class = shared_memory_vec_env if vec_env_class == "shared_memory" else fake_sb3.vec_env.SubprocVecEnv
+    assert type(vec_env) is expected_class
+    assert len(vec_env.env_fns) == 3 and vec_env.start_method is None
+    workers = [env_fn() for env_fn in vec_env.env_fns]
+    assert all(worker is not env and worker.name == "worker" for worker in workers)
+    assert [worker.seeds for worker in workers] == [[3], [4], [5]]
+
+
+def test_vec_env_workers_can_be_pickled_for_other_start_methods(fake_sb3, shared_memory_vec_env):
+    from src.makers.SB3 import make_vec_env
+
+    experiment_config, env = _experiment_config("subproc", start_method="spawn")
+    vec_env = make_vec_env(experiment_config, env, 2)
+    assert vec_env.start_method == "spawn"
+    # with spawn (or forkserver) the env factories are pickled to the workers, without the experiment environment
+    env_fns = pickle.loads(pickle.dumps(vec_env.env_fns))
+    workers = [env_fn() for env_fn in env_fns]
+    assert [(worker.name, worker.seeds) for worker in workers] == [("worker", [3]), ("worker", [4])]
+
+
+@pytest.mark.parametrize("vec_env_class, env_spec", [("dummy", True), ("subproc", False), ("shared_memory", False)])
+def test_dummy_vec_env_copies_the_experiment_env(fake_sb3, shared_memory_vec_env, vec_env_class, env_spec):
+    from src.makers.SB3 import make_vec_env
+
+    experiment_config, env = _experiment_config(vec_env_class, env_spec=env_spec)
+    vec_env = make_vec_env(experiment_config, env, 3)
+    assert type(vec_env) is fake_sb3.vec_env.DummyVecEnv
+    # the first environment is the one of the experiment, the other ones are copies
+    assert vec_env.envs[0] is env
+    assert all(copy is not env and copy.name == "env" for copy in vec_env.envs[1:])
+    assert [copy.seeds for copy in vec_env.envs] == [[3], [4], [5]]
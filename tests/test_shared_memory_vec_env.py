@@ -0,0 +1,68 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+gym = pytest.importorskip("gym")
+pytest.importorskip("stable_baselines3")
+
+from src.envs.shared_memory_vec_env import SharedMemoryVecEnv
+
+
+class CounterEnv(gym.Env):
+    '''
+    The observation is the number of steps since the reset, the episode ends after 3 steps.
+    Action 1 raises an error.
+    '''
+
+    def __init__(self):
+        self.observation_space = gym.spaces.Box(low=0, high=10, shape=(2,), dtype=np.float32)
+        self.action_space = gym.spaces.Discrete(2)
+        self.steps = 0
+
+    def reset(self):
+        self.steps = 0
+        return np.zeros(2, dtype=np.float32)
+
+    def step(self, action):
+        if action == 1:
+            raise ValueError("bad action")
+        self.steps += 1
+        return np.full(2, self.steps, dtype=np.float32), 1.0, self.steps >= 3, {}
+
+
+def failing_env():
+    raise ValueError("env can't be built")
+
+
+def test_step_and_reset():
+    vec_env = SharedMemoryVecEnv([CounterEnv, CounterEnv], start_method="fork")
+    try:
+        assert np.array_equal(vec_env.reset(), np.zeros((2, 2)))
+        for step in range(1, 3):
+            observations, rewards, dones, _ = vec_env.step(np.array([0, 0]))
+            assert np.array_equal(observations, np.full((2, 2), step))
+            assert not dones.any()
+        observations, rewards, dones, infos = vec_env.step(np.array([0, 0]))
+        assert dones.all()
+        assert np.array_equal(observations, np.zeros((2, 2)))
+        assert np.array_equal(infos[0]["terminal_observation"], np.full(2, 3))
+    finally:
+        vec_env.close()
+
+
+def test_worker_error_is_raised():
+    vec_env = SharedMemoryVecEnv([CounterEnv, CounterEnv], start_method="fork")
+    try:
+        vec_env.reset()
+        with pytest.raises(RuntimeError, match="bad action"):
+            vec_env.step(np.array([0, 1]))
+        # the pipes are still in sync after the error
+        observations, _, _, _ = vec_env.step(np.array([0, 0]))
+        assert observations[0][0] == 2
+    finally:
+        vec_env.close()
+    assert all(not process.is_alive() for process in vec_env.processes)
+
+
+def test_env_fn_error_is_raised():
+    with pytest.raises(RuntimeError, match="can't be built"):
+        SharedMemoryVecEnv([failing_env], start_method="fork")
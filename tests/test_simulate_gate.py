@@ -0,0 +1,143 @@
+import warnings
+
+import pytest
+
+grid2op = pytest.importorskip("grid2op")
+
+from src.envs.simulate_gate import ParallelSimulateGate, SimulateGate
+
+
+@pytest.fixture
+def env():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        env = grid2op.make("l2rpn_case14_sandbox", test=True)
+    env.seed(0)
+    env.set_id(0)
+    env.reset()
+    yield env
+    env.close()
+
+
+def _actions(env):
+    # disconnect / reconnect / change the topology of a few elements, so each action has its own simulated reward
+    return [env.action_space({"set_line_status": [(line_id, -1)]}) for line_id in range(4)] + \
+           [env.action_space({"set_line_status": [(14, +1)]}),
+            env.action_space({"change_bus": {"substations_id": [(1, [False, True, True, False, False, False])]}})]
+
+
+def test_choose_do_nothing_when_better(env):
+    gate = SimulateGate(env.action_space({}))
+    obs = env.get_obs()
+    rewards = gate.simulate_many(obs, _actions(env) + [gate.do_nothing_action])
+    chosen = gate.choose(obs, _actions(env)[0])
+    expected = gate.do_nothing_action if rewards[-1] > rewards[0] else _actions(env)[0]
+    assert chosen == expected
+
+
+def test_parallel_gate_matches_simulate(env):
+    gate = ParallelSimulateGate(env.action_space({}), n_workers=2)
+    try:
+        for step in range(6):
+            # the episode moves on, with a redispatching and a disconnected line: the workers must simulate the
+            # state of the live environment (dispatch, line status...)
+            action = env.action_space({})
+            if step == 1:
+                action = env.action_space({"redispatch": [(0, 2.0)]})
+            elif step == 3:
+                action = env.action_space({"set_line_status": [(14, -1)]})
+            obs, _, done, _ = env.step(action)
+            assert not done
+            actions = _actions(env)
+            expected = [obs.simulate(action)[1] for action in actions]
+            assert gate.simulate_many(obs, actions) == pytest.approx(expected)
+            # the results come back from the processes
+            assert gate.simulate(obs, actions[0])[1] == pytest.approx(expected[0])
+    finally:
+        gate.close()
+
+
+def test_do_nothing_is_simulated_once_per_state(env, monkeypatch):
+    pytest.importorskip("gym")
+    from grid2op.gym_compat import DiscreteActSpace
+    from src.envs.gymenv_heuristics import GymEnvWithRecoWithDN
+
+    calls = []
+    obs_class = type(env.get_obs())
+    simulate = obs_class.simulate
+
+    def counting_simulate(obs, action, *args, **kwargs):
+        calls.append(action)
+        return simulate(obs, action, *args, **kwargs)
+
+    monkeypatch.setattr(obs_class, "simulate", counting_simulate)
+    # never safe: the agent acts at each step
+    gymenv = GymEnvWithRecoWithDN(env, safe_max_rho=-1., simulate_gate=True)
+    try:
+        gymenv.action_space.close()
+        gymenv.action_space = DiscreteActSpace(env.action_space, attr_to_keep=["redispatch"])
+        gymenv.reset()
+        # the state handed to the agent has its do nothing simulation
+        assert calls == [gymenv.do_nothing_action]
+        calls.clear()
+        _, _, done, _ = gymenv.step(1)
+        assert not done
+        # the action of the agent on the previous state, and doing nothing on the new one
+        assert len(calls) == 2 and calls[-1] is gymenv.do_nothing_action
+        for _ in range(3):
+            calls.clear()
+            # the inference agent gates its action on the state: doing nothing is already simulated
+            gymenv.gate_action(gymenv.init_env.get_obs(), gymenv.action_space.from_gym(1))
+            assert len(calls) == 1 and calls[0] is not gymenv.do_nothing_action
+            # the env gates the same action on the same state, only the new state is simulated
+            _, _, done, _ = gymenv.step(1)
+            assert not done
+            assert len(calls) == 2 and calls[-1] is gymenv.do_nothing_action
+        calls.clear()
+        gymenv.step(0)
+        # doing nothing is not gated
+        assert calls == [gymenv.do_nothing_action]
+    finally:
+        gymenv.close()
+
+
+def test_candidate_actions_are_the_top_k_of_the_policy(env):
+    pytest.importorskip("gym")
+    from grid2op.gym_compat import DiscreteActSpace
+    from src.envs.gymenv_heuristics import GymEnvWithRecoWithDN
+
+    gymenv = GymEnvWithRecoWithDN(env, safe_max_rho=-1., simulate_gate=True, top_k=3)
+    try:
+        gymenv.action_space.close()
+        gymenv.action_space = DiscreteActSpace(env.action_space, attr_to_keep=["set_line_status"])
+        gym_obs = gymenv.reset()
+        # no candidate policy
+        assert gymenv.candidate_actions(gym_obs) == []
+
+        asked = []
+
+        def candidate_policy(gym_obs, k):
+            asked.append(k)
+            return [5, 3, 1][:k]
+
+        gymenv.set_candidate_policy(candidate_policy)
+        candidates = gymenv.candidate_actions(gym_obs)
+        assert asked == [3]
+        assert candidates == [gymenv.fix_action(gymenv.action_space.from_gym(gym_act)) for gym_act in [5, 3, 1]]
+
+        # the gate plays the best of the action of the agent and its candidates, unless doing nothing is better
+        g2op_obs = gymenv.init_env.get_obs()
+        g2op_act = gymenv.action_space.from_gym(2)
+        g2op_acts = [g2op_act] + candidates
+        rewards = [g2op_obs.simulate(act)[1] for act in g2op_acts + [gymenv.do_nothing_action]]
+        best = max(range(len(g2op_acts)), key=lambda index: rewards[index])
+        expected = gymenv.do_nothing_action if rewards[-1] > rewards[best] else g2op_acts[best]
+        assert gymenv.gate_action(g2op_obs, g2op_act, candidates) == expected
+
+        # the env asks the policy for the candidates of the observation of each step
+        gymenv.step(2)
+        assert asked == [3, 3]
+        gymenv.top_k = 0
+        assert gymenv.candidate_actions(gym_obs) == []
+    finally:
+        gymenv.close()
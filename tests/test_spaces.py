@@ -0,0 +1,72 @@
+import warnings
+
+import pytest
+
+np = pytest.importorskip("numpy")
+grid2op = pytest.importorskip("grid2op")
+
+pytest.importorskip("gym")
+from grid2op.gym_compat import BoxGymObsSpace
+
+from src.envs.spaces import FastBoxGymObsSpace, MaskedDiscreteActSpace
+
+ATTR_TO_KEEP = ["rho", "line_status", "gen_p", "load_p", "topo_vect", "thermal_limit", "time_before_cooldown_line"]
+
+
+@pytest.fixture
+def env():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        env = grid2op.make("l2rpn_case14_sandbox", test=True)
+    env.seed(0)
+    env.set_id(0)
+    yield env
+    env.close()
+
+
+@pytest.mark.parametrize("copy_obs", [False, True])
+def test_same_observations_as_box_space(env, copy_obs):
+    kwargs = {"attr_to_keep": ATTR_TO_KEEP, "divide": {"gen_p": env.gen_pmax}, "subtract": {"load_p": 10.}}
+    box_space = BoxGymObsSpace(env.observation_space, **kwargs)
+    fast_space = FastBoxGymObsSpace(env.observation_space, copy_obs=copy_obs, **kwargs)
+    thermal_limit = env.get_thermal_limit()
+    obs = env.reset()
+    for step in range(10):
+        assert np.allclose(fast_space.to_gym(obs), box_space.to_gym(obs))
+        if step == 4:
+            # the thermal limits can change during an episode (dynamic line rating)
+            env.set_thermal_limit(thermal_limit * 1.1)
+        action = env.action_space({"set_line_status": [(14, -1)]}) if step == 2 else env.action_space({})
+        obs, _, done, _ = env.step(action)
+        assert not done
+    assert fast_space._fast
+
+
+def test_zero_copy_reuses_the_buffer(env):
+    fast_space = FastBoxGymObsSpace(env.observation_space, attr_to_keep=ATTR_TO_KEEP)
+    obs = env.reset()
+    gym_obs = fast_space.to_gym(obs)
+    assert fast_space.to_gym(env.step(env.action_space({}))[0]) is gym_obs
+    copy_space = FastBoxGymObsSpace(env.observation_space, attr_to_keep=ATTR_TO_KEEP, copy_obs=True)
+    assert copy_space.to_gym(obs) is not copy_space.to_gym(obs)
+
+
+def test_legal_mask_of_lines_in_cooldown():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        parameters = grid2op.Parameters.Parameters()
+        parameters.NB_TIMESTEP_COOLDOWN_LINE = 3
+        env = grid2op.make("l2rpn_case14_sandbox", test=True, param=parameters)
+    try:
+        actions = [env.action_space({}), env.action_space({"set_line_status": [(14, +1)]}),
+                   env.action_space({"set_line_status": [(3, -1)]})]
+        action_space = MaskedDiscreteActSpace(env.action_space, action_list=actions)
+        assert action_space.n == 3
+        assert action_space.legal_mask(env.reset()).tolist() == [True, True, True]
+        obs, _, _, _ = env.step(env.action_space({"set_line_status": [(14, -1)]}))
+        assert action_space.legal_mask(obs).tolist() == [True, False, True]
+        for _ in range(3):
+            obs, _, _, _ = env.step(env.action_space({}))
+        assert action_space.legal_mask(obs).tolist() == [True, True, True]
+    finally:
+        env.close()
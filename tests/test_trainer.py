@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+from src.trainner import default
+
+
+class FakeAgent(object):
+    def __init__(self):
+        self.learn_kwargs = None
+
+    def learn(self, total_timesteps=1, save_path=None, callbacks={}, **learn_kwargs):
+        self.learn_kwargs = dict(learn_kwargs, total_timesteps=total_timesteps, save_path=save_path,
+                                 callbacks=callbacks)
+
+
+class AgentWithoutCallbacks(object):
+    def __init__(self):
+        self.learn_kwargs = None
+
+    def learn(self, total_timesteps=1, save_path=None):
+        self.learn_kwargs = {"total_timesteps": total_timesteps, "save_path": save_path}
+
+
+def test_throughput_callback_is_attached_by_default(tmp_path):
+    pytest.importorskip("stable_baselines3")
+    from src.callbacks.throughput import ThroughputCallback
+
+    agent = FakeAgent()
+    save_path = str(tmp_path / "experiment" / "model")
+    other = {"class": object, "kwargs": {}}
+    default.train_agent(agent, total_timesteps=10, save_path=save_path, callbacks={"other": other})
+    callbacks = agent.learn_kwargs["callbacks"]
+    assert callbacks["other"] is other
+    assert callbacks["throughput"]["class"] is ThroughputCallback
+    # the summary is written next to the model
+    assert callbacks["throughput"]["kwargs"]["save_path"] == os.path.dirname(save_path)
+
+    default.train_agent(agent, total_timesteps=10, save_path=save_path, throughput=str(tmp_path))
+    assert agent.learn_kwargs["callbacks"]["throughput"]["kwargs"]["save_path"] == str(tmp_path)
+
+
+def test_throughput_is_added_by_default(monkeypatch):
+    added = []
+    monkeypatch.setattr(default, "add_throughput_callback",
+                        lambda trainner_kwargs, throughput=True: added.append((dict(trainner_kwargs), throughput)))
+    default.train_agent(FakeAgent(), total_timesteps=10, save_path="model")
+    assert added == [({"total_timesteps": 10, "save_path": "model"}, True)]
+    default.train_agent(FakeAgent(), total_timesteps=10, throughput="summary")
+    assert added[-1][1] == "summary"
+    default.train_agent(AgentWithoutCallbacks(), total_timesteps=10)
+    assert len(added) == 2
+
+
+def test_throughput_opt_out():
+    agent = FakeAgent()
+    default.train_agent(agent, total_timesteps=10, throughput=False)
+    assert agent.learn_kwargs["callbacks"] == {}
+    assert agent.learn_kwargs["total_timesteps"] == 10
+
+
+def test_agents_without_callbacks():
+    agent = AgentWithoutCallbacks()
+    default.train_agent(agent, total_timesteps=10, save_path="model", unknown=1)
+    assert agent.learn_kwargs == {"total_timesteps": 10, "save_path": "model"}
+
+
+class StubModel(object):
+    '''
+    Counts the timesteps like a stable baselines model: `learn` continues from `num_timesteps` unless
+    `reset_num_timesteps`
+    '''
+
+    def __init__(self, num_timesteps=0):
+        self.num_timesteps = num_timesteps
+        self.learn_calls = []
+
+    def learn(self, total_timesteps, callback=None, eval_env=None, reset_num_timesteps=True):
+        self.learn_calls.append((total_timesteps, reset_num_timesteps))
+        if reset_num_timesteps:
+            self.num_timesteps = 0
+        self.num_timesteps += total_timesteps
+
+
+def _stub_sb3_agent(num_timesteps):
+    pytest.importorskip("grid2op")
+    from src.agents.Grid2OpSB3 import SB3AgentGrid2Op
+
+    # only the training part of the agent, without its networks
+    agent = SB3AgentGrid2Op.__new__(SB3AgentGrid2Op)
+    agent.nn_model = StubModel(num_timesteps)
+    agent.eval_env = None
+    return agent
+
+
+@pytest.mark.parametrize("resumed_num_timesteps, remaining", [(6000, 4000), (12000, 0)])
+def test_resumed_training_runs_the_remaining_timesteps(resumed_num_timesteps, remaining):
+    from src import constants
+    from src.trainner import trainer
+
+    agent = _stub_sb3_agent(resumed_num_timesteps)
+    training_kwargs = {"total_timesteps": 10000, "throughput": False}
+    experiment_config = {"name": "resumed", "training": constants.TRAINING_DEFAULT, "training_kwargs": training_kwargs,
+                         "agent": {"resumed_num_timesteps": resumed_num_timesteps}}
+    trainer.train_agent(agent, experiment_config)
+    assert agent.nn_model.learn_calls == [(remaining, False)]
+    assert agent.nn_model.num_timesteps == max(10000, resumed_num_timesteps)
+    # the configuration keeps the total of the experiment
+    assert training_kwargs["total_timesteps"] == 10000
+
+
+def test_new_training_runs_all_the_timesteps():
+    from src import constants
+    from src.trainner import trainer
+
+    agent = _stub_sb3_agent(0)
+    experiment_config = {"name": "new", "training": constants.TRAINING_DEFAULT,
+                         "training_kwargs": {"total_timesteps": 10000, "throughput": False}, "agent": {}}
+    trainer.train_agent(agent, experiment_config)
+    assert agent.nn_model.learn_calls == [(10000, True)]
+    assert agent.nn_model.num_timesteps == 10000